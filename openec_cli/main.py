@@ -5,10 +5,13 @@ Usage:
     openec inventory levels current
     openec marketing campaigns performance
     openec api  # Start the REST API server
+    openec shell  # Interactive session with a warm runner
+    openec batch commands.yaml
 """
 
 from __future__ import annotations
 
+import os
 from typing import Optional
 
 import typer
@@ -23,8 +26,13 @@ app = typer.Typer(
 console = Console()
 
 
-def _get_runner():
-    """Build the command runner with all extensions loaded."""
+def _get_runner(default_ttl: int = 0):
+    """Build the command runner with all extensions loaded.
+
+    Args:
+        default_ttl: Cache TTL in seconds for commands that do not declare one;
+            long-lived sessions (shell, batch) use it to keep results warm.
+    """
     from openec_platform.core.command_runner import CommandRunner
     from openec_platform.core.provider_interface import registry
     from openec_platform.core.router import Router
@@ -46,7 +54,15 @@ def _get_runner():
     root.include_router(analytics.router)
     root.include_router(pricing.router)
 
-    return CommandRunner(root), root
+    return CommandRunner(root, default_ttl=default_ttl, rate_source=_rate_source()), root
+
+
+def _rate_source():
+    """Rates from OPENEC_FX_RATES when set, otherwise the demo rates."""
+    from openec_platform.core.currency import RATES_ENV, default_rate_source
+    from openec_providers.demo.rates import DemoRateSource
+
+    return default_rate_source() if os.environ.get(RATES_ENV) else DemoRateSource()
 
 
 @app.command()
@@ -64,53 +80,267 @@ def commands():
 def run(
     path: str = typer.Argument(..., help="Command path (e.g., /products/sales/historical)"),
     provider: str = typer.Option("demo", "--provider", "-p", help="Data provider"),
-    output: str = typer.Option("table", "--output", "-o", help="Output format: table, json, csv"),
+    output: str = typer.Option(
+        "table", "--output", "-o", help="Output format: table, json, csv, ndjson, parquet, arrow"
+    ),
+    out: Optional[str] = typer.Option(None, "--out", help="Write the output to this file instead of stdout"),
+    batch_size: int = typer.Option(10_000, "--batch-size", help="Records written per batch"),
+    currency: Optional[str] = typer.Option(None, "--currency", help="Convert monetary fields to this currency"),
 ):
     """Execute an OpenEC command."""
+    from openec_platform.core.export import EXPORT_FORMATS
+
+    if output not in ("table", "json", *EXPORT_FORMATS):
+        console.print(f"[red]Error:[/red] unknown output format '{output}'")
+        raise typer.Exit(1)
     runner, _ = _get_runner()
+    params = {"target_currency": currency} if currency else {}
 
     try:
-        result = runner.run(path, provider=provider)
+        runner.get_command(path)
     except KeyError as e:
         console.print(f"[red]Error:[/red] {e}")
         raise typer.Exit(1)
 
+    try:
+        _run_output(runner, path, provider, output, out, batch_size, params)
+    except (ImportError, KeyError, ValueError) as e:
+        # e.g. an unknown --currency or a bad parameter, raised while streaming.
+        message = e.args[0] if isinstance(e, KeyError) and e.args else e
+        console.print(f"[red]Error:[/red] {message}")
+        raise typer.Exit(1)
+
+
+def _run_output(runner, path: str, provider: str, output: str, out: Optional[str], batch_size: int, params: dict):
+    """Run a command and write it in the requested output format."""
+    from openec_platform.core.export import EXPORT_FORMATS, export_to
+
+    if output in EXPORT_FORMATS:
+        # Batches go straight from the runner to the writer.
+        rows = export_to(runner.stream(path, provider=provider, batch_size=batch_size, **params), output, out)
+        if out:
+            Console(stderr=True).print(f"[dim]Wrote {rows} records to {out}[/dim]")
+        return
     if output == "json":
-        console.print(result.to_json())
-    elif output == "csv":
-        df = result.to_dataframe()
-        console.print(df.to_csv(index=False))
-    else:
-        df = result.to_dataframe()
-        if df.empty:
-            console.print("[yellow]No data returned.[/yellow]")
-            return
-        table = Table(title=f"{path} (provider: {provider})")
-        for col in df.columns:
-            table.add_column(str(col))
-        for _, row in df.head(20).iterrows():
-            table.add_row(*[str(v) for v in row])
-        if len(df) > 20:
-            console.print(f"[dim]Showing 20 of {len(df)} records[/dim]")
-        console.print(table)
+        text = runner.run(path, provider=provider, **params).to_json()
+        if out:
+            with open(out, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            typer.echo(text)
+        return
+
+    head: list = []
+    total = 0
+    for batch in runner.stream(path, provider=provider, batch_size=batch_size, **params):
+        head.extend(batch[:20 - len(head)])
+        total += len(batch)
+    _print_table(head, total, f"{path} (provider: {provider})")
+
+
+def _print_table(head: list, total: int, title: str) -> None:
+    """Rich table of the first records, with the total count."""
+    if not head:
+        console.print("[yellow]No data returned.[/yellow]")
+        return
+    table = Table(title=title)
+    columns = list(head[0])
+    for col in columns:
+        table.add_column(str(col))
+    for row in head:
+        table.add_row(*[str(row.get(col)) for col in columns])
+    if total > len(head):
+        console.print(f"[dim]Showing {len(head)} of {total} records[/dim]")
+    console.print(table)
+
+
+def _show_results(results: list) -> None:
+    """Print batch results that were not written to a file, then a summary."""
+    from openec_platform.core.export import EXPORT_FORMATS, export_to, record_batches
+
+    for outcome, command in results:
+        if outcome.result is None or command.output is None:
+            continue
+        if command.output == "table":
+            head = next(record_batches(outcome.result.results, 20), [])
+            _print_table(head, outcome.rows, f"{command.command} (provider: {command.provider})")
+        elif command.output == "json":
+            typer.echo(outcome.result.to_json())
+        elif command.output in EXPORT_FORMATS:
+            export_to(record_batches(outcome.result.results), command.output)
+    if len(results) == 1 and not results[0][0].error and results[0][1].output == "table":
+        return
+    table = Table(title="Batch")
+    for col in ("Name", "Command", "Records", "Seconds", "Cached", "Output / Error"):
+        table.add_column(col)
+    for outcome, _ in results:
+        detail = f"[red]{outcome.error}[/red]" if outcome.error else (outcome.out or "")
+        table.add_row(
+            outcome.name, outcome.command, str(outcome.rows), str(outcome.seconds),
+            "yes" if outcome.shared else "", detail,
+        )
+    Console(stderr=True).print(table)
+
+
+@app.command()
+def batch(
+    file: str = typer.Argument(..., help="Batch file (JSON/YAML) of commands with params and output targets"),
+    concurrency: Optional[int] = typer.Option(None, "--concurrency", "-c", help="Commands run at once"),
+    ttl: int = typer.Option(300, "--ttl", help="Cache TTL (s) shared by the batch's commands"),
+):
+    """Run a file of commands in one process, concurrently and with a shared cache."""
+    from openec_platform.core.batch import load_batch, run_batch
+
+    try:
+        loaded = load_batch(file)
+    except (OSError, ValueError, TypeError) as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    runner, _ = _get_runner(default_ttl=ttl)
+    commands = loaded["commands"]
+    try:
+        outcomes = run_batch(runner, commands, max_concurrency=concurrency or loaded["max_concurrency"])
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    _show_results(list(zip(outcomes, commands)))
+    if any(o.error for o in outcomes):
+        raise typer.Exit(1)
+
+
+SHELL_HELP = """Commands:
+  [run] /path key=value ... [-p PROVIDER] [-o FORMAT] [--out FILE] [--stream]
+  cmd1 ; cmd2 ...        run several commands concurrently
+  batch FILE             run a batch file
+  commands               list command paths
+  cache [clear]          show or clear the result cache
+  help, exit"""
+
+
+@app.command()
+def shell(
+    ttl: int = typer.Option(300, "--ttl", help="Cache TTL (s) for results within the session"),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", help="Commands run at once per line"),
+):
+    """Interactive shell that keeps one warm runner and its result cache."""
+    from openec_platform.core.batch import load_batch, parse_command, run_batch, split_commands
+
+    try:
+        import readline  # noqa: F401  (line editing and history)
+    except ImportError:
+        pass
+
+    runner, _ = _get_runner(default_ttl=ttl)
+    console.print(f"[green]OpenEC shell[/green] [dim]({len(runner.list_commands())} commands, 'help' for usage)[/dim]")
+    count = 0
+    while True:
+        try:
+            line = input("openec> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            console.print()
+            break
+        if not line:
+            continue
+        word = line.split()[0]
+        if word in ("exit", "quit"):
+            break
+        if word == "help":
+            console.print(SHELL_HELP, markup=False)
+            continue
+        if word == "commands":
+            for path in runner.list_commands():
+                console.print(path)
+            continue
+        if word == "cache":
+            if line.split()[1:] == ["clear"]:
+                runner.cache.invalidate()
+            console.print(f"{len(runner.cache)} cached results")
+            continue
+        try:
+            if word == "batch":
+                loaded = load_batch(line.split(maxsplit=1)[1])
+                commands, limit = loaded["commands"], loaded["max_concurrency"]
+            else:
+                commands = []
+                for tokens in split_commands(line):
+                    command = parse_command(tokens, count)
+                    if command.output is None:
+                        command.output = "table"
+                    commands.append(command)
+                    count += 1
+                limit = concurrency
+            outcomes = run_batch(runner, commands, max_concurrency=limit)
+        except (OSError, ValueError, TypeError, IndexError) as e:
+            console.print(f"[red]Error:[/red] {e}")
+            continue
+        _show_results(list(zip(outcomes, commands)))
+    runner.close()
 
 
 @app.command()
 def api(
     host: str = typer.Option("0.0.0.0", help="API host"),
     port: int = typer.Option(6900, help="API port"),
+    schedule: Optional[str] = typer.Option(
+        None, "--schedule", help="Scheduler config (JSON/YAML) of refresh jobs that prewarm the cache"
+    ),
+    processes: int = typer.Option(0, "--processes", help="Process pool size for CPU-bound commands (0 = off)"),
+    task_timeout: Optional[float] = typer.Option(None, "--task-timeout", help="Per-task timeout (s) in the pool"),
 ):
     """Start the OpenEC REST API server."""
     import uvicorn
     from openec_platform.core.api import create_app
 
     _, root = _get_runner()
-    fastapi_app = create_app(root)
+    config = {"jobs": None, "max_concurrency": 4}
+    if schedule:
+        from openec_platform.core.scheduler import load_jobs
+
+        config = load_jobs(schedule)
+        console.print(f"[dim]Scheduling {len(config['jobs'])} refresh jobs from {schedule}[/dim]")
+    fastapi_app = create_app(
+        root,
+        jobs=config["jobs"],
+        max_concurrency=config["max_concurrency"],
+        processes=processes,
+        task_timeout=task_timeout,
+        rate_source=_rate_source(),
+    )
     console.print(f"[green]Starting OpenEC API at http://{host}:{port}[/green]")
     console.print(f"[dim]Swagger docs: http://{host}:{port}/docs[/dim]")
     uvicorn.run(fastapi_app, host=host, port=port)
 
 
+@app.command()
+def scheduler(
+    config: str = typer.Argument(..., help="Scheduler config file (JSON/YAML)"),
+    store: Optional[str] = typer.Option(None, "--store", help="Directory to write each job's latest result to"),
+):
+    """Run scheduled refresh jobs without the API server."""
+    import asyncio
+
+    from openec_platform.core.scheduler import Scheduler, load_jobs
+
+    runner, _ = _get_runner()
+    loaded = load_jobs(config)
+    sched = Scheduler(runner, loaded["jobs"], max_concurrency=loaded["max_concurrency"], store_dir=store)
+    console.print(f"[green]Running {len(loaded['jobs'])} scheduled jobs[/green] [dim](Ctrl-C to stop)[/dim]")
+    try:
+        asyncio.run(sched.run_forever())
+    except KeyboardInterrupt:
+        pass
+
+    table = Table(title="Scheduler Status")
+    for col in ("Job", "Command", "Runs", "Failures", "Skipped", "Last Duration (s)", "Last Error"):
+        table.add_column(col)
+    for st in sched.status():
+        table.add_row(
+            st["name"], st["command"], str(st["runs"]), str(st["failures"]), str(st["skipped"]),
+            str(st["last_duration"]), st["last_error"] or "",
+        )
+    console.print(table)
+
+
 @app.command()
 def providers():
     """List available data providers."""
@@ -1,6 +1,7 @@
 """Analytics extension - commands for funnel, traffic, and category analytics."""
 
 from openec_platform.core.router import Router
+from openec_platform.engines.anomalies import DIRECTIONS, METHODS
 
 router = Router(prefix="/analytics")
 
@@ -27,15 +28,33 @@ def sources(period: str = "30d", provider: str = "demo"):
     pass
 
 
+@traffic_router.command(
+    model="TrafficAnomaly",
+    description="Detect anomalies in traffic metrics",
+    ttl=60,
+    choices={"direction": DIRECTIONS, "method": METHODS},
+)
+def anomalies(
+    metric: str = "sessions",
+    source: str = "",
+    threshold: float = 3.5,
+    direction: str = "both",
+    method: str = "",
+    provider: str = "demo",
+):
+    """Spikes and drops in a traffic metric per source (robust, EWMA and weekday baselines)."""
+    pass
+
+
 @category_router.command(model="CategoryPerformance", description="Get category performance metrics")
-def performance(category: str = "", provider: str = "demo"):
-    """Category-level performance analysis."""
+def performance(category: str = "", marketplace: str = "", grain: str = "day", provider: str = "demo"):
+    """Category-level performance analysis; pass a category to drill down into its subcategories."""
     pass
 
 
 @category_router.command(model="CategoryPerformance", description="Get category market share")
-def market_share(category: str = "", provider: str = "demo"):
-    """Market share by category."""
+def market_share(category: str = "", marketplace: str = "", grain: str = "month", provider: str = "demo"):
+    """Market share by category, or by subcategory within a category."""
     pass
 
 
@@ -28,6 +28,12 @@ def rfm(provider: str = "demo"):
     pass
 
 
+@segments_router.command(model="CustomerRFM", description="Get per-customer RFM scores and segments")
+def assignments(segment: str = "", provider: str = "demo"):
+    """Per-customer RFM segment assignments."""
+    pass
+
+
 @acquisition_router.command(model="CustomerAcquisition", description="Get customer acquisition by channel")
 def channels(period: str = "30d", provider: str = "demo"):
     """Customer acquisition channel breakdown."""
@@ -9,15 +9,21 @@ forecast_router = Router(prefix="/forecasting")
 movement_router = Router(prefix="/movements")
 
 
-@levels_router.command(model="InventoryLevel", description="Get current inventory levels")
+@levels_router.command(model="InventoryLevel", description="Get current inventory levels", ttl=15)
 def current(warehouse: str = "", provider: str = "demo"):
     """Current stock levels across warehouses."""
     pass
 
 
-@levels_router.command(model="InventoryLevel", description="Get low stock alerts")
-def alerts(threshold: int = 10, provider: str = "demo"):
-    """Products at or below reorder point."""
+@levels_router.command(model="StockoutRisk", description="Get low stock alerts", ttl=15)
+def alerts(
+    threshold: int = 10,
+    warehouse: str = "",
+    lead_time: str = "7d",
+    service_level: float = 0.95,
+    provider: str = "demo",
+):
+    """Products at or below their simulated reorder point, or at risk of stocking out within the lead time."""
     pass
 
 
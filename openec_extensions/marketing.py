@@ -1,6 +1,7 @@
 """Marketing extension - commands for campaigns, attribution, and keyword analytics."""
 
 from openec_platform.core.router import Router
+from openec_platform.engines.anomalies import DIRECTIONS, METHODS
 
 router = Router(prefix="/marketing")
 
@@ -21,6 +22,24 @@ def roi(period: str = "30d", provider: str = "demo"):
     pass
 
 
+@campaigns_router.command(
+    model="CampaignAnomaly",
+    description="Detect anomalies in campaign metrics",
+    ttl=60,
+    choices={"direction": DIRECTIONS, "method": METHODS},
+)
+def anomalies(
+    metric: str = "spend",
+    channel: str = "",
+    threshold: float = 3.5,
+    direction: str = "both",
+    method: str = "",
+    provider: str = "demo",
+):
+    """Spikes and drops in a campaign metric per channel (robust, EWMA and weekday baselines)."""
+    pass
+
+
 @attribution_router.command(model="ChannelAttribution", description="Get channel attribution data")
 def channels(model: str = "last_touch", provider: str = "demo"):
     """Multi-touch attribution by channel."""
@@ -33,9 +52,16 @@ def performance(marketplace: str = "", provider: str = "demo"):
     pass
 
 
-@keywords_router.command(model="KeywordPerformance", description="Get keyword opportunities")
-def opportunities(category: str = "", provider: str = "demo"):
-    """High-potential keyword opportunities."""
+@keywords_router.command(model="KeywordOpportunity", description="Get keyword opportunities")
+def opportunities(
+    category: str = "",
+    marketplace: str = "",
+    target_position: float = 3.0,
+    top_k: int = 100,
+    min_volume: int = 0,
+    provider: str = "demo",
+):
+    """High-potential keywords ranked by the value of the clicks gained at a better position."""
     pass
 
 
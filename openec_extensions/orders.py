@@ -1,6 +1,7 @@
 """Orders extension - commands for order management, fulfillment, and returns."""
 
 from openec_platform.core.router import Router
+from openec_platform.engines.anomalies import DIRECTIONS, METHODS
 
 router = Router(prefix="/orders")
 
@@ -14,6 +15,24 @@ def summary(period: str = "30d", provider: str = "demo"):
     pass
 
 
+@router.command(
+    model="OrderAnomaly",
+    description="Detect anomalies in order metrics",
+    ttl=60,
+    choices={"direction": DIRECTIONS, "method": METHODS},
+)
+def anomalies(
+    metric: str = "cancelled_orders",
+    marketplace: str = "",
+    threshold: float = 3.5,
+    direction: str = "both",
+    method: str = "",
+    provider: str = "demo",
+):
+    """Spikes and drops in an order metric per marketplace (robust, EWMA and weekday baselines)."""
+    pass
+
+
 @router.command(model="OrderDetail", description="Get recent orders")
 def recent(limit: int = 50, provider: str = "demo"):
     """List recent orders."""
@@ -21,19 +40,25 @@ def recent(limit: int = 50, provider: str = "demo"):
 
 
 @fulfillment_router.command(model="FulfillmentStatus", description="Get fulfillment status breakdown")
-def status(period: str = "7d", provider: str = "demo"):
-    """Fulfillment status overview."""
+def status(period: str = "7d", marketplace: str = "", provider: str = "demo"):
+    """Orders placed per day by current fulfillment status, with the fulfillment rate."""
+    pass
+
+
+@fulfillment_router.command(model="FulfillmentTime", description="Get time spent in each fulfillment status")
+def times(period: str = "30d", marketplace: str = "", status: str = "", provider: str = "demo"):
+    """Percentiles of hours orders spent in each status (e.g. pending before shipping)."""
     pass
 
 
 @returns_router.command(model="ReturnsSummary", description="Get returns summary and trends")
-def summary(period: str = "30d", provider: str = "demo"):
+def summary(period: str = "30d", marketplace: str = "", grain: str = "day", provider: str = "demo"):
     """Returns and refunds summary."""
     pass
 
 
 @returns_router.command(model="ReturnsSummary", description="Get top return reasons")
-def reasons(period: str = "30d", provider: str = "demo"):
+def reasons(period: str = "30d", marketplace: str = "", grain: str = "period", top_k: int = 10, provider: str = "demo"):
     """Top return reasons analysis."""
     pass
 
@@ -9,13 +9,13 @@ competitor_router = Router(prefix="/competitor")
 optimization_router = Router(prefix="/optimization")
 
 
-@history_router.command(model="PriceHistorical", description="Get historical price data")
+@history_router.command(model="PriceHistorical", description="Get historical price data", ttl=3600)
 def historical(sku: str = "", period: str = "90d", provider: str = "demo"):
     """Historical price tracking for a product."""
     pass
 
 
-@competitor_router.command(model="CompetitorPrice", description="Get competitor pricing")
+@competitor_router.command(model="CompetitorPrice", description="Get competitor pricing", ttl=300)
 def current(sku: str = "", provider: str = "demo"):
     """Current competitor prices for a product."""
     pass
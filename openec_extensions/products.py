@@ -10,7 +10,11 @@ rankings_router = Router(prefix="/rankings")
 reviews_router = Router(prefix="/reviews")
 
 
-@sales_router.command(model="SalesHistorical", description="Get historical sales data for a product or category")
+@sales_router.command(
+    model="SalesHistorical",
+    description="Get historical sales data for a product or category",
+    ttl=3600,
+)
 def historical(sku: str = "", category: str = "", provider: str = "demo"):
     """Historical sales data by SKU or category."""
     pass
@@ -46,8 +50,8 @@ def recent(sku: str = "", provider: str = "demo"):
     pass
 
 
-@reviews_router.command(model="ProductReview", description="Get review sentiment analysis")
-def sentiment(sku: str = "", provider: str = "demo"):
+@reviews_router.command(model="ReviewSentiment", description="Get review sentiment analysis")
+def sentiment(sku: str = "", marketplace: str = "", provider: str = "demo"):
     """Review sentiment breakdown."""
     pass
 
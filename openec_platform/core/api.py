@@ -6,25 +6,194 @@ OpenAPI/Swagger documentation.
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import asyncio
+import inspect
+import json
+import typing
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
+from openec_platform.core.cache import CacheEntry
 from openec_platform.core.command_runner import CommandRunner
+from openec_platform.core.currency import RateSource
 from openec_platform.core.oecject import OECject
-from openec_platform.core.router import Router
+from openec_platform.core.router import CommandInfo, Router
+from openec_platform.core.scheduler import ScheduledJob, Scheduler
+from openec_platform.core.subscriptions import SubscriptionManager
 
 
-def create_app(router: Router) -> FastAPI:
+def _command_parameters(cmd: CommandInfo) -> list[inspect.Parameter]:
+    """Query parameters declared by a command function, excluding `provider`."""
+    try:
+        hints = typing.get_type_hints(cmd.func)
+    except Exception:
+        hints = {}
+    params = []
+    for name, p in inspect.signature(cmd.func).parameters.items():
+        if name == "provider" or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD):
+            continue
+        default = None if p.default is inspect.Parameter.empty else p.default
+        params.append(
+            inspect.Parameter(
+                name,
+                inspect.Parameter.KEYWORD_ONLY,
+                default=Query(default),
+                annotation=hints.get(name, str),
+            )
+        )
+    return params
+
+
+def _coerce_params(cmd: CommandInfo, raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert raw string parameters to the types declared by the command function.
+
+    Values outside the command's declared `choices` are rejected with a 422.
+    """
+    try:
+        hints = typing.get_type_hints(cmd.func)
+    except Exception:
+        hints = {}
+    params = {}
+    for name, value in raw.items():
+        hint = hints.get(name)
+        if isinstance(value, str) and hint is bool:
+            value = value.lower() in ("1", "true", "yes", "on")
+        elif isinstance(value, str) and hint in (int, float):
+            try:
+                value = hint(value)
+            except ValueError:
+                raise HTTPException(status_code=422, detail=f"Invalid value for '{name}': {value!r}")
+        allowed = cmd.choices.get(name)
+        if allowed and isinstance(value, str) and value:
+            invalid = [v for v in (v.strip() for v in value.split(",")) if v not in allowed]
+            if invalid:
+                raise HTTPException(
+                    status_code=422, detail=f"Invalid value for '{name}': {value!r}; expected one of {list(allowed)}"
+                )
+        params[name] = value
+    return params
+
+
+def _not_modified(request: Request, entry: CacheEntry) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against a cache entry."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or f'"{entry.etag}"' in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = datetime.fromtimestamp(int(entry.modified), tz=timezone.utc)
+        return modified <= since
+    return False
+
+
+def _cache_headers(entry: CacheEntry) -> Dict[str, str]:
+    """Validator and freshness headers for a cache entry."""
+    return {
+        "ETag": f'"{entry.etag}"',
+        "Last-Modified": formatdate(entry.modified, usegmt=True),
+        "Cache-Control": f"max-age={entry.remaining}" if entry.ttl > 0 else "no-cache",
+    }
+
+
+def _make_endpoint(runner: CommandRunner, cmd: CommandInfo) -> Callable:
+    """Build the GET endpoint for a command.
+
+    Fresh results are served from the runner's cache using the pre-serialized
+    body, and conditional requests are answered with 304 without serializing.
+    """
+
+    async def endpoint(request: Request, provider: str = "demo", **params: Any) -> Response:
+        kwargs = _coerce_params(cmd, {k: v for k, v in params.items() if v is not None})
+        try:
+            # Run off the event loop so slow or CPU-bound commands don't stall other requests.
+            entry = await asyncio.to_thread(runner.run_entry, cmd.path, provider=provider, **kwargs)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            # Parameter values the command rejects, e.g. an unknown target_currency.
+            raise HTTPException(status_code=422, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        headers = _cache_headers(entry)
+        if _not_modified(request, entry):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    endpoint.__doc__ = cmd.description
+    endpoint.__signature__ = inspect.Signature(
+        [
+            inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request),
+            inspect.Parameter(
+                "provider",
+                inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                default=Query("demo", description="Data provider to use"),
+                annotation=str,
+            ),
+            inspect.Parameter(
+                "target_currency",
+                inspect.Parameter.KEYWORD_ONLY,
+                default=Query(None, description="Convert monetary fields to this currency (e.g. EUR)"),
+                annotation=Optional[str],
+            ),
+            *_command_parameters(cmd),
+        ]
+    )
+    return endpoint
+
+
+def create_app(
+    router: Router,
+    cache_ttl: int = 30,
+    jobs: Optional[List[ScheduledJob]] = None,
+    max_concurrency: int = 4,
+    processes: int = 0,
+    task_timeout: Optional[float] = None,
+    rate_source: Optional[RateSource] = None,
+) -> FastAPI:
     """Create and configure the FastAPI application.
 
     Args:
         router: The root router with all registered commands.
+        cache_ttl: Default result cache TTL in seconds for commands that do not
+            declare their own.
+        jobs: Scheduled refresh jobs that prewarm the result cache while the
+            server runs.
+        max_concurrency: Maximum number of scheduled runs executing at once.
+        processes: Process pool size for CPU-bound commands (0 disables the pool).
+        task_timeout: Per-task timeout in seconds for process-pool work.
+        rate_source: Exchange rates for `target_currency` conversions.
 
     Returns:
         Configured FastAPI application.
     """
+    runner = CommandRunner(
+        router, default_ttl=cache_ttl, processes=processes, task_timeout=task_timeout, rate_source=rate_source
+    )
+    scheduler = Scheduler(runner, jobs, max_concurrency=max_concurrency) if jobs else None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if scheduler is not None:
+            await scheduler.start()
+        yield
+        if scheduler is not None:
+            await scheduler.stop()
+        runner.close()
+
     app = FastAPI(
         title="OpenEC API",
         description=(
@@ -35,6 +204,7 @@ def create_app(router: Router) -> FastAPI:
         version="0.1.0",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -45,8 +215,6 @@ def create_app(router: Router) -> FastAPI:
         allow_headers=["*"],
     )
 
-    runner = CommandRunner(router)
-
     @app.get("/")
     async def root() -> Dict[str, Any]:
         return {
@@ -61,30 +229,111 @@ def create_app(router: Router) -> FastAPI:
     async def list_commands() -> Dict[str, Any]:
         return {"commands": runner.list_commands()}
 
-    # Auto-register all commands as GET endpoints
-    commands = router.get_all_commands()
-    for path, cmd in commands.items():
-        api_path = f"/api/v1{path}"
+    subscriptions = SubscriptionManager(runner)
+
+    @app.get("/api/v1/subscribe/{path:path}")
+    async def subscribe(
+        path: str,
+        request: Request,
+        provider: str = Query("demo", description="Data provider to use"),
+        interval: float = Query(5.0, description="Seconds between refreshes"),
+        key: str = Query("", description="Comma-separated natural key override"),
+    ) -> StreamingResponse:
+        """Server-Sent Events stream of a command: a snapshot, then keyed diffs."""
+        command_path = f"/{path}"
+        try:
+            cmd = runner.get_command(command_path)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        reserved = {"provider", "interval", "key"}
+        params = _coerce_params(cmd, {k: v for k, v in request.query_params.items() if k not in reserved})
+        key_fields = [k for k in key.split(",") if k]
+
+        async def stream():
+            events = subscriptions.subscribe(command_path, provider, params, interval, key_fields)
+            try:
+                async for event in events:
+                    if await request.is_disconnected():
+                        break
+                    data = json.dumps(event, default=str)
+                    yield f"event: {event['event']}\nid: {event['version']}\ndata: {data}\n\n"
+            finally:
+                await events.aclose()
+
+        return StreamingResponse(
+            stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.websocket("/api/v1/ws")
+    async def websocket_subscriptions(websocket: WebSocket) -> None:
+        """Multiplexed subscriptions over one WebSocket.
+
+        Clients send {"action": "subscribe", "id": ..., "command": ..., "provider": ...,
+        "params": {...}, "interval": ..., "key": [...]} or {"action": "unsubscribe", "id": ...}.
+        Every pushed event carries the subscription id.
+        """
+        await websocket.accept()
+        send_lock = asyncio.Lock()
+        tasks: Dict[str, asyncio.Task] = {}
 
-        # Create a closure to capture cmd
-        def _make_endpoint(command_info):
-            async def endpoint(
-                provider: str = Query("demo", description="Data provider to use"),
-            ) -> Dict[str, Any]:
+        async def pump(sub_id: str, message: Dict[str, Any]) -> None:
+            events = subscriptions.subscribe(
+                message["command"],
+                message.get("provider", "demo"),
+                message.get("params") or {},
+                float(message.get("interval", 5.0)),
+                message.get("key") or (),
+            )
+            try:
+                async for event in events:
+                    async with send_lock:
+                        await websocket.send_text(json.dumps({"id": sub_id, **event}, default=str))
+            finally:
+                await events.aclose()
+
+        try:
+            while True:
+                message = await websocket.receive_json()
+                sub_id = str(message.get("id", message.get("command", "")))
+                action = message.get("action", "subscribe")
+                if action == "unsubscribe":
+                    task = tasks.pop(sub_id, None)
+                    if task is not None:
+                        task.cancel()
+                    continue
                 try:
-                    result = runner.run(command_info.path, provider=provider)
-                    return result.model_dump(mode="json")
+                    runner.get_command(message.get("command", ""))
                 except KeyError as e:
-                    raise HTTPException(status_code=404, detail=str(e))
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=str(e))
+                    async with send_lock:
+                        await websocket.send_json({"id": sub_id, "event": "error", "detail": str(e)})
+                    continue
+                if sub_id in tasks:
+                    tasks.pop(sub_id).cancel()
+                tasks[sub_id] = asyncio.create_task(pump(sub_id, message))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    @app.get("/api/v1/subscriptions")
+    async def list_subscriptions() -> Dict[str, Any]:
+        return {"subscriptions": subscriptions.active()}
 
-            endpoint.__doc__ = command_info.description
-            return endpoint
+    @app.get("/api/v1/scheduler/status")
+    async def scheduler_status() -> Dict[str, Any]:
+        return {"jobs": scheduler.status() if scheduler is not None else []}
+
+    # Auto-register all commands as GET endpoints
+    commands = router.get_all_commands()
+    for path, cmd in commands.items():
+        api_path = f"/api/v1{path}"
 
         app.add_api_route(
             api_path,
-            _make_endpoint(cmd),
+            _make_endpoint(runner, cmd),
             methods=["GET"],
             tags=cmd.tags or [cmd.path.split("/")[1]] if "/" in cmd.path else ["general"],
             summary=cmd.description,
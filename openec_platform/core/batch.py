@@ -0,0 +1,299 @@
+"""Batch execution of many commands on one warm runner.
+
+Starting `openec run` once per command rebuilds the router, re-imports the
+extensions and providers and loses every cached result. A batch runs a list
+of commands against a single CommandRunner instead: independent commands run
+concurrently in worker threads, identical commands run once and share the
+result, and every result goes through the runner's result cache, so later
+batches (or shell commands) in the same process are served warm.
+
+Batch files are JSON, or YAML when pyyaml is installed:
+
+    {
+        "max_concurrency": 4,
+        "commands": [
+            {"name": "sales", "command": "/products/sales/historical",
+             "params": {"period": "90d"}, "output": "parquet", "out": "sales.parquet"},
+            {"command": "/orders/summary", "output": "csv", "out": "orders.csv"},
+            {"name": "ltv", "command": "/customers/ltv/summary", "after": ["sales"]}
+        ]
+    }
+
+`after` orders a command behind others; everything else may run at once.
+"""
+
+from __future__ import annotations
+
+import json
+import shlex
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from openec_platform.core.cache import CacheEntry
+from openec_platform.core.command_runner import CommandRunner
+from openec_platform.core.export import EXPORT_FORMATS, export_to, record_batches
+from openec_platform.core.oecject import OECject
+from openec_platform.core.scheduler import read_config
+
+OUTPUT_FORMATS = ("table", "json", *EXPORT_FORMATS)
+
+
+@dataclass
+class BatchCommand:
+    """One command of a batch.
+
+    Attributes:
+        name: Unique name, used by `after` and in reports.
+        command: The command path.
+        provider: The data provider to use.
+        params: Command parameters.
+        output: Output format, one of OUTPUT_FORMATS. Results without `out`
+            are kept on the BatchResult for the caller to display.
+        out: File the output is written to.
+        stream: Write batches straight from the fetcher to `out` without
+            caching the result, for exports larger than memory.
+        after: Names of commands that must finish first.
+    """
+
+    name: str
+    command: str
+    provider: str = "demo"
+    params: Dict[str, Any] = field(default_factory=dict)
+    output: Optional[str] = None
+    out: Optional[str] = None
+    stream: bool = False
+    after: List[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if self.output is None and self.out:
+            self.output = "json"
+        if self.output is not None and self.output not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Command '{self.name}': unknown output '{self.output}', expected one of {list(OUTPUT_FORMATS)}"
+            )
+        if self.out and self.output == "table":
+            raise ValueError(f"Command '{self.name}': table output cannot be written to a file")
+        if self.stream and not (self.out and self.output in EXPORT_FORMATS):
+            raise ValueError(f"Command '{self.name}': stream needs out and one of {list(EXPORT_FORMATS)}")
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one batch command.
+
+    Attributes:
+        name: The command's name.
+        command: The command path.
+        rows: Records returned.
+        seconds: Wall time including writing the output.
+        shared: Served from the result cache or by an identical command
+            running concurrently.
+        out: File written, if any.
+        error: Error message if the command failed.
+        result: The OECject, for commands without `out`.
+    """
+
+    name: str
+    command: str
+    rows: int = 0
+    seconds: float = 0.0
+    shared: bool = False
+    out: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[OECject] = field(default=None, repr=False)
+
+
+class SharedRuns:
+    """Runs commands through a runner's cache, coalescing identical concurrent calls.
+
+    When several threads ask for the same command and parameters at once,
+    one runs it and the others wait for its entry instead of running it
+    again.
+    """
+
+    def __init__(self, runner: CommandRunner) -> None:
+        self.runner = runner
+        self._running: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def entry(self, command: BatchCommand) -> Tuple[CacheEntry, bool]:
+        """The command's cache entry and whether it was shared rather than run here."""
+        key = self.runner.cache_key(command.command, command.provider, **command.params)
+        with self._lock:
+            future = self._running.get(key)
+            owner = future is None
+            if owner:
+                future = self._running[key] = Future()
+        if not owner:
+            return future.result(), True
+        try:
+            cached = self.runner.cache.get(key) is not None
+            entry = self.runner.run_entry(command.command, provider=command.provider, **command.params)
+            future.set_result(entry)
+            return entry, cached
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._running.pop(key, None)
+
+
+def _count(result: OECject) -> int:
+    if isinstance(result.results, list):
+        return len(result.results)
+    return 0 if result.results is None else 1
+
+
+def run_command(shared: SharedRuns, command: BatchCommand) -> BatchResult:
+    """Run one batch command and write its output; errors are reported, not raised."""
+    started = time.monotonic()
+    outcome = BatchResult(name=command.name, command=command.command, out=command.out)
+    try:
+        if command.stream:
+            batches = shared.runner.stream(command.command, provider=command.provider, **command.params)
+            outcome.rows = export_to(batches, command.output, command.out)
+        else:
+            entry, outcome.shared = shared.entry(command)
+            outcome.rows = _count(entry.result)
+            if command.out and command.output == "json":
+                Path(command.out).write_bytes(entry.body)
+            elif command.out:
+                export_to(record_batches(entry.result.results), command.output, command.out)
+            else:
+                outcome.result = entry.result
+    except KeyError as e:
+        outcome.error = str(e.args[0]).splitlines()[0].removesuffix(" Available:")
+    except Exception as e:
+        outcome.error = str(e) or type(e).__name__
+    outcome.seconds = round(time.monotonic() - started, 3)
+    return outcome
+
+
+def run_batch(runner: CommandRunner, commands: List[BatchCommand], max_concurrency: int = 4) -> List[BatchResult]:
+    """Run commands on one runner, concurrently where `after` allows.
+
+    Commands run in waves: every command whose `after` commands have finished
+    runs in the next wave, up to `max_concurrency` at a time. Commands after a
+    failed one are skipped.
+
+    Returns:
+        One BatchResult per command, in the given order.
+
+    Raises:
+        ValueError: Duplicate names, or `after` naming an unknown command or
+            forming a cycle.
+    """
+    names = [c.name for c in commands]
+    if len(set(names)) != len(names):
+        raise ValueError("Batch command names must be unique")
+    for c in commands:
+        unknown = set(c.after) - set(names)
+        if unknown:
+            raise ValueError(f"Command '{c.name}' runs after unknown commands {sorted(unknown)}")
+
+    shared = SharedRuns(runner)
+    done: Dict[str, BatchResult] = {}
+    pending = list(commands)
+    with ThreadPoolExecutor(max_workers=max(max_concurrency, 1)) as pool:
+        while pending:
+            ready = [c for c in pending if all(name in done for name in c.after)]
+            if not ready:
+                raise ValueError(f"Commands {[c.name for c in pending]} have circular 'after' dependencies")
+            runnable = []
+            for c in ready:
+                failed = [name for name in c.after if done[name].error]
+                if failed:
+                    done[c.name] = BatchResult(c.name, c.command, out=c.out, error=f"skipped: {failed[0]} failed")
+                else:
+                    runnable.append(c)
+            for c, outcome in zip(runnable, pool.map(lambda c: run_command(shared, c), runnable)):
+                done[c.name] = outcome
+            pending = [c for c in pending if c.name not in done]
+    return [done[name] for name in names]
+
+
+def _default_name(command: str, index: int) -> str:
+    return f"{command.strip('/').replace('/', '-')}-{index}"
+
+
+def load_batch(path: Union[str, Path]) -> Dict[str, Any]:
+    """Load a batch file.
+
+    Returns:
+        Dict with "commands" (list of BatchCommand) and "max_concurrency".
+    """
+    config = read_config(path)
+    if isinstance(config, list):
+        config = {"commands": config}
+    commands = []
+    for i, spec in enumerate(config.get("commands", [])):
+        spec = dict(spec)
+        spec.setdefault("name", _default_name(str(spec.get("command", "command")), i))
+        commands.append(BatchCommand(**spec))
+    return {"commands": commands, "max_concurrency": int(config.get("max_concurrency", 4))}
+
+
+def _param_value(text: str) -> Any:
+    """Parse a key=value parameter: JSON scalars and lists, otherwise a string."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def split_commands(line: str) -> List[List[str]]:
+    """Split a shell line into the tokens of each command, separated by unquoted ";".
+
+    Raises:
+        ValueError: Unbalanced quotes.
+    """
+    lexer = shlex.shlex(line, posix=True, punctuation_chars=";")
+    lexer.whitespace_split = True
+    commands: List[List[str]] = [[]]
+    for token in lexer:
+        if token.strip(";"):
+            commands[-1].append(token)
+        elif commands[-1]:
+            commands.append([])
+    return [tokens for tokens in commands if tokens]
+
+
+def parse_command(line: Union[str, List[str]], index: int = 0) -> BatchCommand:
+    """Parse a shell-style command line, or its tokens, into a BatchCommand.
+
+    Syntax: `[run] PATH [key=value ...] [-p PROVIDER] [-o FORMAT] [--out FILE] [--stream]`,
+    e.g. `/products/sales/historical period=90d top_k=10 -o csv --out sales.csv`.
+
+    Raises:
+        ValueError: Malformed line.
+    """
+    tokens = shlex.split(line) if isinstance(line, str) else list(line)
+    if tokens and tokens[0] == "run":
+        tokens = tokens[1:]
+    if not tokens or not tokens[0].startswith("/"):
+        text = line if isinstance(line, str) else shlex.join(tokens)
+        raise ValueError(f"Expected a command path starting with '/': {text!r}")
+    spec: Dict[str, Any] = {"command": tokens[0], "params": {}}
+    options = {"-p": "provider", "--provider": "provider", "-o": "output", "--output": "output",
+               "--out": "out", "--name": "name"}
+    rest = iter(tokens[1:])
+    for token in rest:
+        if token in options:
+            value = next(rest, None)
+            if value is None:
+                raise ValueError(f"{token} needs a value")
+            spec[options[token]] = value
+        elif token == "--stream":
+            spec["stream"] = True
+        elif "=" in token and not token.startswith("-"):
+            key, value = token.split("=", 1)
+            spec["params"][key] = _param_value(value)
+        else:
+            raise ValueError(f"Unexpected argument {token!r}")
+    spec.setdefault("name", _default_name(spec["command"], index))
+    return BatchCommand(**spec)
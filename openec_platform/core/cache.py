@@ -0,0 +1,123 @@
+"""In-memory result cache for command outputs.
+
+Entries are keyed by command path, provider and parameters. Each entry keeps
+the OECject together with its content hash (ETag) and, once requested, the
+serialized JSON body, so an unchanged result can be re-served without running
+the command or serializing it again.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from openec_platform.core.oecject import OECject
+
+
+@dataclass
+class CacheEntry:
+    """A cached command result with freshness metadata.
+
+    Attributes:
+        result: The cached OECject.
+        ttl: Seconds the entry stays fresh after `created`.
+        created: Epoch seconds when the result was produced.
+        modified: Epoch seconds when the content last changed. Refreshes that
+            produce identical data keep the previous value.
+    """
+
+    result: OECject
+    ttl: int = 0
+    created: float = field(default_factory=time.time)
+    modified: float = 0.0
+    _etag: Optional[str] = field(default=None, repr=False)
+    _body: Optional[bytes] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.modified:
+            self.modified = self.created
+
+    @property
+    def etag(self) -> str:
+        """Content hash of the result, computed once on first access."""
+        if self._etag is None:
+            self._etag = self.result.etag()
+        return self._etag
+
+    @property
+    def body(self) -> bytes:
+        """JSON body of the full response, serialized once on first access."""
+        if self._body is None:
+            self._body = self.result.model_dump_json().encode()
+        return self._body
+
+    @property
+    def age(self) -> float:
+        """Seconds since the result was produced."""
+        return time.time() - self.created
+
+    @property
+    def remaining(self) -> int:
+        """Whole seconds left before the entry goes stale."""
+        return max(int(self.ttl - self.age), 0)
+
+    @property
+    def fresh(self) -> bool:
+        return self.ttl > 0 and self.age < self.ttl
+
+
+class ResultCache:
+    """Thread-safe LRU cache of command results.
+
+    Stale entries are kept until evicted so that a refresh producing identical
+    content can carry over the previous `modified` time.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path: str, provider: str, params: Dict[str, Any]) -> str:
+        """Build a canonical key from a command invocation."""
+        return json.dumps([path, provider, params], sort_keys=True, default=str)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for `key` if it is still fresh."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.fresh:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, result: OECject, ttl: int) -> CacheEntry:
+        """Store a new result, keeping `modified` if the content is unchanged."""
+        entry = CacheEntry(result=result, ttl=ttl)
+        with self._lock:
+            previous = self._entries.get(key)
+        if previous is not None and previous.etag == entry.etag:
+            entry.modified = previous.modified
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop all entries, or only those belonging to one command path."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if json.loads(k)[0] == path]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,11 +2,22 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import inspect
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Union
 
+from openec_platform.core.cache import CacheEntry, ResultCache
+from openec_platform.core.export import record_batches
 from openec_platform.core.oecject import OECject
-from openec_platform.core.provider_interface import QueryParams, registry
+from openec_platform.core.provider_interface import ProviderFetcher, QueryParams, registry
 from openec_platform.core.router import CommandInfo, Router
+from openec_platform.core.sharding import RateLimiter, Window, fetch_sharded, resolve_date_range, split_windows
+
+if TYPE_CHECKING:
+    from openec_platform.core.currency import RateSource
+    from openec_platform.core.executor import ProcessExecutor
+    from openec_platform.core.joins import JoinSide
 
 
 class CommandRunner:
@@ -14,13 +25,50 @@ class CommandRunner:
 
     The runner:
     1. Looks up the command by path
-    2. Resolves the provider from the registry
-    3. Calls the fetcher's fetch() then transform()
-    4. Wraps the result in an OECject
+    2. Serves a fresh cached result if the command has a TTL
+    3. Resolves the provider from the registry
+    4. Calls the fetcher's fetch() (window by window for shardable fetchers)
+       then transform()
+    5. Converts monetary fields when a `target_currency` is requested
+    6. Wraps the result in an OECject
     """
 
-    def __init__(self, router: Router) -> None:
+    def __init__(
+        self,
+        router: Router,
+        cache: Optional[ResultCache] = None,
+        default_ttl: int = 0,
+        checkpoint_dir: Optional[Union[str, Path]] = None,
+        processes: int = 0,
+        task_timeout: Optional[float] = None,
+        rate_source: Optional[RateSource] = None,
+    ) -> None:
+        """Initialize the runner.
+
+        Args:
+            router: The root router with all registered commands.
+            cache: Result cache shared by all runs. A private one is created if omitted.
+            default_ttl: Cache TTL in seconds for commands that do not declare one.
+                0 disables caching for those commands.
+            checkpoint_dir: Directory for checkpoints of sharded fetches, so an
+                interrupted backfill resumes after a restart. Checkpoints are only
+                kept in memory if omitted.
+            processes: Size of the process pool for CPU-bound commands and
+                fetchers. 0 runs everything in the calling thread.
+            task_timeout: Per-task timeout in seconds for process-pool work.
+            rate_source: Exchange rates for `target_currency` conversions. Defaults
+                to the file named by OPENEC_FX_RATES.
+        """
         self.router = router
+        self.cache = cache if cache is not None else ResultCache()
+        self.default_ttl = default_ttl
+        self.checkpoint_dir = checkpoint_dir
+        self.rate_source = rate_source
+        self.executor: Optional[ProcessExecutor] = None
+        if processes:
+            from openec_platform.core.executor import ProcessExecutor
+
+            self.executor = ProcessExecutor(max_workers=processes, timeout=task_timeout)
 
     def run(self, path: str, provider: str = "demo", **kwargs: Any) -> OECject:
         """Execute a command by its path.
@@ -28,35 +76,236 @@ class CommandRunner:
         Args:
             path: The command path (e.g., "/products/sales/historical").
             provider: The data provider to use.
-            **kwargs: Parameters passed to the provider fetcher.
+            **kwargs: Parameters passed to the provider fetcher. `target_currency`
+                (e.g. "EUR") converts the monetary fields of the results.
 
         Returns:
             OECject containing the results.
         """
+        return self.run_entry(path, provider=provider, **kwargs).result
+
+    def run_entry(self, path: str, provider: str = "demo", **kwargs: Any) -> CacheEntry:
+        """Execute a command and return its cache entry.
+
+        The entry carries the ETag and freshness metadata used by the REST API
+        for conditional requests. Fresh cached entries are returned without
+        running the command.
+        """
+        cmd = self.get_command(path)
+        ttl = self.command_ttl(cmd)
+        params = self._canonical_params(cmd, kwargs)
+        key = ResultCache.make_key(path, provider, params)
+
+        if ttl > 0:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry
+
+        result = self._execute(cmd, provider, **params)
+        if ttl > 0:
+            return self.cache.put(key, result, ttl)
+        return CacheEntry(result=result, ttl=0)
+
+    def stream(
+        self, path: str, provider: str = "demo", batch_size: int = 10_000, **kwargs: Any
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Execute a command and yield its records in batches of plain dicts.
+
+        Shardable fetchers are fetched and transformed one date window at a
+        time, so only a window's records are held in memory and exports can
+        exceed RAM. Other commands are run as usual (a fresh cached result is
+        reused) and their results are yielded in batches. Streamed windows are
+        not cached.
+
+        Args:
+            path: The command path.
+            provider: The data provider to use.
+            batch_size: Records per yielded batch.
+            **kwargs: Parameters passed to the provider fetcher, as for `run`.
+        """
+        cmd = self.get_command(path)
+        fetcher = registry.get_fetcher(provider, cmd.model) if cmd.model and cmd.provider_choices else None
+        windows = self._windows(cmd, fetcher, kwargs) if fetcher is not None else None
+        cached = self.cache.get(self.cache_key(path, provider, **kwargs)) if self.command_ttl(cmd) > 0 else None
+        offload = self.executor is not None and (cmd.cpu_bound or getattr(fetcher, "cpu_bound", False))
+        if windows is None or cached is not None or offload:
+            result = cached.result if cached is not None else self.run(path, provider=provider, **kwargs)
+            yield from record_batches(result.results, batch_size)
+            return
+
+        kwargs = dict(kwargs)
+        target_currency = kwargs.pop("target_currency", None)
+        full_params = self._canonical_params(cmd, kwargs)
+        params = QueryParams(provider=provider, **full_params)
+        limiter = RateLimiter(registry.get(provider).rate_limit)
+        for start, end in windows:
+            limiter.acquire()
+            records = fetcher.fetch(params, **{**full_params, "start_date": start, "end_date": end})
+            if records and all("date" in r for r in records):
+                records.sort(key=lambda r: str(r["date"]))
+            results = fetcher.transform(records, **full_params)
+            if target_currency and results:
+                from openec_platform.core.currency import default_rate_source, normalize_results
+
+                source = self.rate_source if self.rate_source is not None else default_rate_source()
+                results = normalize_results(results, target_currency, source)
+            yield from record_batches(results, batch_size)
+
+    def refresh(
+        self, path: str, provider: str = "demo", ttl: Optional[int] = None, **kwargs: Any
+    ) -> CacheEntry:
+        """Re-run a command unconditionally and store the result in the cache.
+
+        Args:
+            path: The command path.
+            provider: The data provider to use.
+            ttl: Freshness override for the stored entry, e.g. to keep a prewarmed
+                result fresh until the next scheduled refresh.
+            **kwargs: Parameters passed to the provider fetcher.
+        """
+        cmd = self.get_command(path)
+        params = self._canonical_params(cmd, kwargs)
+        key = ResultCache.make_key(path, provider, params)
+        result = self._execute(cmd, provider, **params)
+        return self.cache.put(key, result, self.command_ttl(cmd) if ttl is None else ttl)
+
+    def join(
+        self,
+        sides: Sequence[Union[str, JoinSide]],
+        on: Union[str, Sequence[str]] = "sku",
+        asof: Optional[str] = "date",
+        provider: str = "demo",
+        tolerance: Optional[Union[str, timedelta]] = None,
+        direction: str = "backward",
+        lookback: str = "30d",
+        **filters: Any,
+    ) -> OECject:
+        """Run several commands and join their results per key, as of a date.
+
+        The first command is the base: every other command's rows are matched
+        to each base row with the same key, taking the last row at or before
+        its `asof` time (sides without that column are joined on the key
+        alone). Commands run concurrently and go through the result cache.
+
+        Args:
+            sides: Command paths, or JoinSide for per-side parameters, column
+                selection and aggregation.
+            on: Key column(s), e.g. "sku".
+            asof: Time column, or None for plain key joins.
+            provider: The data provider to use for every side.
+            tolerance: Maximum age of an as-of match, e.g. "7d".
+            direction: "backward" (last known value), "forward" or "nearest".
+            lookback: How far before the requested window the other sides are
+                fetched so earlier values can still match; defaults to the
+                tolerance when one is given.
+            **filters: Shared parameters (sku, category, period, start_date, ...).
+                Each is passed to the commands that accept it and applied as a
+                column filter to the others.
+
+        Returns:
+            OECject whose results are one record per base row.
+        """
+        from openec_platform.core.joins import run_join
+
+        return run_join(
+            self, sides, on=on, asof=asof, provider=provider, tolerance=tolerance,
+            direction=direction, lookback=lookback, **filters,
+        )
+
+    def cache_key(self, path: str, provider: str = "demo", **kwargs: Any) -> str:
+        """Result cache key of a command call, with the command's defaults filled in."""
+        return ResultCache.make_key(path, provider, self._canonical_params(self.get_command(path), kwargs))
+
+    def command_ttl(self, cmd: CommandInfo) -> int:
+        """Effective cache TTL for a command."""
+        return self.default_ttl if cmd.ttl is None else cmd.ttl
+
+    def get_command(self, path: str) -> CommandInfo:
+        """Look up a registered command, raising KeyError with the available paths."""
         commands = self.router.get_all_commands()
         if path not in commands:
             available = "\n  ".join(sorted(commands.keys()))
             raise KeyError(f"Command '{path}' not found. Available:\n  {available}")
+        return commands[path]
+
+    @staticmethod
+    def _canonical_params(cmd: CommandInfo, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in the command's declared defaults so equivalent calls share a cache key."""
+        params = {
+            name: p.default
+            for name, p in inspect.signature(cmd.func).parameters.items()
+            if name != "provider" and p.default is not inspect.Parameter.empty
+        }
+        params.update(kwargs)
+        return params
 
-        cmd = commands[path]
+    def _execute(self, cmd: CommandInfo, provider: str, **kwargs: Any) -> OECject:
+        """Run a command with canonical parameters (the command's defaults filled in)."""
         model_name = cmd.model
+        target_currency = kwargs.pop("target_currency", None)
 
         if model_name and cmd.provider_choices:
             fetcher = registry.get_fetcher(provider, model_name)
             params = QueryParams(provider=provider, **kwargs)
-            raw = fetcher.fetch(params, **kwargs)
-            results = fetcher.transform(raw, **kwargs)
+            raw = self._fetch(cmd, fetcher, provider, params, **kwargs)
+            offload = self.executor is not None and (cmd.cpu_bound or fetcher.cpu_bound)
+            if offload and isinstance(raw, list) and raw:
+                results = self.executor.run_transform(fetcher, raw, **kwargs)
+            elif self.executor is not None and getattr(fetcher, "uses_executor", False):
+                results = fetcher.transform(raw, executor=self.executor, **kwargs)
+            else:
+                results = fetcher.transform(raw, **kwargs)
+        elif self.executor is not None and cmd.cpu_bound:
+            results = self.executor.run_callable(cmd.func, **kwargs)
         else:
             # Direct function call (no provider needed)
             results = cmd.func(**kwargs)
 
+        if target_currency and isinstance(results, list):
+            from openec_platform.core.currency import default_rate_source, normalize_results
+
+            source = self.rate_source if self.rate_source is not None else default_rate_source()
+            results = normalize_results(results, target_currency, source)
+
         return OECject(
             results=results,
             provider=provider,
             model=model_name or "",
-            command=path,
+            command=cmd.path,
         )
 
+    def _fetch(
+        self, cmd: CommandInfo, fetcher: ProviderFetcher, provider: str, params: QueryParams, **kwargs: Any
+    ) -> Any:
+        """Fetch raw records, sharding the date range when the fetcher supports it."""
+        windows = self._windows(cmd, fetcher, kwargs)
+        if windows is not None:
+            return fetch_sharded(
+                fetcher,
+                registry.get(provider),
+                cmd.model or "",
+                params,
+                (windows[0][0], windows[-1][1]),
+                checkpoint_dir=self.checkpoint_dir,
+                **kwargs,
+            )
+        return fetcher.fetch(params, **kwargs)
+
+    def _windows(self, cmd: CommandInfo, fetcher: ProviderFetcher, kwargs: Dict[str, Any]) -> Optional[List[Window]]:
+        """Date windows of a shardable fetch, or None when it is fetched in one go."""
+        if not fetcher.shardable:
+            return None
+        window_range = resolve_date_range(self._canonical_params(cmd, kwargs))
+        if not window_range:
+            return None
+        windows = split_windows(*window_range, max(int(fetcher.shard_days), 1))
+        return windows if len(windows) > 1 else None
+
     def list_commands(self) -> list[str]:
         """List all available command paths."""
         return self.router.list_routes()
+
+    def close(self) -> None:
+        """Shut down the process pool, if any."""
+        if self.executor is not None:
+            self.executor.shutdown()
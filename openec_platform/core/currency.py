@@ -0,0 +1,275 @@
+"""Currency normalization - convert monetary fields of results to one currency.
+
+Rows fanned in from several marketplaces carry their own currency (EUR from
+Amazon DE, GBP from Amazon UK, ...) and cannot be summed as they are. Models
+declare which fields are money:
+
+    class SalesHistorical(StandardModel):
+        monetary_fields: ClassVar[Tuple[str, ...]] = ("revenue", "average_selling_price")
+
+and `normalize_results` converts those fields to a target currency with the
+rate in effect on each row's date (the last known rate at or before it).
+Rates come from a pluggable `RateSource`; tables are loaded once per source
+and date window and kept in memory, and the lookup is a sorted search per
+currency over whole columns. The runner applies it when a command is run
+with `target_currency`:
+
+    runner = CommandRunner(router, rate_source=FileRateSource("fx_rates.csv"))
+    runner.run("/products/sales/historical", target_currency="EUR")
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.core.provider_interface import StandardModel
+
+RATE_COLUMNS = ["date", "currency", "rate"]
+# File used by `default_rate_source` when no source is configured.
+RATES_ENV = "OPENEC_FX_RATES"
+
+
+class RateSource(ABC):
+    """Source of daily exchange rates.
+
+    Rates are quoted as units of `base` per one unit of the currency, e.g.
+    1.08 for EUR when the base is USD.
+    """
+
+    base: str = "USD"
+
+    def version(self) -> float:
+        """Changes whenever the rates change, so cached tables are reloaded."""
+        return 0.0
+
+    @abstractmethod
+    def load(self, currencies: Sequence[str], start: date, end: date) -> pd.DataFrame:
+        """Rates for `currencies` between `start` and `end`.
+
+        Returns:
+            DataFrame with date, currency and rate columns. The latest rate
+            before `start` should be included when there is none on `start`.
+        """
+        ...
+
+
+class StaticRateSource(RateSource):
+    """Fixed rates, e.g. {"EUR": 1.08, "GBP": 1.27} against a USD base."""
+
+    def __init__(self, rates: Dict[str, float], base: str = "USD") -> None:
+        self.rates = dict(rates)
+        self.base = base
+
+    def load(self, currencies: Sequence[str], start: date, end: date) -> pd.DataFrame:
+        known = [c for c in currencies if c in self.rates]
+        return pd.DataFrame({
+            "date": [date(1970, 1, 1)] * len(known),
+            "currency": known,
+            "rate": [self.rates[c] for c in known],
+        })
+
+
+class FileRateSource(RateSource):
+    """Rates from a local CSV (date,currency,rate) or JSON lines file.
+
+    The file is re-read when it changes on disk.
+    """
+
+    def __init__(self, path: Union[str, Path], base: str = "USD") -> None:
+        self.path = Path(path)
+        self.base = base
+        self._frame: Optional[pd.DataFrame] = None
+        self._mtime = 0.0
+        self._lock = threading.Lock()
+
+    def _read(self) -> pd.DataFrame:
+        mtime = self.path.stat().st_mtime
+        with self._lock:
+            if self._frame is None or mtime != self._mtime:
+                if self.path.suffix in (".json", ".jsonl", ".ndjson"):
+                    frame = pd.read_json(self.path, lines=True, dtype={"currency": str})
+                else:
+                    frame = pd.read_csv(self.path, dtype={"currency": str})
+                missing = set(RATE_COLUMNS) - set(frame.columns)
+                if missing:
+                    raise ValueError(f"{self.path} is missing rate columns {sorted(missing)}")
+                frame["date"] = pd.to_datetime(frame["date"], format="ISO8601").dt.date
+                self._frame, self._mtime = frame[RATE_COLUMNS], mtime
+            return self._frame
+
+    def version(self) -> float:
+        return self.path.stat().st_mtime
+
+    def load(self, currencies: Sequence[str], start: date, end: date) -> pd.DataFrame:
+        frame = self._read()
+        frame = frame[frame["currency"].isin(currencies) & (frame["date"] <= end)]
+        # Keep the last rate before the window so its first days have one.
+        before = frame[frame["date"] < start].sort_values("date").groupby("currency").tail(1)
+        return pd.concat([before, frame[frame["date"] >= start]], ignore_index=True)
+
+
+class RateTable:
+    """Per-currency rate series sorted by date, for as-of lookups."""
+
+    def __init__(self, rates: pd.DataFrame, base: str = "USD") -> None:
+        self.base = base
+        self._series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        frame = rates.assign(date=pd.to_datetime(rates["date"]).to_numpy(dtype="datetime64[D]"))
+        for currency, group in frame.sort_values("date", kind="stable").groupby("currency", sort=False):
+            self._series[str(currency)] = (
+                group["date"].to_numpy(dtype="datetime64[D]").astype(np.int64),
+                group["rate"].to_numpy(dtype=float),
+            )
+
+    def currencies(self) -> List[str]:
+        return [self.base, *self._series]
+
+    def rates(self, currencies: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """Units of base per unit of each row's currency, as of each row's date.
+
+        Dates before a currency's first rate use that first rate.
+
+        Raises:
+            ValueError: A currency has no rates.
+        """
+        out = np.ones(len(currencies))
+        days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+        codes, uniques = pd.factorize(np.asarray(currencies, dtype=object))
+        for i, currency in enumerate(uniques):
+            if currency == self.base:
+                continue
+            if currency not in self._series:
+                raise ValueError(f"No exchange rates for {currency}")
+            rows = codes == i
+            series_days, series_rates = self._series[currency]
+            position = np.searchsorted(series_days, days[rows], side="right") - 1
+            out[rows] = series_rates[np.maximum(position, 0)]
+        return out
+
+
+class RateCache:
+    """Rate tables kept in memory per source, reloaded only for wider windows or new currencies."""
+
+    def __init__(self) -> None:
+        self._tables: "weakref.WeakKeyDictionary[RateSource, Tuple[float, frozenset, date, date, RateTable]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def table(self, source: RateSource, currencies: Sequence[str], start: date, end: date) -> RateTable:
+        wanted = frozenset(c for c in currencies if c != source.base)
+        version = source.version()
+        with self._lock:
+            cached = self._tables.get(source)
+        if cached is not None and cached[0] == version:
+            _, held, first, last, table = cached
+            if wanted <= held and first <= start and end <= last:
+                return table
+            wanted, start, end = wanted | held, min(start, first), max(end, last)
+        table = RateTable(source.load(sorted(wanted), start, end), base=source.base)
+        with self._lock:
+            self._tables[source] = (version, wanted, start, end, table)
+        return table
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+
+_rate_cache = RateCache()
+_file_sources: Dict[str, FileRateSource] = {}
+
+
+def default_rate_source() -> RateSource:
+    """The rate file named by the OPENEC_FX_RATES environment variable."""
+    path = os.environ.get(RATES_ENV)
+    if not path:
+        raise ValueError(
+            f"Currency conversion needs exchange rates: pass a rate_source or set {RATES_ENV} to a rates file"
+        )
+    if path not in _file_sources:
+        _file_sources[path] = FileRateSource(path)
+    return _file_sources[path]
+
+
+def convert_frame(
+    frame: pd.DataFrame,
+    fields: Sequence[str],
+    target: str,
+    source: RateSource,
+    date_column: str = "date",
+    currency_column: str = "currency",
+    cache: Optional[RateCache] = None,
+) -> pd.DataFrame:
+    """Convert monetary columns of a frame to `target` currency.
+
+    Args:
+        frame: Rows with a currency column (missing values mean the source's base).
+        fields: Monetary columns to convert.
+        target: Currency code to convert to.
+        source: Where the rates come from.
+        date_column: Column giving each row's rate date. Rows without one use
+            today's rate.
+        currency_column: Column holding each row's currency.
+        cache: Rate table cache; defaults to a process-wide cache.
+
+    Returns:
+        A copy of `frame` with converted fields and currency set to `target`.
+    """
+    fields = [f for f in fields if f in frame]
+    if frame.empty or not fields:
+        return frame
+    cache = cache if cache is not None else _rate_cache
+    currencies = (
+        frame[currency_column].fillna(source.base).astype(str).str.upper().to_numpy(dtype=object)
+        if currency_column in frame else np.full(len(frame), source.base, dtype=object)
+    )
+    if date_column in frame:
+        dates = pd.to_datetime(frame[date_column], format="mixed", utc=True).dt.tz_localize(None)
+        dates = dates.fillna(pd.Timestamp(date.today())).to_numpy(dtype="datetime64[D]")
+    else:
+        dates = np.full(len(frame), np.datetime64(date.today(), "D"))
+    target = target.upper()
+    if (currencies == target).all():
+        return frame.assign(**{currency_column: target})
+
+    start, end = pd.Timestamp(dates.min()).date(), pd.Timestamp(dates.max()).date()
+    table = cache.table(source, [*pd.unique(currencies), target], start - timedelta(days=7), end)
+    factor = table.rates(currencies, dates) / table.rates(np.full(len(frame), target, dtype=object), dates)
+    converted = {f: pd.to_numeric(frame[f], errors="coerce").to_numpy(dtype=float) * factor for f in fields}
+    return frame.assign(**converted, **{currency_column: target})
+
+
+def normalize_results(
+    results: List[StandardModel], target: str, source: RateSource, cache: Optional[RateCache] = None
+) -> List[StandardModel]:
+    """Convert the monetary fields of standard model results to `target` currency.
+
+    Results of models without `monetary_fields` are returned unchanged.
+    """
+    if not results:
+        return results
+    by_model: Dict[type, List[int]] = {}
+    for i, row in enumerate(results):
+        by_model.setdefault(type(row), []).append(i)
+    out = list(results)
+    for model, positions in by_model.items():
+        fields = getattr(model, "monetary_fields", ())
+        if not fields:
+            continue
+        frame = pd.DataFrame([results[i].model_dump() for i in positions])
+        converted = convert_frame(frame, fields, target, source, cache=cache)
+        converted = converted.astype(object).where(converted.notna(), None)
+        for i, row in zip(positions, converted.to_dict("records")):
+            out[i] = model(**row)
+    return out
+
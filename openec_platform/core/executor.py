@@ -0,0 +1,303 @@
+"""Process-pool execution for CPU-bound transforms and analytics.
+
+Work is shipped to a managed pool of worker processes as columnar buffers in
+shared memory instead of pickled lists of dicts: every column of a DataFrame
+becomes one or two flat buffers (values, plus offsets for strings or a null
+mask), and only a small descriptor of names, dtypes and lengths is pickled.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, datetime
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+Buffer = Tuple[str, str, Tuple[int, ...]]  # shared memory name, dtype, shape
+
+
+def _to_shared(array: np.ndarray, blocks: List[shared_memory.SharedMemory]) -> Buffer:
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block.name, array.dtype.str, array.shape
+
+
+def _from_shared(buffer: Buffer, blocks: List[shared_memory.SharedMemory]) -> np.ndarray:
+    name, dtype, shape = buffer
+    block = shared_memory.SharedMemory(name=name)
+    blocks.append(block)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf).copy()
+
+
+def _pack_column(values: pd.Series, blocks: List[shared_memory.SharedMemory]) -> Dict[str, Any]:
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        return {"kind": "array", "data": _to_shared(values.to_numpy(), blocks)}
+
+    sample = values.dropna()
+    first = sample.iloc[0] if len(sample) else ""
+    nulls = values.isna().to_numpy()
+    if isinstance(first, datetime) and sample.map(lambda v: isinstance(v, datetime)).all():
+        try:
+            stamps = pd.DatetimeIndex(pd.to_datetime(values))
+        except (TypeError, ValueError):
+            stamps = None  # several time zones in one column
+        if stamps is not None:
+            # Time zone aware values travel as UTC nanoseconds and are converted back.
+            naive = stamps.tz_convert(None) if stamps.tz is not None else stamps
+            return {
+                "kind": "datetime",
+                "data": _to_shared(naive.as_unit("ns").asi8, blocks),
+                "nulls": _to_shared(nulls, blocks),
+                "tz": stamps.tz,
+            }
+    if isinstance(first, date) and not isinstance(first, datetime) and sample.map(type).eq(type(first)).all():
+        days = np.array(
+            [np.datetime64(v, "D") if v is not None and v == v else np.datetime64("NaT") for v in values],
+            dtype="datetime64[D]",
+        )
+        return {"kind": "date", "data": _to_shared(days, blocks), "nulls": _to_shared(nulls, blocks)}
+    if isinstance(first, str) and sample.map(type).eq(str).all():
+        encoded = [v.encode() if isinstance(v, str) else b"" for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(v) for v in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return {
+            "kind": "string",
+            "data": _to_shared(data, blocks),
+            "offsets": _to_shared(offsets, blocks),
+            "nulls": _to_shared(nulls, blocks),
+        }
+    # Nested or mixed values (lists, dicts) fall back to pickling.
+    return {"kind": "object", "values": values.tolist()}
+
+
+def _unpack_column(spec: Dict[str, Any], blocks: List[shared_memory.SharedMemory]) -> Any:
+    kind = spec["kind"]
+    if kind == "array":
+        return _from_shared(spec["data"], blocks)
+    if kind == "object":
+        return spec["values"]
+    nulls = _from_shared(spec["nulls"], blocks)
+    if kind == "datetime":
+        stamps = pd.DatetimeIndex(_from_shared(spec["data"], blocks).view("datetime64[ns]"))
+        if spec["tz"] is not None:
+            stamps = stamps.tz_localize("UTC").tz_convert(spec["tz"])
+        return [None if null else value for value, null in zip(stamps, nulls)]
+    if kind == "date":
+        days = _from_shared(spec["data"], blocks).astype(object)
+        return [None if null else value for value, null in zip(days, nulls)]
+    data = _from_shared(spec["data"], blocks).tobytes()
+    offsets = _from_shared(spec["offsets"], blocks)
+    return [
+        None if nulls[i] else data[offsets[i]:offsets[i + 1]].decode()
+        for i in range(len(offsets) - 1)
+    ]
+
+
+def pack_frame(frame: pd.DataFrame, blocks: List[shared_memory.SharedMemory]) -> Dict[str, Any]:
+    """Copy a DataFrame's columns into shared memory and return their descriptor."""
+    return {
+        "columns": [str(c) for c in frame.columns],
+        "length": len(frame),
+        "specs": [_pack_column(frame[c], blocks) for c in frame.columns],
+    }
+
+
+def unpack_frame(descriptor: Dict[str, Any], blocks: List[shared_memory.SharedMemory]) -> pd.DataFrame:
+    """Rebuild a DataFrame from a descriptor produced by `pack_frame`."""
+    columns = {
+        name: _unpack_column(spec, blocks)
+        for name, spec in zip(descriptor["columns"], descriptor["specs"])
+    }
+    return pd.DataFrame(columns, index=pd.RangeIndex(descriptor["length"]), columns=descriptor["columns"])
+
+
+def _release(blocks: List[shared_memory.SharedMemory], unlink: bool) -> None:
+    for block in blocks:
+        block.close()
+        if unlink:
+            block.unlink()
+
+
+def _run_frame_task(func: Callable[..., pd.DataFrame], descriptor: Dict[str, Any], kwargs: Dict[str, Any]) -> Any:
+    """Worker entry point: unpack the input, run `func`, pack the output."""
+    inputs: List[shared_memory.SharedMemory] = []
+    try:
+        frame = unpack_frame(descriptor, inputs)
+    finally:
+        _release(inputs, unlink=False)
+    result = func(frame, **kwargs)
+    if not isinstance(result, pd.DataFrame):
+        return {"pickled": result}
+    outputs: List[shared_memory.SharedMemory] = []
+    packed = pack_frame(result, outputs)
+    # The parent unlinks the output blocks once it has copied them.
+    _release(outputs, unlink=False)
+    return packed
+
+
+def _run_transform_task(fetcher: Any, descriptor: Dict[str, Any], kwargs: Dict[str, Any]) -> Any:
+    """Worker entry point for a fetcher's transform() over columnar raw records."""
+    inputs: List[shared_memory.SharedMemory] = []
+    try:
+        frame = unpack_frame(descriptor, inputs)
+    finally:
+        _release(inputs, unlink=False)
+    records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    models = fetcher.transform(records, **kwargs)
+    if not isinstance(models, list) or not models or any(type(m) is not type(models[0]) for m in models):
+        return {"pickled": models}
+    outputs: List[shared_memory.SharedMemory] = []
+    packed = pack_frame(pd.DataFrame([m.model_dump() for m in models]), outputs)
+    _release(outputs, unlink=False)
+    packed["model"] = type(models[0])
+    return packed
+
+
+class ProcessExecutor:
+    """Managed process pool for CPU-bound work.
+
+    Usage:
+        executor = ProcessExecutor(max_workers=4, timeout=60)
+        out = executor.run_frame(compute_cohorts, orders_df, period="monthly")
+
+    `func` must be a module-level function taking and returning a DataFrame.
+    A task exceeding its timeout raises TimeoutError and the pool is recycled,
+    since a running worker cannot be interrupted any other way.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        mp_context: str = "spawn",
+    ) -> None:
+        """Initialize the executor.
+
+        Args:
+            max_workers: Pool size. Defaults to the number of CPUs.
+            timeout: Default per-task timeout in seconds.
+            mp_context: multiprocessing start method for the workers.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.mp_context = mp_context
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.mp_context),
+                )
+            return self._pool
+
+    def _recycle(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # No public API kills a busy worker; terminate them directly.
+            for process in list(getattr(pool, "_processes", {}).values()):
+                process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(
+        self, entry: Callable, target: Any, frame: pd.DataFrame, kwargs: Dict[str, Any]
+    ) -> Tuple[Future, List[shared_memory.SharedMemory]]:
+        blocks: List[shared_memory.SharedMemory] = []
+        descriptor = pack_frame(frame, blocks)
+        try:
+            return self._get_pool().submit(entry, target, descriptor, kwargs), blocks
+        except Exception:
+            _release(blocks, unlink=True)
+            raise
+
+    def _wait(self, future: Future, timeout: Optional[float]) -> Any:
+        timeout = timeout if timeout is not None else self.timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._recycle()
+            raise TimeoutError(f"Task exceeded {timeout}s and was terminated")
+
+    def _collect(self, future: Future, blocks: List[shared_memory.SharedMemory], timeout: Optional[float]) -> Any:
+        try:
+            result = self._wait(future, timeout)
+        finally:
+            _release(blocks, unlink=True)
+        if "pickled" in result:
+            return result["pickled"]
+        outputs: List[shared_memory.SharedMemory] = []
+        try:
+            frame = unpack_frame(result, outputs)
+        finally:
+            _release(outputs, unlink=True)
+        if result.get("model") is not None:
+            frame.attrs["model"] = result["model"]
+        return frame
+
+    def run_frame(
+        self,
+        func: Callable[..., pd.DataFrame],
+        frame: pd.DataFrame,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run `func(frame, **kwargs)` in a worker process."""
+        future, blocks = self._submit(_run_frame_task, func, frame, kwargs)
+        return self._collect(future, blocks, timeout)
+
+    def map_frames(
+        self,
+        func: Callable[..., pd.DataFrame],
+        frames: Sequence[pd.DataFrame],
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[Any]:
+        """Run `func` over several frames in parallel, preserving order."""
+        submitted = [self._submit(_run_frame_task, func, frame, kwargs) for frame in frames]
+        return [self._collect(future, blocks, timeout) for future, blocks in submitted]
+
+    def run_callable(self, func: Callable[..., Any], timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Run a module-level function in a worker; arguments and result are pickled."""
+        return self._wait(self._get_pool().submit(func, **kwargs), timeout)
+
+    def run_transform(
+        self,
+        fetcher: Any,
+        records: List[Dict[str, Any]],
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run `fetcher.transform(records, **kwargs)` in a worker process.
+
+        Models are rebuilt in the parent with `model_validate`, which restores
+        nested models and field types that the columnar transfer loses (e.g.
+        integers in a column with missing values come back as floats).
+        """
+        future, blocks = self._submit(_run_transform_task, fetcher, pd.DataFrame(records), kwargs)
+        result = self._collect(future, blocks, timeout)
+        if not isinstance(result, pd.DataFrame):
+            return result
+        model = result.attrs.get("model")
+        rows = result.astype(object).where(result.notna(), None).to_dict("records")
+        return [model.model_validate(row) for row in rows]
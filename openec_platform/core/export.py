@@ -0,0 +1,154 @@
+"""Streaming export of command results to CSV, NDJSON, Parquet and Arrow.
+
+Writers consume record batches (as yielded by `CommandRunner.stream`) and
+write each batch as it arrives, so an export never holds more than one batch
+and never builds a DataFrame:
+
+    with open("sales.parquet", "wb") as out:
+        rows = write_batches(runner.stream("/products/sales/historical", period="2y"), "parquet", out)
+
+CSV and NDJSON use the standard library. Parquet and Arrow (IPC file format)
+need pyarrow; the schema is taken from the first batch, and columns that are
+empty there are written as strings.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import sys
+from datetime import date, datetime
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet", "arrow")
+BINARY_FORMATS = ("parquet", "arrow")
+
+Batch = List[Dict[str, Any]]
+
+
+def record_batches(results: Any, batch_size: int = 10_000) -> Iterator[Batch]:
+    """Standard model results (a list or a single model) as batches of plain dicts."""
+    if results is None:
+        return
+    if not isinstance(results, list):
+        results = [results]
+    batch_size = max(batch_size, 1)
+    for i in range(0, len(results), batch_size):
+        yield [r.model_dump() if hasattr(r, "model_dump") else r for r in results[i:i + batch_size]]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _cell(value: Any) -> Any:
+    """CSV cell: nested values as JSON, missing values empty."""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    return value
+
+
+def _write_csv(batches: Iterable[Batch], out: IO[str]) -> int:
+    writer: Optional[csv.DictWriter] = None
+    rows = 0
+    for batch in batches:
+        if not batch:
+            continue
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(batch[0]), restval="", extrasaction="ignore")
+            writer.writeheader()
+        writer.writerows({k: _cell(v) for k, v in row.items()} for row in batch)
+        rows += len(batch)
+    return rows
+
+
+def _write_ndjson(batches: Iterable[Batch], out: IO[str]) -> int:
+    rows = 0
+    for batch in batches:
+        out.write("".join(json.dumps(row, default=_json_default) + "\n" for row in batch))
+        rows += len(batch)
+    return rows
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImportError("pyarrow is required: pip install pyarrow")
+    return pa
+
+
+def _write_arrow(batches: Iterable[Batch], out: IO[bytes], fmt: str) -> int:
+    pa = _pyarrow()
+    writer: Any = None
+    schema: Any = None
+    as_text: List[str] = []
+    rows = 0
+    try:
+        for batch in batches:
+            if not batch:
+                continue
+            if schema is None:
+                inferred = pa.Table.from_pylist(batch).schema
+                # A column that is empty in the first batch has no type yet.
+                as_text = [f.name for f in inferred if pa.types.is_null(f.type)]
+                schema = pa.schema([pa.field(f.name, pa.string()) if f.name in as_text else f for f in inferred])
+                writer = pa.parquet.ParquetWriter(out, schema) if fmt == "parquet" else pa.ipc.new_file(out, schema)
+            if as_text:
+                batch = [
+                    {**row, **{k: None if row.get(k) is None else str(row[k]) for k in as_text}} for row in batch
+                ]
+            table = pa.Table.from_pylist(batch, schema=schema)
+            writer.write_table(table)
+            rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_batches(batches: Iterable[Batch], fmt: str, out: IO[Any]) -> int:
+    """Write record batches to an open file in an export format.
+
+    Args:
+        batches: Lists of record dicts, e.g. from `CommandRunner.stream`.
+        fmt: One of EXPORT_FORMATS.
+        out: Text stream for csv/ndjson, binary stream for parquet/arrow.
+
+    Returns:
+        Number of records written.
+
+    Raises:
+        ValueError: Unknown format.
+        ImportError: pyarrow is missing for parquet/arrow.
+    """
+    if fmt == "csv":
+        return _write_csv(batches, out)
+    if fmt == "ndjson":
+        return _write_ndjson(batches, out)
+    if fmt in BINARY_FORMATS:
+        return _write_arrow(batches, out, fmt)
+    raise ValueError(f"Unknown export format '{fmt}'; expected one of {list(EXPORT_FORMATS)}")
+
+
+def export_to(batches: Iterable[Batch], fmt: str, path: Optional[str] = None) -> int:
+    """Write record batches to `path`, or to stdout when no path is given.
+
+    Returns:
+        Number of records written.
+    """
+    if path is None:
+        if fmt in BINARY_FORMATS:
+            return write_batches(batches, fmt, sys.stdout.buffer)
+        return write_batches(batches, fmt, sys.stdout)
+    if fmt in BINARY_FORMATS:
+        _pyarrow()  # fail before creating the file
+        with open(path, "wb") as out:
+            return write_batches(batches, fmt, out)
+    with open(path, "w", newline="", encoding="utf-8") as text:
+        return write_batches(batches, fmt, text)
@@ -0,0 +1,218 @@
+"""Cross-model joins - line up several commands' results per key and date.
+
+Pricing analysis needs competitor prices, own prices, sales and inventory side
+by side per SKU and day, but each comes from a different command and the
+competitor prices are scraped at irregular times. `CommandRunner.join` runs
+the commands concurrently and joins their results onto the first one:
+
+    runner.join(
+        ["/pricing/history/historical",
+         JoinSide("/pricing/competitor/current", name="competitor", agg={"price": "min"}),
+         "/products/sales/historical",
+         "/inventory/levels/current"],
+        on="sku", asof="date", tolerance="7d", sku="EC-1001", period="90d",
+    )
+
+Sides with the `asof` column are as-of joined: each row of the first side gets
+the last row of the other side at or before its date (a sorted merge per key).
+Sides without it, such as current inventory snapshots, are joined on the key
+alone. Filters are pushed to each side's command when it accepts them and
+otherwise applied to the side's rows before joining.
+"""
+
+from __future__ import annotations
+
+import inspect
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union
+
+from openec_platform.core.oecject import OECject
+from openec_platform.core.sharding import resolve_date_range
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from openec_platform.core.command_runner import CommandRunner
+
+# Parameters every shardable fetcher understands, whether or not the command declares them.
+DATE_PARAMS = ("start_date", "end_date", "period")
+
+
+@dataclass
+class JoinSide:
+    """One command taking part in a join.
+
+    Attributes:
+        path: Command path.
+        params: Parameters for this side only, on top of the shared filters.
+        name: Prefix for this side's columns. Defaults to the model name in snake case.
+        columns: Columns to keep (besides the join keys). All if omitted.
+        agg: Aggregations applied per key and date before joining, e.g.
+            {"price": "min"} for the cheapest competitor. Without it the last
+            row per key and date is kept.
+    """
+
+    path: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    name: str = ""
+    columns: Optional[List[str]] = None
+    agg: Optional[Dict[str, str]] = None
+
+
+def _timedelta(value: Union[str, timedelta]) -> pd.Timedelta:
+    """Parse "7d", "12h" or a timedelta."""
+    import pandas as pd
+
+    if isinstance(value, str):
+        value = re.sub(r"(?<=\d)\s*d\b", "D", value.strip())
+    return pd.Timedelta(value)
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _prepare(
+    frame: pd.DataFrame, side: JoinSide, keys: List[str], asof: Optional[str], prefix: str
+) -> pd.DataFrame:
+    """Reduce a side to one row per key (and date) with prefixed value columns."""
+    import pandas as pd
+
+    has_time = asof is not None and asof in frame
+    group = keys + ([asof] if has_time else [])
+    if has_time:
+        frame = frame.assign(**{asof: pd.to_datetime(frame[asof], format="ISO8601")})
+    values = [c for c in (side.columns or frame.columns) if c in frame and c not in group]
+    frame = frame[group + values]
+    if side.agg:
+        frame = frame.groupby(group, as_index=False, sort=False).agg(side.agg)
+    elif frame.duplicated(group).any():
+        frame = frame.drop_duplicates(group, keep="last")
+    if prefix:
+        frame = frame.rename(columns={c: f"{prefix}_{c}" for c in frame.columns if c not in keys})
+    return frame
+
+
+def asof_join(
+    frames: Sequence[pd.DataFrame],
+    sides: Sequence[JoinSide],
+    on: Union[str, Sequence[str]] = "sku",
+    asof: Optional[str] = "date",
+    tolerance: Optional[Union[str, timedelta]] = None,
+    direction: str = "backward",
+) -> pd.DataFrame:
+    """Join frames onto the first one by key, as of the `asof` column where present.
+
+    Args:
+        frames: One DataFrame per side; the first is the base.
+        sides: The matching JoinSide definitions (names, columns, aggregations).
+        on: Key column(s) present in every frame.
+        asof: Time column for as-of matching, or None for exact key joins only.
+        tolerance: Maximum age of an as-of match, e.g. "7d". Unlimited if omitted.
+        direction: "backward" (last known value), "forward" or "nearest".
+
+    Returns:
+        The base rows in key and time order, with every other side's columns
+        prefixed by its name. As-of sides keep their own timestamp as
+        "<name>_<asof>", showing how stale each match is.
+    """
+    import pandas as pd
+
+    keys = [on] if isinstance(on, str) else list(on)
+    tolerance = _timedelta(tolerance) if tolerance is not None else None
+
+    base = frames[0]
+    missing = [k for k in keys if k not in base]
+    if missing:
+        raise KeyError(f"Join keys {missing} not found in {sides[0].path}")
+    base = base.assign(**{k: base[k].astype(str) for k in keys})
+    timed = asof is not None and asof in base
+    if timed:
+        base = base.assign(_asof=pd.to_datetime(base[asof], format="ISO8601")).sort_values("_asof", kind="stable")
+
+    for frame, side in zip(frames[1:], sides[1:]):
+        if frame.empty or any(k not in frame for k in keys):
+            continue
+        frame = frame.assign(**{k: frame[k].astype(str) for k in keys})
+        prefix = side.name
+        right = _prepare(frame, side, keys, asof, prefix)
+        stamp = f"{prefix}_{asof}" if prefix else asof
+        if timed and asof in frame:
+            right = right.assign(_asof=right[stamp]).sort_values("_asof", kind="stable")
+            base = pd.merge_asof(
+                base, right, on="_asof", by=keys, tolerance=tolerance, direction=direction, allow_exact_matches=True
+            )
+        else:
+            base = base.merge(right, on=keys, how="left")
+
+    if timed:
+        base = base.sort_values(keys + ["_asof"], kind="stable").drop(columns="_asof")
+    return base.reset_index(drop=True)
+
+
+def run_join(
+    runner: CommandRunner,
+    sides: Sequence[Union[str, JoinSide]],
+    on: Union[str, Sequence[str]] = "sku",
+    asof: Optional[str] = "date",
+    provider: str = "demo",
+    tolerance: Optional[Union[str, timedelta]] = None,
+    direction: str = "backward",
+    lookback: str = "30d",
+    **filters: Any,
+) -> OECject:
+    """Run several commands and join their results; see `CommandRunner.join`."""
+    if not sides:
+        raise ValueError("join needs at least one command")
+    sides = [JoinSide(s) if isinstance(s, str) else s for s in sides]
+    commands = [runner.get_command(side.path) for side in sides]
+    names = [
+        side.name or _snake_case(cmd.model or cmd.path.strip("/").replace("/", "_"))
+        for side, cmd in zip(sides, commands)
+    ]
+    sides = [replace(side, name="" if i == 0 else name) for i, (side, name) in enumerate(zip(sides, names))]
+
+    window = resolve_date_range(filters)
+    calls = []
+    for i, (side, cmd) in enumerate(zip(sides, commands)):
+        accepted = set(inspect.signature(cmd.func).parameters)
+        pushed = {k: v for k, v in filters.items() if k in accepted or k in DATE_PARAMS}
+        if i and window and asof:
+            # Values known before the window still apply to its first days.
+            start = window[0] - _timedelta(tolerance if tolerance is not None else lookback).to_pytimedelta()
+            pushed = {k: v for k, v in pushed.items() if k not in DATE_PARAMS}
+            pushed.update(start_date=start.isoformat(), end_date=window[1].isoformat())
+        local = {k: v for k, v in filters.items() if k not in pushed and k not in DATE_PARAMS}
+        calls.append(({**pushed, **side.params}, local))
+
+    with ThreadPoolExecutor(max_workers=len(sides)) as pool:
+        results = list(pool.map(
+            lambda item: runner.run(item[0].path, provider=provider, **item[1][0]), zip(sides, calls)
+        ))
+
+    frames = []
+    warnings = []
+    for side, result, (_, local) in zip(sides, results, calls):
+        frame = result.to_dataframe()
+        # Filters the command could not take are applied to its rows.
+        for column, value in local.items():
+            if column in frame and value not in ("", None):
+                frame = frame[frame[column].astype(str) == str(value)]
+        if frame.empty:
+            warnings.append(f"{side.path} returned no rows")
+        frames.append(frame)
+        warnings.extend(result.warnings)
+
+    joined = asof_join(frames, sides, on=on, asof=asof, tolerance=tolerance, direction=direction)
+    joined = joined.astype(object).where(joined.notna(), None)
+    return OECject(
+        results=joined.to_dict("records"),
+        provider=provider,
+        model="+".join(cmd.model or "" for cmd in commands),
+        command="join(" + ", ".join(side.path for side in sides) + ")",
+        warnings=warnings,
+        extra={"on": on, "asof": asof, "sides": [side.name or side.path for side in sides]},
+    )
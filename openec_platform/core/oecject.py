@@ -6,6 +6,7 @@ providing a unified interface for data access, conversion, and visualization.
 
 from __future__ import annotations
 
+import hashlib
 import json
 from datetime import datetime
 from typing import Any, Dict, Generic, List, Optional, TypeVar, Union
@@ -69,15 +70,62 @@ class OECject(BaseModel, Generic[T]):
         """Serialize the full response to JSON."""
         return self.model_dump_json(indent=indent)
 
-    def to_chart(self, **kwargs: Any) -> Any:
-        """Generate a chart from the results (requires matplotlib or plotly)."""
+    def etag(self) -> str:
+        """Content hash of the results, stable across runs that return identical data.
+
+        The timestamp and warnings are excluded so that re-running a command whose
+        data has not changed yields the same value.
+        """
+        payload = self.model_dump_json(include={"results", "provider", "model", "command"})
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def to_chart(
+        self,
+        x: Optional[str] = None,
+        y: Optional[str] = None,
+        by: Optional[str] = None,
+        max_points: int = 1000,
+        max_series: int = 10,
+        method: str = "lttb",
+        agg: str = "sum",
+        **kwargs: Any,
+    ) -> Any:
+        """Generate a line chart from the results (requires matplotlib).
+
+        Rows are pivoted into one series per `by` value, the smallest series
+        beyond `max_series` are folded into "other", and each series is
+        downsampled to `max_points` before plotting (see core.charting).
+        Results without a date-like column are passed to `DataFrame.plot`.
+
+        Args:
+            x: Column for the x axis; defaults to timestamp/date/period.
+            y: Numeric column to plot; defaults to the first numeric column.
+            by: Column naming the series, e.g. "sku" or "channel".
+            max_points: Points kept per series, roughly the plot width in pixels.
+            max_series: Series drawn before the rest are folded into "other".
+            method: Downsampling method, "lttb" or "minmax".
+            agg: How rows sharing an x value and series combine: "sum" or "mean".
+            **kwargs: ax, title and figsize, plus options passed to `Axes.plot`.
+
+        Returns:
+            The matplotlib Axes.
+        """
+        from openec_platform.core.charting import X_COLUMNS, chart_series, plot_series
+
         df = self.to_dataframe()
         if df.empty:
             raise ValueError("No data to chart.")
-        try:
-            return df.plot(**kwargs)
-        except Exception as e:
-            raise RuntimeError(f"Charting failed: {e}")
+        if (x is None and not any(c in df for c in X_COLUMNS)) or kwargs.get("kind", "line") != "line":
+            columns = {k: v for k, v in (("x", x), ("y", y)) if v is not None}
+            try:
+                return df.plot(**columns, **kwargs)
+            except Exception as e:
+                raise RuntimeError(f"Charting failed: {e}")
+        kwargs.pop("kind", None)
+        series = chart_series(
+            df, x=x, y=y, by=by, max_points=max_points, max_series=max_series, method=method, agg=agg
+        )
+        return plot_series(series, **kwargs)
 
     def __repr__(self) -> str:
         count = len(self.results) if isinstance(self.results, list) else (1 if self.results else 0)
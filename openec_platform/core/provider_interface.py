@@ -6,9 +6,10 @@ Providers are discovered at runtime via Python entry points.
 
 from __future__ import annotations
 
+import inspect
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, Type
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple, Type
 
 from pydantic import BaseModel
 
@@ -18,8 +19,16 @@ class StandardModel(BaseModel):
 
     Standard models define the canonical schema for a data type.
     Providers map their raw data into these models.
+
+    Subclasses may declare `natural_key`, the fields that identify a row across
+    refreshes (e.g. sku + warehouse), used to diff successive snapshots, and
+    `monetary_fields`, the amounts in the row's `currency` that currency
+    normalization converts.
     """
 
+    natural_key: ClassVar[Tuple[str, ...]] = ()
+    monetary_fields: ClassVar[Tuple[str, ...]] = ()
+
     class Config:
         extra = "allow"
 
@@ -30,10 +39,12 @@ class QueryParams(BaseModel):
     provider: str = "demo"
 
 
-class ProviderFetcher(ABC):
-    """Abstract base for a single data fetcher within a provider.
+class RecordSource(ABC):
+    """Abstract base for anything that fetches raw records.
 
-    Each fetcher handles one standard model (e.g., SalesHistorical).
+    Sources that are never served as a standard model on their own (event
+    streams consumed only by an engine) subclass this directly and are passed
+    to a DerivedFetcher; fetchers registered for a model are ProviderFetchers.
     """
 
     @abstractmethod
@@ -41,12 +52,75 @@ class ProviderFetcher(ABC):
         """Fetch data from the source and return raw records."""
         ...
 
+
+class ProviderFetcher(RecordSource):
+    """Abstract base for a single data fetcher within a provider.
+
+    Each fetcher handles one standard model (e.g., SalesHistorical).
+
+    Fetchers backed by date-paginated APIs can set `shardable = True`: the runner
+    then splits long date ranges into windows of `shard_days` and calls fetch()
+    once per window with `start_date`/`end_date` keyword arguments.
+
+    Fetchers with heavy transform() work can set `cpu_bound = True` to have the
+    transform run in the runner's process pool, when one is configured.
+    """
+
+    shardable: bool = False
+    shard_days: int = 7
+    cpu_bound: bool = False
+
     @abstractmethod
     def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
         """Transform raw records into standard model instances."""
         ...
 
 
+SourceRecords = Dict[str, List[Dict[str, Any]]]
+
+
+class DerivedFetcher(ProviderFetcher):
+    """Fetcher that computes a standard model from other fetchers' raw records.
+
+    Some models are never handed out by a data source (cohort tables, RFM
+    segments, forecasts). A provider registers a DerivedFetcher for them: the
+    named sources (fetchers or RecordSources) supply raw records, and `engine` receives them as
+    pandas DataFrames keyword arguments together with the command parameters.
+
+    Usage:
+        provider.register_fetcher(
+            "CustomerCohort",
+            DerivedFetcher(cohort_retention, orders=ShopifyOrdersFetcher()),
+        )
+
+    Engines with an `executor` parameter (forecasting, sentiment scoring) are
+    passed the runner's process pool, when one is configured, and parallelize
+    their own work on it.
+    """
+
+    def __init__(self, engine: Callable[..., List[StandardModel]], **sources: RecordSource) -> None:
+        if not sources:
+            raise ValueError("DerivedFetcher needs at least one source fetcher")
+        self.engine = engine
+        self.sources = sources
+        try:
+            self.uses_executor = "executor" in inspect.signature(engine).parameters
+        except (TypeError, ValueError):
+            self.uses_executor = False
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> SourceRecords:  # type: ignore[override]
+        return {name: source.fetch(params, **kwargs) for name, source in self.sources.items()}
+
+    def transform(self, data: SourceRecords, **kwargs: Any) -> List[StandardModel]:  # type: ignore[override]
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("pandas is required: pip install pandas")
+
+        frames = {name: pd.DataFrame(records) for name, records in data.items()}
+        return self.engine(**frames, **kwargs)
+
+
 @dataclass
 class ProviderInfo:
     """Metadata and registry for a single provider."""
@@ -56,6 +130,8 @@ class ProviderInfo:
     website: str = ""
     credentials: List[str] = field(default_factory=list)
     fetchers: Dict[str, ProviderFetcher] = field(default_factory=dict)
+    max_concurrency: int = 4  # parallel requests when fetching sharded windows
+    rate_limit: Optional[float] = None  # requests per second, None for unlimited
 
     def register_fetcher(self, model_name: str, fetcher: ProviderFetcher) -> None:
         """Register a fetcher for a given standard model."""
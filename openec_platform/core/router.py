@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import inspect
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, Type
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
 
 from pydantic import BaseModel
 
@@ -19,6 +19,9 @@ class CommandInfo:
     description: str = ""
     provider_choices: bool = False
     tags: List[str] = field(default_factory=list)
+    ttl: Optional[int] = None
+    cpu_bound: bool = False
+    choices: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
 
 
 class Router:
@@ -45,6 +48,9 @@ class Router:
         description: str = "",
         provider_choices: bool = True,
         tags: Optional[List[str]] = None,
+        ttl: Optional[int] = None,
+        cpu_bound: bool = False,
+        choices: Optional[Dict[str, Sequence[str]]] = None,
     ) -> Callable:
         """Decorator to register a function as a platform command.
 
@@ -53,6 +59,12 @@ class Router:
             description: Human-readable description.
             provider_choices: Whether the command accepts a `provider` parameter.
             tags: Optional tags for grouping/filtering.
+            ttl: Seconds a result stays fresh in the runner's result cache.
+                None falls back to the runner's default TTL.
+            cpu_bound: Run the transform (or, for provider-less commands, the
+                function itself) in the runner's process pool.
+            choices: Allowed values of string parameters, checked by the REST
+                API. Comma-separated values must consist of allowed values.
         """
 
         def decorator(func: Callable) -> Callable:
@@ -64,6 +76,9 @@ class Router:
                 description=description or (func.__doc__ or "").strip().split("\n")[0],
                 provider_choices=provider_choices,
                 tags=tags or [],
+                ttl=ttl,
+                cpu_bound=cpu_bound,
+                choices={name: tuple(values) for name, values in (choices or {}).items()},
             )
             self._commands[path] = cmd
             return func
@@ -72,9 +87,20 @@ class Router:
 
     def include_router(self, router: "Router") -> None:
         """Mount a sub-router under this router's prefix."""
-        router.prefix = f"{self.prefix}{router.prefix}"
+        router._mount(self.prefix)
         self._sub_routers.append(router)
 
+    def _mount(self, parent_prefix: str) -> None:
+        """Prepend a parent prefix to this router, its commands and its sub-routers."""
+        self.prefix = f"{parent_prefix}{self.prefix}"
+        commands = {}
+        for cmd in self._commands.values():
+            cmd.path = f"{parent_prefix}{cmd.path}"
+            commands[cmd.path] = cmd
+        self._commands = commands
+        for sub in self._sub_routers:
+            sub._mount(parent_prefix)
+
     def get_all_commands(self) -> Dict[str, CommandInfo]:
         """Return all commands from this router and all sub-routers."""
         commands = dict(self._commands)
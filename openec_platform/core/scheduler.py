@@ -0,0 +1,318 @@
+"""Background refresh scheduler for cache prewarming.
+
+Jobs re-run a command on an interval or cron schedule and store the result in
+the runner's result cache (and optionally a local directory), so the first
+request after a refresh is served warm.
+
+Config files are JSON, or YAML when pyyaml is installed:
+
+    {
+        "max_concurrency": 4,
+        "jobs": [
+            {"name": "sales-30d", "command": "/products/sales/historical",
+             "provider": "demo", "params": {"category": "Electronics"},
+             "interval": 900, "jitter": 30, "timeout": 120},
+            {"name": "competitor-sweep", "command": "/pricing/competitor/current",
+             "cron": "0 6 * * *"}
+        ]
+    }
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+from openec_platform.core.command_runner import CommandRunner
+
+
+def _parse_cron_field(spec: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Invalid cron field '{spec}' (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Minimal five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Supports `*`, lists, ranges and steps. Day-of-week uses 0 (or 7) for Sunday.
+    As in cron, when both day fields are restricted a day matches either one.
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_cron_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7  # cron counts from Sunday
+        if self._any_day or self._any_weekday:
+            return moment.day in self.days and weekday in self.weekdays
+        return moment.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment`."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
+
+
+@dataclass
+class ScheduledJob:
+    """A command refreshed on a schedule.
+
+    Attributes:
+        name: Unique job name, used in status reports.
+        command: The command path to refresh.
+        provider: The data provider to use.
+        params: Command parameters.
+        interval: Seconds between runs. Mutually exclusive with `cron`.
+        cron: Five-field cron expression (local time).
+        jitter: Maximum random delay in seconds added to every run.
+        timeout: Seconds after which a run is reported as failed.
+        ttl: Freshness of the stored result. Defaults to the command's TTL or,
+            if longer, the time until the next scheduled run.
+    """
+
+    name: str
+    command: str
+    provider: str = "demo"
+    params: Dict[str, Any] = field(default_factory=dict)
+    interval: Optional[float] = None
+    cron: Optional[str] = None
+    jitter: float = 0.0
+    timeout: Optional[float] = None
+    ttl: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if (self.interval is None) == (self.cron is None):
+            raise ValueError(f"Job '{self.name}' needs exactly one of 'interval' or 'cron'")
+        if self.interval is not None and self.interval <= 0:
+            raise ValueError(f"Job '{self.name}' interval must be positive")
+        self._cron = CronSchedule(self.cron) if self.cron else None
+
+    def next_run(self, after: float) -> float:
+        """Epoch seconds of the next run after `after`, including jitter."""
+        if self._cron is not None:
+            due = self._cron.next_after(datetime.fromtimestamp(after)).timestamp()
+        else:
+            due = after + float(self.interval or 0)
+        return due + random.uniform(0, self.jitter)
+
+
+@dataclass
+class JobStatus:
+    """Run history of a scheduled job."""
+
+    name: str
+    command: str
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    running: bool = False
+    last_started: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_success: Optional[float] = None
+    last_error: Optional[str] = None
+    next_run: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["staleness"] = None if self.last_success is None else round(time.time() - self.last_success, 3)
+        for key in ("last_started", "last_success", "next_run"):
+            if data[key] is not None:
+                data[key] = datetime.fromtimestamp(data[key]).isoformat(timespec="seconds")
+        return data
+
+
+def read_config(path: Union[str, Path]) -> Any:
+    """Parse a JSON config file, or YAML when the suffix is .yaml/.yml."""
+    path = Path(path)
+    text = path.read_text()
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("pyyaml is required for YAML configs: pip install pyyaml")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def load_jobs(path: Union[str, Path]) -> Dict[str, Any]:
+    """Load a scheduler config file.
+
+    Returns:
+        Dict with "jobs" (list of ScheduledJob) and "max_concurrency".
+    """
+    config = read_config(path)
+    if isinstance(config, list):
+        config = {"jobs": config}
+    jobs = []
+    for i, spec in enumerate(config.get("jobs", [])):
+        spec = dict(spec)
+        spec.setdefault("name", f"{str(spec.get('command', 'job')).strip('/').replace('/', '-')}-{i}")
+        jobs.append(ScheduledJob(**spec))
+    return {"jobs": jobs, "max_concurrency": int(config.get("max_concurrency", 4))}
+
+
+class Scheduler:
+    """Runs scheduled jobs against a CommandRunner on the asyncio event loop.
+
+    Runs execute in worker threads, bounded by `max_concurrency`. A job whose
+    previous run is still in progress when it comes due is skipped rather than
+    stacked (overlap protection).
+    """
+
+    def __init__(
+        self,
+        runner: CommandRunner,
+        jobs: List[ScheduledJob],
+        max_concurrency: int = 4,
+        store_dir: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            runner: Runner whose result cache is prewarmed.
+            jobs: The jobs to schedule.
+            max_concurrency: Maximum number of runs executing at once.
+            store_dir: Optional directory where each job's latest result is written
+                as `<name>.json`.
+        """
+        names = [job.name for job in jobs]
+        if len(names) != len(set(names)):
+            raise ValueError("Scheduled job names must be unique")
+        self.runner = runner
+        self.jobs = jobs
+        self.max_concurrency = max_concurrency
+        self.store_dir = Path(store_dir) if store_dir else None
+        self._status = {job.name: JobStatus(name=job.name, command=job.command) for job in jobs}
+        self._tasks: List["asyncio.Task[None]"] = []
+        # Runs in flight; the event loop only keeps weak references to tasks.
+        self._runs: Set["asyncio.Task[None]"] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self) -> None:
+        """Start one scheduling loop per job on the running event loop."""
+        if self._tasks:
+            return
+        for job in self.jobs:
+            self.runner.get_command(job.command)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.store_dir is not None:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs]
+
+    async def stop(self) -> None:
+        """Cancel all scheduling loops and the runs they started."""
+        tasks = [*self._tasks, *self._runs]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._runs.clear()
+
+    async def run_forever(self) -> None:
+        """Start the scheduler and block until cancelled."""
+        await self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Status of every job: last run duration, errors and staleness."""
+        return [self._status[job.name].to_dict() for job in self.jobs]
+
+    async def _loop(self, job: ScheduledJob) -> None:
+        status = self._status[job.name]
+        # Prewarm immediately on start, spread by jitter.
+        status.next_run = time.time() + random.uniform(0, job.jitter)
+        while True:
+            await asyncio.sleep(max(status.next_run - time.time(), 0))
+            due = status.next_run
+            status.next_run = job.next_run(max(due, time.time()))
+            if status.running:
+                status.skipped += 1
+                continue
+            run = asyncio.create_task(self._execute(job, status))
+            self._runs.add(run)
+            run.add_done_callback(self._runs.discard)
+
+    async def _execute(self, job: ScheduledJob, status: JobStatus) -> None:
+        assert self._semaphore is not None
+        async with self._semaphore:
+            if status.running:
+                status.skipped += 1
+                return
+            ttl = job.ttl
+            if ttl is None:
+                cmd_ttl = self.runner.command_ttl(self.runner.get_command(job.command))
+                ttl = max(cmd_ttl, math.ceil((status.next_run or time.time()) - time.time()) + 1)
+
+            status.running = True
+            status.last_started = time.time()
+            task = asyncio.ensure_future(
+                asyncio.to_thread(self.runner.refresh, job.command, job.provider, ttl, **job.params)
+            )
+            # The worker thread cannot be interrupted, so keep the overlap guard
+            # up until it actually finishes, even after a timeout.
+            task.add_done_callback(lambda _: setattr(status, "running", False))
+            try:
+                entry = await asyncio.wait_for(asyncio.shield(task), job.timeout)
+            except asyncio.TimeoutError:
+                status.failures += 1
+                status.last_error = f"timed out after {job.timeout}s"
+            except Exception as e:
+                status.failures += 1
+                status.last_error = str(e)
+            else:
+                status.last_success = time.time()
+                status.last_error = None
+                if self.store_dir is not None:
+                    (self.store_dir / f"{job.name.replace('/', '-')}.json").write_bytes(entry.body)
+            finally:
+                status.runs += 1
+                status.last_duration = round(time.time() - status.last_started, 3)
@@ -0,0 +1,200 @@
+"""Time-window sharding of large date-range fetches.
+
+Fetchers that declare `shardable = True` have their date range split into
+windows of `shard_days`, fetched concurrently within the provider's
+concurrency and rate limits, and merged back in date order. Completed windows
+are checkpointed so a failed backfill resumes where it stopped.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from openec_platform.core.provider_interface import ProviderFetcher, ProviderInfo, QueryParams
+
+_PERIOD_RE = re.compile(r"^\s*(\d+)\s*([dwmy])\s*$", re.IGNORECASE)
+_PERIOD_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+Window = Tuple[date, date]
+
+
+def _to_date(value: Union[str, date, datetime]) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def resolve_date_range(params: Dict[str, Any], today: Optional[date] = None) -> Optional[Window]:
+    """Resolve an inclusive date range from command parameters.
+
+    Explicit `start_date`/`end_date` take precedence; otherwise a `period` such
+    as "90d", "12w", "6m" or "2y" counts back from yesterday.
+
+    Returns:
+        (start, end) or None if the parameters do not describe a range.
+    """
+    today = today or date.today()
+    start = params.get("start_date")
+    end = params.get("end_date")
+    if start:
+        return _to_date(start), _to_date(end) if end else today
+    period = params.get("period")
+    match = _PERIOD_RE.match(str(period)) if period else None
+    if not match:
+        return None
+    days = int(match.group(1)) * _PERIOD_DAYS[match.group(2).lower()]
+    end_date = _to_date(end) if end else today - timedelta(days=1)
+    return end_date - timedelta(days=days - 1), end_date
+
+
+def split_windows(start: date, end: date, days: int) -> List[Window]:
+    """Split an inclusive range into consecutive windows of at most `days` days."""
+    windows = []
+    cursor = start
+    while cursor <= end:
+        window_end = min(cursor + timedelta(days=days - 1), end)
+        windows.append((cursor, window_end))
+        cursor = window_end + timedelta(days=1)
+    return windows
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls to at most `rate` per second."""
+
+    def __init__(self, rate: Optional[float]) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ShardCheckpoint:
+    """Stores the raw records of completed windows for one sharded fetch.
+
+    Checkpoints are kept in memory and, when `directory` is given, on disk as one
+    JSON file per window so they survive a process restart.
+    """
+
+    _memory: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    _memory_lock = threading.Lock()
+
+    def __init__(self, key: str, directory: Optional[Union[str, Path]] = None) -> None:
+        self.key = key
+        self.path = Path(directory) / key if directory else None
+
+    @staticmethod
+    def make_key(provider: str, model: str, params: Dict[str, Any], shard_days: int) -> str:
+        payload = json.dumps([provider, model, params, shard_days], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+    @staticmethod
+    def _name(window: Window) -> str:
+        return f"{window[0].isoformat()}_{window[1].isoformat()}"
+
+    def load(self, window: Window) -> Optional[List[Dict[str, Any]]]:
+        name = self._name(window)
+        with self._memory_lock:
+            records = self._memory.get(self.key, {}).get(name)
+        if records is None and self.path is not None and (self.path / f"{name}.json").exists():
+            records = json.loads((self.path / f"{name}.json").read_text())
+        return records
+
+    def save(self, window: Window, records: List[Dict[str, Any]]) -> None:
+        name = self._name(window)
+        with self._memory_lock:
+            self._memory.setdefault(self.key, {})[name] = records
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp = self.path / f"{name}.json.tmp"
+            tmp.write_text(json.dumps(records, default=str))
+            tmp.replace(self.path / f"{name}.json")
+
+    def clear(self) -> None:
+        with self._memory_lock:
+            self._memory.pop(self.key, None)
+        if self.path is not None and self.path.exists():
+            for file in self.path.glob("*.json"):
+                file.unlink()
+            self.path.rmdir()
+
+
+def fetch_sharded(
+    fetcher: ProviderFetcher,
+    provider: ProviderInfo,
+    model: str,
+    params: QueryParams,
+    window_range: Window,
+    checkpoint_dir: Optional[Union[str, Path]] = None,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """Fetch a date range window by window and merge the raw records in date order.
+
+    Each window is passed to `fetcher.fetch` as `start_date`/`end_date`. Windows
+    that end before today are checkpointed; if any window fails the error is
+    raised after the others finish, and a retry only fetches what is missing.
+    """
+    start, end = window_range
+    windows = split_windows(start, end, max(int(fetcher.shard_days), 1))
+    checkpoint = ShardCheckpoint(
+        ShardCheckpoint.make_key(provider.name, model, kwargs, fetcher.shard_days), checkpoint_dir
+    )
+    limiter = RateLimiter(provider.rate_limit)
+    today = date.today()
+
+    def fetch_window(window: Window) -> List[Dict[str, Any]]:
+        limiter.acquire()
+        window_kwargs = {**kwargs, "start_date": window[0], "end_date": window[1]}
+        records = fetcher.fetch(params, **window_kwargs)
+        if window[1] < today:
+            checkpoint.save(window, records)
+        return records
+
+    chunks: Dict[Window, List[Dict[str, Any]]] = {}
+    pending = []
+    for window in windows:
+        records = checkpoint.load(window)
+        if records is None:
+            pending.append(window)
+        else:
+            chunks[window] = records
+
+    errors = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(provider.max_concurrency, 1)) as pool:
+            futures = {pool.submit(fetch_window, w): w for w in pending}
+            for future in as_completed(futures):
+                try:
+                    chunks[futures[future]] = future.result()
+                except Exception as e:
+                    errors.append((futures[future], e))
+    if errors:
+        window, error = min(errors, key=lambda item: item[0])
+        raise RuntimeError(
+            f"{len(errors)} of {len(windows)} windows failed (first: {window[0]}..{window[1]}: {error}). "
+            "Completed windows are checkpointed; re-run to resume."
+        ) from error
+
+    merged = [record for window in windows for record in chunks[window]]
+    if merged and all("date" in r for r in merged):
+        merged.sort(key=lambda r: str(r["date"]))
+    checkpoint.clear()
+    return merged
@@ -0,0 +1,223 @@
+"""Live command subscriptions with keyed incremental diffs.
+
+A subscription is a command + provider + parameters refreshed on an interval.
+Identical subscriptions share a single refresh loop; each refresh is diffed
+against the previous snapshot by natural key and only the changed rows are
+pushed to subscribers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from pydantic import BaseModel
+
+from openec_platform.core.command_runner import CommandRunner
+from openec_platform.core.oecject import OECject
+
+
+def snapshot_rows(result: OECject) -> List[Dict[str, Any]]:
+    """JSON-safe rows of a result."""
+    if result.results is None:
+        return []
+    items = result.results if isinstance(result.results, list) else [result.results]
+    return [item.model_dump(mode="json") if isinstance(item, BaseModel) else item for item in items]
+
+
+def natural_key_of(result: OECject) -> Tuple[str, ...]:
+    """The natural key declared by the result's standard model, if any."""
+    items = result.results if isinstance(result.results, list) else [result.results]
+    for item in items:
+        return tuple(getattr(type(item), "natural_key", ()))
+    return ()
+
+
+def _row_key(row: Dict[str, Any], key: Sequence[str]) -> str:
+    if key:
+        return json.dumps([row.get(k) for k in key], default=str)
+    return json.dumps(row, sort_keys=True, default=str)
+
+
+def diff_snapshots(
+    previous: List[Dict[str, Any]],
+    current: List[Dict[str, Any]],
+    key: Sequence[str] = (),
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Compute a keyed diff between two snapshots.
+
+    Args:
+        previous: Rows from the previous refresh.
+        current: Rows from the latest refresh.
+        key: Fields identifying a row. Without a key, whole rows are compared
+            and a changed row shows up as a deletion plus an insertion.
+
+    Returns:
+        Dict with "inserted" and "updated" rows, and "deleted" key values.
+    """
+    before = {_row_key(r, key): r for r in previous}
+    after = {_row_key(r, key): r for r in current}
+
+    inserted = [row for k, row in after.items() if k not in before]
+    updated = [row for k, row in after.items() if k in before and before[k] != row]
+    deleted = [
+        {f: row.get(f) for f in key} if key else row
+        for k, row in before.items()
+        if k not in after
+    ]
+    return {"inserted": inserted, "updated": updated, "deleted": deleted}
+
+
+@dataclass(frozen=True)
+class SubscriptionKey:
+    """Identity of a shared refresh loop."""
+
+    path: str
+    provider: str
+    params: str
+    interval: float
+    key: Tuple[str, ...] = ()
+
+
+@dataclass
+class _RefreshLoop:
+    """One refresh loop fanning events out to all subscribers of a key."""
+
+    spec: SubscriptionKey
+    runner: CommandRunner
+    queue_size: int = 100
+    subscribers: Set["asyncio.Queue[Dict[str, Any]]"] = field(default_factory=set)
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    key: Tuple[str, ...] = ()
+    version: int = 0
+    task: Optional["asyncio.Task[None]"] = None
+
+    def snapshot_event(self) -> Dict[str, Any]:
+        return {
+            "event": "snapshot",
+            "version": self.version,
+            "command": self.spec.path,
+            "key": list(self.key),
+            "rows": self.rows,
+        }
+
+    def add(self) -> "asyncio.Queue[Dict[str, Any]]":
+        queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=self.queue_size)
+        if self.version:
+            queue.put_nowait(self.snapshot_event())
+        self.subscribers.add(queue)
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def remove(self, queue: "asyncio.Queue[Dict[str, Any]]") -> bool:
+        """Detach a subscriber. Returns True once the loop has no subscribers left."""
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+        return not self.subscribers
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and resynchronize with a full snapshot.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot_event())
+
+    async def _run(self) -> None:
+        params = json.loads(self.spec.params)
+        while True:
+            try:
+                entry = await asyncio.to_thread(
+                    self.runner.refresh, self.spec.path, provider=self.spec.provider, **params
+                )
+            except Exception as e:
+                self._publish({"event": "error", "version": self.version, "detail": str(e)})
+            else:
+                rows = snapshot_rows(entry.result)
+                if not self.version:
+                    self.key = self.spec.key or natural_key_of(entry.result)
+                    self.rows = rows
+                    self.version = 1
+                    self._publish(self.snapshot_event())
+                else:
+                    changes = diff_snapshots(self.rows, rows, self.key)
+                    self.rows = rows
+                    if any(changes.values()):
+                        self.version += 1
+                        self._publish({"event": "diff", "version": self.version, **changes})
+            await asyncio.sleep(self.spec.interval)
+
+
+class SubscriptionManager:
+    """Registry of live subscriptions sharing refresh loops.
+
+    Usage:
+        manager = SubscriptionManager(runner)
+        async for event in manager.subscribe("/inventory/levels/alerts", interval=10):
+            ...
+
+    The first event of every subscription is a full "snapshot"; later events
+    are "diff" events carrying inserted/updated/deleted rows.
+    """
+
+    def __init__(self, runner: CommandRunner, min_interval: float = 1.0) -> None:
+        self.runner = runner
+        self.min_interval = min_interval
+        self._loops: Dict[SubscriptionKey, _RefreshLoop] = {}
+
+    async def subscribe(
+        self,
+        path: str,
+        provider: str = "demo",
+        params: Optional[Dict[str, Any]] = None,
+        interval: float = 5.0,
+        key: Sequence[str] = (),
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream events for a command until the consumer stops iterating.
+
+        Args:
+            path: The command path.
+            provider: The data provider to use.
+            params: Command parameters.
+            interval: Seconds between refreshes.
+            key: Natural key override; defaults to the model's `natural_key`.
+        """
+        self.runner.get_command(path)
+        spec = SubscriptionKey(
+            path=path,
+            provider=provider,
+            params=json.dumps(params or {}, sort_keys=True, default=str),
+            interval=max(interval, self.min_interval),
+            key=tuple(key),
+        )
+        loop = self._loops.get(spec)
+        if loop is None:
+            loop = self._loops[spec] = _RefreshLoop(spec=spec, runner=self.runner)
+        queue = loop.add()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            if loop.remove(queue):
+                self._loops.pop(spec, None)
+
+    def active(self) -> List[Dict[str, Any]]:
+        """Describe the running refresh loops."""
+        return [
+            {
+                "command": spec.path,
+                "provider": spec.provider,
+                "params": json.loads(spec.params),
+                "interval": spec.interval,
+                "subscribers": len(loop.subscribers),
+                "version": loop.version,
+            }
+            for spec, loop in self._loops.items()
+        ]
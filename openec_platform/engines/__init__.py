@@ -0,0 +1 @@
+"""OpenEC Engines - platform-side analytics computed from raw provider data."""
@@ -0,0 +1,517 @@
+"""Anomaly detection - streaming robust baselines for metric time series.
+
+Spend spikes, jumps in cancelled orders or collapsing traffic show up as
+points far from their series' own recent behaviour. `AnomalyDetector` keeps,
+per series (a channel, marketplace, traffic source, ...), three baselines
+that every new point is scored against before it is folded in:
+
+- robust: median and MAD of the last `window` points
+- ewma: exponentially weighted mean and variance
+- seasonal: an exponentially weighted mean per weekday, scored with the
+  spread of the series' past errors against it
+
+The cost per point is fixed (at most `window` values) however long the
+series has run, and all series are scored together one date at a time.
+State is kept between calls, so repeated requests only score dates newer
+than the last one seen per series:
+
+    detector = AnomalyDetector()
+    detector.update(orders, "cancelled_orders", by=["marketplace"])
+    detector.anomalies(threshold=3.5, direction="up")
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.models.analytics import TrafficAnomaly
+from openec_platform.models.marketing import CampaignAnomaly
+from openec_platform.models.orders import OrderAnomaly
+
+METHODS = ("robust", "ewma", "seasonal")
+DIRECTIONS = ("up", "down", "both")
+_MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+_MEAN_AD_SCALE = 1.2533  # mean absolute deviation -> standard deviation for normal data
+_MIN_SEASON_POINTS = 3
+# Scores of series that were perfectly flat until now are capped here.
+_MAX_SCORE = 100.0
+
+_STATE_FILL = {
+    "ring": np.nan, "pos": 0, "count": 0, "last": np.iinfo(np.int64).min,
+    "mean": 0.0, "var": 0.0, "smean": 0.0, "scount": 0, "rvar": 0.0, "rcount": 0,
+}
+
+
+def _zscore(x: np.ndarray, expected: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """(x - expected) / scale, with flat baselines (scale 0) scoring 0 or +-_MAX_SCORE."""
+    diff = x - expected
+    safe = np.where(scale > 0, scale, 1.0)
+    z = np.where(scale > 0, diff / safe, np.sign(diff) * _MAX_SCORE)
+    return np.clip(z, -_MAX_SCORE, _MAX_SCORE)
+
+
+class AnomalyDetector:
+    """Per-series rolling baselines for one metric, updated point by point.
+
+    Args:
+        window: Points in the rolling median/MAD baseline.
+        alpha: Smoothing factor of the EWMA baseline.
+        seasonal_alpha: Smoothing factor of the per-weekday means, which see
+            one point per `season` days.
+        season: Length of the seasonal cycle in days.
+        min_history: Points a series needs before it is scored.
+        clip: Points are winsorized to this many standard deviations before
+            updating the EWMA baselines, so one outlier does not drag them.
+        retain_days: Days of scores kept for `anomalies()`.
+    """
+
+    def __init__(
+        self,
+        window: int = 28,
+        alpha: float = 0.1,
+        seasonal_alpha: float = 0.25,
+        season: int = 7,
+        min_history: int = 7,
+        clip: float = 3.5,
+        retain_days: int = 90,
+    ) -> None:
+        if window < 3 or season < 1:
+            raise ValueError("window must be at least 3 and season at least 1")
+        self.window = window
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.season = season
+        self.min_history = min_history
+        self.clip = clip
+        self.retain_days = retain_days
+        self.metric = ""
+        self.by: Tuple[str, ...] = ()
+        self._keys = pd.DataFrame()
+        self._key_index = pd.Index([], dtype=np.uint64)
+        self._state: Dict[str, np.ndarray] = {}
+        self._grow(0)
+        self._scores = pd.DataFrame()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of series tracked."""
+        return len(self._key_index)
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self._state["count"]) if self._state else -1
+        if size <= capacity:
+            return
+        new = max(size, 2 * capacity, 64)
+        shapes = {"ring": (new, self.window), "smean": (new, self.season), "scount": (new, self.season)}
+        dtypes = {"pos": np.int64, "count": np.int64, "last": np.int64, "scount": np.int64, "rcount": np.int64}
+        for name, fill in _STATE_FILL.items():
+            grown = np.full(shapes.get(name, (new,)), fill, dtype=dtypes.get(name, float))
+            if name in self._state:
+                grown[: len(self._state[name])] = self._state[name]
+            self._state[name] = grown
+
+    def _hash(self, keys: pd.DataFrame) -> np.ndarray:
+        if not self.by:
+            return np.zeros(len(keys), dtype=np.uint64)
+        return pd.util.hash_pandas_object(keys.astype(object), index=False).to_numpy()
+
+    def _series_rows(self, keys: pd.DataFrame) -> np.ndarray:
+        """Row of each series in the state arrays, adding unseen series."""
+        hashes = self._hash(keys)
+        rows = self._key_index.get_indexer(hashes)
+        unseen = rows < 0
+        if unseen.any():
+            _, first = np.unique(hashes[unseen], return_index=True)
+            new_keys = keys[unseen].iloc[np.sort(first)].reset_index(drop=True)
+            self._key_index = self._key_index.append(pd.Index(self._hash(new_keys)))
+            self._keys = pd.concat([self._keys, new_keys], ignore_index=True)
+            self._grow(len(self._key_index))
+            rows = self._key_index.get_indexer(hashes)
+        return rows
+
+    def update(
+        self, frame: pd.DataFrame, metric: str, by: Sequence[str] = (), date_column: str = "date"
+    ) -> pd.DataFrame:
+        """Score the new points of each series, then fold them into its baselines.
+
+        Rows of the same series and date are summed. Dates at or before the
+        last one already seen for a series are skipped, so overlapping windows
+        can be passed in again.
+
+        Args:
+            frame: Rows with a date column, the `by` key columns and `metric`.
+            metric: Column holding the series values.
+            by: Columns identifying a series.
+            date_column: Column holding each point's date.
+
+        Returns:
+            One row per scored point with the key columns, value, and per
+            method `expected_<method>` and `score_<method>` (NaN until the
+            series has enough history).
+        """
+        by = tuple(by)
+        with self._lock:
+            if not self.metric:
+                self.metric, self.by = metric, by
+            elif (metric, by) != (self.metric, self.by):
+                raise ValueError(f"Detector tracks {self.metric} by {list(self.by)}, not {metric} by {list(by)}")
+            if frame.empty or metric not in frame:
+                return pd.DataFrame()
+
+            data = pd.DataFrame({
+                "day": pd.to_datetime(frame[date_column], format="ISO8601").to_numpy(dtype="datetime64[D]"),
+                **{c: frame[c].fillna("").to_numpy(dtype=object) for c in by},
+                "value": pd.to_numeric(frame[metric], errors="coerce").fillna(0.0).to_numpy(dtype=float),
+            })
+            data = data.groupby(["day", *by], sort=False, as_index=False)["value"].sum()
+            data["row"] = self._series_rows(data[list(by)])
+            days = data["day"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+            data = data[days > self._state["last"][data["row"].to_numpy()]]
+            if data.empty:
+                return pd.DataFrame()
+
+            data = data.sort_values("day", kind="stable")
+            rows = data["row"].to_numpy()
+            values = data["value"].to_numpy()
+            days = data["day"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+            _, starts = np.unique(days, return_index=True)
+            bounds = [*starts, len(days)]
+            scored = [self._step(rows[a:b], values[a:b], int(days[a])) for a, b in zip(bounds, bounds[1:])]
+
+            scores = pd.DataFrame({
+                "date": pd.to_datetime(days, unit="D").date,
+                **{c: data[c].to_numpy(dtype=object) for c in by},
+                "metric": metric,
+                "value": values,
+                **{
+                    f"{kind}_{method}": np.concatenate([s[kind][method] for s in scored])
+                    for method in METHODS for kind in ("expected", "score")
+                },
+            })
+            self._retain(scores)
+            return scores
+
+    def _step(self, rows: np.ndarray, x: np.ndarray, day: int) -> Dict[str, Dict[str, np.ndarray]]:
+        """Score one date's points (one per series) and update their baselines."""
+        s = self._state
+        count = s["count"][rows]
+        ready = count >= self.min_history
+        out: Dict[str, Dict[str, np.ndarray]] = {"expected": {}, "score": {}}
+        for method in METHODS:
+            out["expected"][method] = np.full(len(rows), np.nan)
+            out["score"][method] = np.full(len(rows), np.nan)
+
+        # Robust: median and MAD of the ring buffer.
+        if ready.any():
+            r = rows[ready]
+            buffer = s["ring"][r]
+            median = np.nanmedian(buffer, axis=1)
+            deviation = np.abs(buffer - median[:, None])
+            scale = np.nanmedian(deviation, axis=1) * _MAD_SCALE
+            scale = np.where(scale > 0, scale, np.nanmean(deviation, axis=1) * _MEAN_AD_SCALE)
+            out["expected"]["robust"][ready] = median
+            out["score"]["robust"][ready] = _zscore(x[ready], median, scale)
+
+            std = np.sqrt(self._unbiased(s["var"][r], count[ready], self.alpha))
+            out["expected"]["ewma"][ready] = s["mean"][r]
+            out["score"]["ewma"][ready] = _zscore(x[ready], s["mean"][r], std)
+
+        slot = day % self.season
+        season_count = s["scount"][rows, slot]
+        season_mean = s["smean"][rows, slot]
+        residual_count = s["rcount"][rows]
+        residual_std = np.sqrt(s["rvar"][rows] / (1.0 - (1.0 - self.alpha) ** np.maximum(residual_count, 1)))
+        season_ready = (season_count >= _MIN_SEASON_POINTS) & (residual_count >= self.min_history)
+        if season_ready.any():
+            out["expected"]["seasonal"][season_ready] = season_mean[season_ready]
+            out["score"]["seasonal"][season_ready] = _zscore(
+                x[season_ready], season_mean[season_ready], residual_std[season_ready]
+            )
+
+        # Fold the points in.
+        s["ring"][rows, s["pos"][rows]] = x
+        s["pos"][rows] = (s["pos"][rows] + 1) % self.window
+        s["mean"][rows], s["var"][rows] = self._ewma(s["mean"][rows], s["var"][rows], x, count, self.alpha)
+        # Errors against the weekday mean give the seasonal spread; both are winsorized like the EWMA.
+        seen = season_count > 0
+        residual = x - season_mean
+        residual = np.where(seen & (residual_std > 0) & (residual_count > 0),
+                            np.clip(residual, -self.clip * residual_std, self.clip * residual_std), residual)
+        s["rvar"][rows] = np.where(seen, (1 - self.alpha) * s["rvar"][rows] + self.alpha * residual**2, s["rvar"][rows])
+        s["rcount"][rows] += seen
+        s["smean"][rows, slot] = np.where(seen, season_mean + self.seasonal_alpha * residual, x)
+        s["scount"][rows, slot] += 1
+        s["count"][rows] += 1
+        s["last"][rows] = day
+        return out
+
+    @staticmethod
+    def _unbiased(var: np.ndarray, count: np.ndarray, alpha: float) -> np.ndarray:
+        """EWMA variance corrected for starting at zero, which understates it over the first points."""
+        return var / (1.0 - (1.0 - alpha) ** np.maximum(count - 1, 1))
+
+    def _ewma(
+        self, mean: np.ndarray, var: np.ndarray, x: np.ndarray, count: np.ndarray, alpha: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        std = np.sqrt(var)
+        clipped = np.where(std > 0, np.clip(x, mean - self.clip * std, mean + self.clip * std), x)
+        diff = clipped - mean
+        new_mean = np.where(count > 0, mean + alpha * diff, x)
+        new_var = np.where(count > 0, (1 - alpha) * (var + alpha * diff * diff), 0.0)
+        return new_mean, new_var
+
+    def _retain(self, scores: pd.DataFrame) -> None:
+        frames = [f for f in (self._scores, scores) if not f.empty]
+        combined = pd.concat(frames, ignore_index=True) if len(frames) > 1 else scores
+        cutoff = max(combined["date"]) - timedelta(days=self.retain_days)
+        self._scores = combined[combined["date"] > cutoff].reset_index(drop=True)
+
+    def anomalies(
+        self,
+        threshold: float = 3.5,
+        direction: str = "both",
+        methods: Sequence[str] = METHODS,
+        start: Optional[date] = None,
+        **filters: str,
+    ) -> pd.DataFrame:
+        """Retained points whose strongest score exceeds `threshold`.
+
+        Args:
+            threshold: Minimum absolute score.
+            direction: "up" for spikes, "down" for drops, or "both".
+            methods: Baselines to consider. A point is anomalous only when every
+                one of them that can score it agrees, and its score is the
+                weakest of theirs.
+            start: Only points on or after this date.
+            **filters: Key column values to keep, e.g. marketplace="amazon".
+
+        Returns:
+            DataFrame with date, the key columns, metric, value, expected,
+            score, method, direction and severity ("warning", or "critical"
+            beyond twice the threshold), most recent first.
+        """
+        unknown = set(methods) - set(METHODS)
+        if unknown:
+            raise ValueError(f"Unknown anomaly methods {sorted(unknown)}; expected {list(METHODS)}")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction '{direction}'; expected one of {list(DIRECTIONS)}")
+        columns = ["date", *self.by, "metric", "value", "expected", "score", "method", "direction", "severity"]
+        with self._lock:
+            scores = self._scores
+        if scores.empty or not methods:
+            return pd.DataFrame(columns=columns)
+        mask = np.ones(len(scores), dtype=bool)
+        if start is not None:
+            mask &= (scores["date"] >= start).to_numpy()
+        for column, value in filters.items():
+            if value and column in scores:
+                mask &= (scores[column] == value).to_numpy()
+        scores = scores[mask]
+
+        methods = [m for m in METHODS if m in methods]
+        z = scores[[f"score_{m}" for m in methods]].to_numpy()
+        magnitude = np.where(np.isnan(z), np.inf, np.abs(z))
+        best = magnitude.argmin(axis=1)
+        picked = np.arange(len(scores))
+        score = z[picked, best]
+        expected = scores[[f"expected_{m}" for m in methods]].to_numpy()[picked, best]
+        flagged = np.isfinite(magnitude[picked, best]) & (magnitude[picked, best] > threshold)
+        if direction == "up":
+            flagged &= score > 0
+        elif direction == "down":
+            flagged &= score < 0
+
+        result = scores.loc[flagged, ["date", *self.by, "metric", "value"]].assign(
+            expected=expected[flagged],
+            score=score[flagged],
+            method=np.array(methods, dtype=object)[best[flagged]],
+            direction=np.where(score[flagged] > 0, "up", "down"),
+            severity=np.where(np.abs(score[flagged]) > 2 * threshold, "critical", "warning"),
+        )
+        return result.sort_values("date", ascending=False, kind="stable")[columns].reset_index(drop=True)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the per-series baselines to an .npz file; retained scores are not saved."""
+        with self._lock:
+            size = len(self._key_index)
+            np.savez(
+                path,
+                settings=np.array([self.window, self.season, self.min_history, self.retain_days]),
+                rates=np.array([self.alpha, self.seasonal_alpha, self.clip]),
+                metric=np.array(self.metric),
+                by=np.array(self.by, dtype=str),
+                key_hash=self._key_index.to_numpy(dtype=np.uint64),
+                **{f"key_{c}": self._keys[c].to_numpy(dtype=str) for c in self.by},
+                **{f"state_{name}": values[:size] for name, values in self._state.items()},
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "AnomalyDetector":
+        """Restore a detector saved with `save()`."""
+        data = np.load(path, allow_pickle=False)
+        window, season, min_history, retain_days = (int(v) for v in data["settings"])
+        alpha, seasonal_alpha, clip = (float(v) for v in data["rates"])
+        detector = cls(window=window, alpha=alpha, seasonal_alpha=seasonal_alpha, season=season,
+                       min_history=min_history, clip=clip, retain_days=retain_days)
+        detector.metric = str(data["metric"])
+        detector.by = tuple(str(c) for c in data["by"])
+        detector._key_index = pd.Index(data["key_hash"])
+        detector._keys = pd.DataFrame({c: data[f"key_{c}"].astype(object) for c in detector.by})
+        detector._state = {name: data[f"state_{name}"] for name in _STATE_FILL}
+        detector._grow(len(detector._key_index))
+        return detector
+
+
+class AnomalyDetectors:
+    """Anomaly detectors kept per (dataset, metric, key columns), e.g. one pool per provider."""
+
+    def __init__(self) -> None:
+        self._detectors: Dict[Tuple[str, str, Tuple[str, ...]], AnomalyDetector] = {}
+        self._lock = threading.Lock()
+
+    def get(self, dataset: str, metric: str, by: Sequence[str]) -> AnomalyDetector:
+        with self._lock:
+            key = (dataset, metric, tuple(by))
+            if key not in self._detectors:
+                self._detectors[key] = AnomalyDetector()
+            return self._detectors[key]
+
+
+def _methods(method: str) -> Sequence[str]:
+    return [m.strip() for m in method.split(",") if m.strip()] if method else METHODS
+
+
+def detect_anomalies(
+    frame: pd.DataFrame,
+    metric: str,
+    by: Sequence[str],
+    dataset: str = "",
+    threshold: float = 3.5,
+    direction: str = "both",
+    method: str = "",
+    detector: Optional[AnomalyDetector] = None,
+    detectors: Optional[AnomalyDetectors] = None,
+    **filters: str,
+) -> pd.DataFrame:
+    """Fold new rows of a metric into its detector and return the anomalies.
+
+    Args:
+        frame: Rows with date, the `by` columns and `metric`.
+        metric: Column to watch.
+        by: Columns identifying a series.
+        dataset: Name of the data the frame comes from, so detectors of
+            different models watching a same-named metric are kept apart.
+        threshold: Minimum absolute score of an anomaly.
+        direction: "up", "down" or "both".
+        method: Comma-separated baselines to use ("robust", "ewma",
+            "seasonal"); all of them when empty.
+        detector: Detector holding the series state.
+        detectors: Pool to take the detector for this dataset, metric and key
+            columns from when no detector is given. Without either, a fresh
+            detector is used.
+        **filters: Key column values to keep.
+    """
+    if metric not in frame and not frame.empty:
+        raise ValueError(f"Unknown metric '{metric}'")
+    if detector is None:
+        detector = detectors.get(dataset, metric, by) if detectors is not None else AnomalyDetector()
+    detector.update(frame, metric, by=by)
+    return detector.anomalies(threshold=threshold, direction=direction, methods=_methods(method), **filters)
+
+
+def campaign_anomalies(
+    campaigns: pd.DataFrame,
+    metric: str = "spend",
+    channel: str = "",
+    threshold: float = 3.5,
+    direction: str = "both",
+    method: str = "",
+    detector: Optional[AnomalyDetector] = None,
+    detectors: Optional[AnomalyDetectors] = None,
+    **kwargs: Any,
+) -> List[CampaignAnomaly]:
+    """Compute CampaignAnomaly rows from CampaignPerformance data, per channel.
+
+    Args:
+        campaigns: Rows with date, channel and the metric column.
+        metric: Column to watch, e.g. "spend", "clicks" or "roas".
+        channel: Only report this channel.
+        threshold: Minimum absolute score of an anomaly.
+        direction: "up", "down" or "both".
+        method: Comma-separated baselines to use; all of them when empty.
+        detector: Detector holding the series state.
+        detectors: Pool of detectors kept across calls, e.g. one per provider.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = detect_anomalies(campaigns, metric, ["channel"], "campaigns", threshold, direction, method, detector,
+                             channel=channel, detectors=detectors)
+    return [CampaignAnomaly(**row) for row in table.to_dict("records")]
+
+
+def order_anomalies(
+    orders: pd.DataFrame,
+    metric: str = "cancelled_orders",
+    marketplace: str = "",
+    threshold: float = 3.5,
+    direction: str = "both",
+    method: str = "",
+    detector: Optional[AnomalyDetector] = None,
+    detectors: Optional[AnomalyDetectors] = None,
+    **kwargs: Any,
+) -> List[OrderAnomaly]:
+    """Compute OrderAnomaly rows from OrderSummary data, per marketplace.
+
+    Args:
+        orders: Rows with date, marketplace and the metric column.
+        metric: Column to watch, e.g. "cancelled_orders" or "total_revenue".
+        marketplace: Only report this marketplace.
+        threshold: Minimum absolute score of an anomaly.
+        direction: "up", "down" or "both".
+        method: Comma-separated baselines to use; all of them when empty.
+        detector: Detector holding the series state.
+        detectors: Pool of detectors kept across calls, e.g. one per provider.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = detect_anomalies(orders, metric, ["marketplace"], "orders", threshold, direction, method, detector,
+                             marketplace=marketplace, detectors=detectors)
+    return [OrderAnomaly(**row) for row in table.to_dict("records")]
+
+
+def traffic_anomalies(
+    events: pd.DataFrame,
+    metric: str = "sessions",
+    source: str = "",
+    threshold: float = 3.5,
+    direction: str = "both",
+    method: str = "",
+    detector: Optional[AnomalyDetector] = None,
+    detectors: Optional[AnomalyDetectors] = None,
+    **kwargs: Any,
+) -> List[TrafficAnomaly]:
+    """Compute TrafficAnomaly rows from clickstream events, per traffic source.
+
+    Events are sessionized into TrafficSource rows first.
+
+    Args:
+        events: Clickstream events (see `sessions.traffic_sources`).
+        metric: TrafficSource column to watch, e.g. "sessions" or "conversions".
+        source: Only report this traffic source.
+        threshold: Minimum absolute score of an anomaly.
+        direction: "up", "down" or "both".
+        method: Comma-separated baselines to use; all of them when empty.
+        detector: Detector holding the series state.
+        detectors: Pool of detectors kept across calls, e.g. one per provider.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    from openec_platform.engines.sessions import traffic_sources
+
+    traffic = pd.DataFrame([row.model_dump() for row in traffic_sources(events)])
+    table = detect_anomalies(traffic, metric, ["source"], "traffic", threshold, direction, method, detector,
+                             source=source, detectors=detectors)
+    return [TrafficAnomaly(**row) for row in table.to_dict("records")]
@@ -0,0 +1,349 @@
+"""Multi-touch attribution engine - computes ChannelAttribution from event streams.
+
+Events are marketing touchpoints (a user interacting through a channel) and
+conversions. A user's journey is the run of touches up to and including a
+conversion; touches after the last conversion form an unconverted journey.
+
+All heuristic models are computed in one pass over each chunk:
+    first_touch, last_touch: all credit to the first or last touch.
+    linear: equal credit to every touch.
+    time_decay: credit halves every `half_life_days` before the conversion.
+    position_based: 40% first, 40% last, 20% shared by the touches between.
+
+The markov model credits channels by their removal effect: how much the
+probability of reaching a conversion from the start drops when the channel is
+removed from the chain of observed channel-to-channel transitions. Only
+transition counts and per-day aggregates are kept between chunks, so memory
+does not grow with the number of events.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.utils import FrameInput, hash_keys, iter_complete_groups
+from openec_platform.models.marketing import ChannelAttribution
+
+MODELS = ("first_touch", "last_touch", "linear", "time_decay", "position_based", "markov")
+
+# Conversions with no touch in the lookback window are credited to this channel.
+DIRECT = "direct"
+
+# Markov chain states before the channel states.
+_START, _CONVERSION, _NULL = 0, 1, 2
+_FIRST_CHANNEL = 3
+
+# Channel sets are tracked as 64-bit masks.
+MAX_CHANNELS = 64
+_STATES = _FIRST_CHANNEL + MAX_CHANNELS
+
+
+class AttributionAccumulator:
+    """Incremental attribution over chunks of touchpoint and conversion events.
+
+    Usage:
+        acc = AttributionAccumulator(lookback_days=30)
+        for chunk in pd.read_csv("events.csv", chunksize=1_000_000):
+            acc.add(chunk)
+        table = acc.table(model="markov")
+
+    Chunks from `add()` are processed as given; use `attribution_table()` or
+    `iter_complete_groups()` to feed a user-ordered stream so that no user's
+    events are split across chunks.
+    """
+
+    def __init__(
+        self,
+        lookback_days: float = 30,
+        half_life_days: float = 7,
+        user_col: str = "user_id",
+        time_col: str = "timestamp",
+        channel_col: str = "channel",
+        event_col: str = "event",
+        value_col: str = "revenue",
+    ) -> None:
+        """Initialize the accumulator.
+
+        Args:
+            lookback_days: Touches more than this many days before a conversion get no credit.
+            half_life_days: Half-life of the time-decay model.
+            user_col: Column holding the user identifier.
+            time_col: Column holding the event timestamp.
+            channel_col: Column holding the touchpoint channel.
+            event_col: Column holding "touch" or "conversion".
+            value_col: Column holding the conversion value.
+        """
+        self.lookback = pd.Timedelta(days=lookback_days)
+        self.half_life_days = half_life_days
+        self.user_col = user_col
+        self.time_col = time_col
+        self.channel_col = channel_col
+        self.event_col = event_col
+        self.value_col = value_col
+        self._channels: Dict[str, int] = {}
+        self._transitions: Dict[Tuple[int, int], int] = {}
+        self._credit: List[pd.DataFrame] = []
+        self._paths: List[pd.DataFrame] = []
+
+    def _codes(self, channels: np.ndarray) -> np.ndarray:
+        inverse, uniques = pd.factorize(channels)
+        for name in uniques:
+            if name not in self._channels:
+                if len(self._channels) >= MAX_CHANNELS:
+                    raise ValueError(f"Attribution supports at most {MAX_CHANNELS} channels")
+                self._channels[name] = len(self._channels)
+        return np.array([self._channels[name] for name in uniques], dtype=np.int64)[inverse]
+
+    def add(self, events: pd.DataFrame) -> None:
+        """Process a chunk of events holding complete users."""
+        events = events[events[self.user_col].notna()]
+        if events.empty:
+            return
+        is_conversion = (events[self.event_col].astype(str) == "conversion").to_numpy()
+        values = (
+            pd.to_numeric(events[self.value_col], errors="coerce").fillna(0.0).to_numpy()
+            if self.value_col in events else np.zeros(len(events))
+        )
+        frame = pd.DataFrame({
+            "user": hash_keys(events[self.user_col]),
+            "ts": pd.to_datetime(events[self.time_col], format="ISO8601").to_numpy(dtype="datetime64[ns]"),
+            "conversion": is_conversion,
+            "channel": events[self.channel_col].fillna(DIRECT).astype(str).to_numpy(),
+            "value": values,
+        })
+        # Touches sort before a conversion with the same timestamp.
+        order = np.lexsort((is_conversion, frame["ts"].to_numpy(), frame["user"].to_numpy()))
+        frame = frame.take(order).reset_index(drop=True)
+
+        user = frame["user"].to_numpy()
+        conversion = frame["conversion"].to_numpy()
+        starts = np.ones(len(frame), dtype=bool)
+        starts[1:] = (user[1:] != user[:-1]) | conversion[:-1]
+        journey = np.cumsum(starts) - 1
+        n_journeys = int(journey[-1]) + 1
+
+        converted = np.zeros(n_journeys, dtype=bool)
+        converted[journey[conversion]] = True
+        conv_ts = np.full(n_journeys, np.datetime64("NaT"), dtype="datetime64[ns]")
+        conv_ts[journey[conversion]] = frame["ts"].to_numpy()[conversion]
+        value = np.zeros(n_journeys)
+        value[journey[conversion]] = frame["value"].to_numpy()[conversion]
+
+        touches = frame.loc[~conversion, ["ts", "channel"]].assign(journey=journey[~conversion])
+        j = touches["journey"].to_numpy()
+        in_window = ~converted[j] | (touches["ts"].to_numpy() >= conv_ts[j] - self.lookback.to_timedelta64())
+        touches = touches[in_window]
+
+        # Conversions without any touch in the window are credited to direct.
+        orphan = np.flatnonzero(converted & ~np.isin(np.arange(n_journeys), touches["journey"].to_numpy()))
+        if len(orphan):
+            direct = pd.DataFrame({"ts": conv_ts[orphan], "channel": DIRECT, "journey": orphan})
+            touches = pd.concat([touches, direct], ignore_index=True).sort_values(["journey", "ts"], kind="stable")
+        if touches.empty:
+            return
+
+        touches["code"] = self._codes(touches["channel"].to_numpy())
+        self._add_transitions(touches, converted)
+        self._add_credit(touches[converted[touches["journey"].to_numpy()]], conv_ts, value)
+
+    def _add_transitions(self, touches: pd.DataFrame, converted: np.ndarray) -> None:
+        j = touches["journey"].to_numpy()
+        state = touches["code"].to_numpy() + _FIRST_CHANNEL
+        first = np.ones(len(j), dtype=bool)
+        first[1:] = j[1:] != j[:-1]
+        last = np.ones(len(j), dtype=bool)
+        last[:-1] = j[:-1] != j[1:]
+        previous = np.empty_like(state)
+        previous[0] = _START
+        previous[1:] = state[:-1]
+        previous[first] = _START
+        sources = np.concatenate([previous, state[last]])
+        targets = np.concatenate([state, np.where(converted[j[last]], _CONVERSION, _NULL)])
+        counts = np.bincount(sources * _STATES + targets, minlength=_STATES * _STATES)
+        for pair in np.flatnonzero(counts).tolist():
+            key = divmod(pair, _STATES)
+            self._transitions[key] = self._transitions.get(key, 0) + int(counts[pair])
+
+    def _add_credit(self, touches: pd.DataFrame, conv_ts: np.ndarray, value: np.ndarray) -> None:
+        if touches.empty:
+            return
+        j = touches["journey"].to_numpy()
+        grouped = touches.groupby("journey", sort=False)
+        k = grouped.cumcount().to_numpy()
+        m = grouped["code"].transform("size").to_numpy()
+        first, last = k == 0, k == m - 1
+
+        age = (conv_ts[j] - touches["ts"].to_numpy()) / np.timedelta64(1, "D")
+        decay = 0.5 ** (np.maximum(age, 0.0) / self.half_life_days)
+        decay = decay / pd.Series(decay).groupby(j).transform("sum").to_numpy()
+        middle = np.where(m > 2, 0.2 / np.maximum(m - 2, 1), 0.0)
+        position = np.select([m == 1, m == 2, first | last], [1.0, 0.5, 0.4], default=middle)
+        weights = {
+            "first_touch": first.astype(float),
+            "last_touch": last.astype(float),
+            "linear": 1.0 / m,
+            "time_decay": decay,
+            "position_based": position,
+        }
+        day = conv_ts[j].astype("datetime64[D]")
+        code = touches["code"].to_numpy()
+        frame = pd.DataFrame({"date": day, "code": code})
+        for name, weight in weights.items():
+            frame[name] = weight
+            frame[f"{name}_revenue"] = weight * value[j]
+
+        # Assists: channels on the path other than the one that closed it.
+        last_code = np.zeros(int(j.max()) + 1, dtype=np.int64)
+        last_code[j[last]] = code[last]
+        assists = pd.DataFrame({"journey": j, "date": day, "code": code})[~last & (code != last_code[j])]
+        assisted = assists.drop_duplicates(["journey", "code"]).groupby(["date", "code"]).size()
+        credit = frame.groupby(["date", "code"]).sum()
+        credit["assisted"] = assisted.reindex(credit.index, fill_value=0).to_numpy(dtype=float)
+        self._credit.append(credit)
+
+        # Channel set of every converted journey, for the Markov allocation.
+        distinct = pd.DataFrame({"journey": j, "code": code}).drop_duplicates()
+        bits = np.left_shift(np.uint64(1), distinct["code"].to_numpy().astype(np.uint64))
+        masks = pd.Series(bits).groupby(distinct["journey"].to_numpy()).sum()
+        journeys = masks.index.to_numpy()
+        self._paths.append(
+            pd.DataFrame({
+                "date": conv_ts[journeys].astype("datetime64[D]"),
+                "mask": masks.to_numpy(dtype=np.uint64),
+                "conversions": 1.0,
+                "revenue": value[journeys],
+            })
+            .groupby(["date", "mask"])
+            .sum()
+        )
+        self._compact()
+
+    def _compact(self) -> None:
+        if len(self._credit) > 8:
+            self._credit = [pd.concat(self._credit).groupby(level=[0, 1]).sum()]
+            self._paths = [pd.concat(self._paths).groupby(level=[0, 1]).sum()]
+
+    def _conversion_probability(self, matrix: np.ndarray, removed: int = -1) -> float:
+        matrix = matrix.copy()
+        if removed >= 0:
+            matrix[:, _NULL] += matrix[:, removed]
+            matrix[:, removed] = 0.0
+        transient = [s for s in range(len(matrix)) if s not in (_CONVERSION, _NULL)]
+        q = matrix[np.ix_(transient, transient)]
+        r = matrix[transient, _CONVERSION]
+        try:
+            absorbed = np.linalg.solve(np.eye(len(transient)) - q, r)
+        except np.linalg.LinAlgError:
+            absorbed = np.linalg.lstsq(np.eye(len(transient)) - q, r, rcond=None)[0]
+        return float(absorbed[0])
+
+    def removal_effects(self) -> pd.Series:
+        """Markov removal effect of every channel, indexed by channel name."""
+        names = sorted(self._channels, key=self._channels.get)
+        size = _FIRST_CHANNEL + len(names)
+        counts = np.zeros((size, size))
+        for (source, target), count in self._transitions.items():
+            counts[source, target] = count
+        totals = counts.sum(axis=1, keepdims=True)
+        matrix = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        base = self._conversion_probability(matrix)
+        effects = [
+            1 - self._conversion_probability(matrix, _FIRST_CHANNEL + i) / base if base > 0 else 0.0
+            for i in range(len(names))
+        ]
+        return pd.Series(np.clip(effects, 0.0, 1.0), index=names)
+
+    def _markov_credit(self) -> pd.DataFrame:
+        paths = pd.concat(self._paths).groupby(level=[0, 1]).sum()
+        effects = self.removal_effects().to_numpy()
+        masks = paths.index.get_level_values("mask").to_numpy(dtype=np.uint64)
+        shifts = np.arange(len(effects), dtype=np.uint64)
+        members = ((masks[:, None] >> shifts[None, :]) & np.uint64(1)).astype(bool)
+        weights = np.where(members, effects[None, :], 0.0)
+        totals = weights.sum(axis=1, keepdims=True)
+        # Paths whose channels all have zero effect split credit evenly.
+        even = members / members.sum(axis=1, keepdims=True)
+        weights = np.where(totals > 0, weights / np.where(totals > 0, totals, 1.0), even)
+        rows, codes = np.nonzero(members)
+        dates = paths.index.get_level_values("date").to_numpy()
+        return (
+            pd.DataFrame({
+                "date": dates[rows],
+                "code": codes,
+                "markov": paths["conversions"].to_numpy()[rows] * weights[rows, codes],
+                "markov_revenue": paths["revenue"].to_numpy()[rows] * weights[rows, codes],
+            })
+            .groupby(["date", "code"])
+            .sum()
+        )
+
+    def table(self, model: str = "last_touch") -> pd.DataFrame:
+        """Credit per conversion date and channel under every model.
+
+        Args:
+            model: The model whose attributed revenue fills the `revenue` column.
+
+        Returns:
+            DataFrame with date, channel, one <model>_conversions column per model,
+            assisted_conversions and revenue.
+        """
+        if model not in MODELS:
+            raise ValueError(f"Unknown attribution model '{model}'. Choose from: {', '.join(MODELS)}")
+        columns = ["date", "channel"] + [f"{m}_conversions" for m in MODELS] + ["assisted_conversions", "revenue"]
+        if not self._credit:
+            return pd.DataFrame(columns=columns)
+        credit = pd.concat(self._credit).groupby(level=[0, 1]).sum()
+        credit = credit.join(self._markov_credit(), how="outer").fillna(0.0).reset_index()
+        names = np.array(sorted(self._channels, key=self._channels.get), dtype=object)
+        table = pd.DataFrame({
+            "date": pd.to_datetime(credit["date"]).dt.date,
+            "channel": names[credit["code"].to_numpy()],
+        })
+        for name in MODELS:
+            conversions = credit[name].to_numpy()
+            table[f"{name}_conversions"] = conversions.round().astype(np.int64) if name in (
+                "first_touch", "last_touch") else conversions.round(2)
+        table["assisted_conversions"] = credit["assisted"].to_numpy().astype(np.int64)
+        table["revenue"] = credit[f"{model}_revenue"].to_numpy().round(2)
+        return table[columns].sort_values(["date", "channel"]).reset_index(drop=True)
+
+
+def attribution_table(
+    events: FrameInput,
+    model: str = "last_touch",
+    **kwargs: Any,
+) -> pd.DataFrame:
+    """Attribution table from events (a frame or a user-ordered stream of chunks).
+
+    Keyword arguments are passed to `AttributionAccumulator`.
+    """
+    acc = AttributionAccumulator(**kwargs)
+    for chunk in iter_complete_groups(events, acc.user_col):
+        acc.add(chunk)
+    return acc.table(model=model)
+
+
+def channel_attribution(
+    touchpoints: FrameInput,
+    model: str = "last_touch",
+    lookback_days: float = 30,
+    currency: str = "USD",
+    **kwargs: Any,
+) -> List[ChannelAttribution]:
+    """Compute ChannelAttribution rows from touchpoint and conversion events.
+
+    Args:
+        touchpoints: Events with user_id, timestamp, channel, event and revenue columns.
+        model: Model used for the attributed revenue: first_touch, last_touch,
+            linear, time_decay, position_based or markov.
+        lookback_days: Touches more than this many days before a conversion get no credit.
+        currency: Currency of the conversion values.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = attribution_table(touchpoints, model=model, lookback_days=lookback_days)
+    return [
+        ChannelAttribution(attribution_model=model, currency=currency, **row) for row in table.to_dict("records")
+    ]
@@ -0,0 +1,630 @@
+"""Catalog search engine - an inverted index over product names, brands, categories and attributes.
+
+Products are tokenized into a sorted term dictionary with compressed posting
+lists (one array of document ids and term frequencies per segment). Queries
+are ranked with BM25, name matches weigh double, and the last query word is
+matched as a prefix so partial input works for typeahead. SKU lookups use a
+sorted hash array, so /products/catalog/details never scans the catalog.
+
+The index is a list of immutable segments. Changed products go into a new
+small segment and their old rows are marked deleted; small segments are merged
+once there are too many. Each segment is saved as plain .npy arrays and loaded
+memory-mapped, so opening a multi-million product index is near instant:
+
+    index = CatalogIndex("catalog-index/")
+    index.sync(products)                    # DataFrame of ProductInfo rows
+    index.search("wireless head", category="Electronics", limit=20)
+    index.details("EC-1001")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.utils import hash_keys
+from openec_platform.models.products import ProductInfo
+
+TOKEN_PATTERN = r"\w+"
+MAX_TERM_LENGTH = 32
+
+# Name tokens count this many times towards term frequency.
+NAME_WEIGHT = 2
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A prefix expands to at most this many terms (the most frequent ones).
+MAX_PREFIX_TERMS = 64
+
+# Rank offset per matched query word, so matching more words always ranks first.
+_MATCH_WEIGHT = 1e6
+
+_TEXT_FIELDS = ("brand", "category", "subcategory")
+_ARRAYS = (
+    "terms", "term_offsets", "doc_ids", "tf", "impact_order", "doc_len", "sku_hash", "sku_doc",
+    "key_hash", "row_hash", "category", "categories", "record_offsets", "record_bytes",
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of `text`, truncated to MAX_TERM_LENGTH."""
+    return [t[:MAX_TERM_LENGTH] for t in re.findall(TOKEN_PATTERN, text.lower())]
+
+
+def _product_keys(sku: pd.Series, marketplace: pd.Series) -> np.ndarray:
+    return hash_keys(sku.astype(str) + "\x1f" + marketplace.fillna("").astype(str))
+
+
+def _records(products: pd.DataFrame) -> pd.DataFrame:
+    """Normalize a products frame and serialize each row once."""
+    products = products.reset_index(drop=True)
+    if "marketplace" not in products:
+        products = products.assign(marketplace="")
+    products = products.assign(sku=products["sku"].astype(str), marketplace=products["marketplace"].fillna(""))
+    # Later rows for the same product win.
+    products = products[~products.duplicated(["sku", "marketplace"], keep="last")].reset_index(drop=True)
+    payload = products.to_json(orient="records", lines=True, date_format="iso").splitlines() if len(products) else []
+    return products.assign(_payload=payload, _row_hash=pd.util.hash_array(np.array(payload, dtype=object)))
+
+
+def _snapshot_fingerprint(products: pd.DataFrame) -> str:
+    """Content hash of a catalog snapshot, cheaper than serializing its rows."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join(map(str, products.columns)).encode())
+    for column in products.columns:
+        values = products[column].to_numpy()
+        hashed = None
+        # Nested values such as attribute dicts are hashed by their repr.
+        if not (values.dtype == object and len(values) and isinstance(values[0], (dict, list, tuple, set))):
+            try:
+                hashed = pd.util.hash_array(values, categorize=False)
+            except TypeError:
+                pass
+        if hashed is None:
+            hashed = pd.util.hash_array(np.array(list(map(repr, values)), dtype=object), categorize=False)
+        digest.update(hashed.tobytes())
+    return digest.hexdigest()
+
+
+def _encode(values: Any) -> np.ndarray:
+    """UTF-8 byte strings as a fixed-width array, which sorts and memory-maps."""
+    return np.array([v.encode() for v in values], dtype=bytes) if len(values) else np.array([], dtype="S1")
+
+
+def _best_per_doc(docs: np.ndarray, impacts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Highest impact per document, for words whose prefix matches several terms of one document."""
+    if not len(docs):
+        return docs, impacts
+    order = np.lexsort((-impacts, docs))
+    docs, impacts = docs[order], impacts[order]
+    first = np.r_[True, docs[1:] != docs[:-1]]
+    return docs[first], impacts[first]
+
+
+class _Segment:
+    """One immutable slice of the index, held as flat NumPy arrays."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], deleted: np.ndarray, path: Optional[Path] = None) -> None:
+        self.arrays = arrays
+        self.deleted = deleted
+        self.path = path
+        self._live: Optional[int] = None
+        self._live_length: Optional[float] = None
+        self.__dict__.update(arrays)
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_len)
+
+    @property
+    def live(self) -> int:
+        if self._live is None:
+            self._live = self.size - int(self.deleted.sum())
+        return self._live
+
+    @property
+    def live_length(self) -> float:
+        """Total token weight of the live documents, for the BM25 average length."""
+        if self._live_length is None:
+            self._live_length = float(self.doc_len[~self.deleted].sum())
+        return self._live_length
+
+    @classmethod
+    def build(cls, products: pd.DataFrame) -> "_Segment":
+        """Index a normalized frame produced by `_records`."""
+        n = len(products)
+        docs = np.arange(n)
+        name = products["name"].fillna("").astype(str) if "name" in products else pd.Series("", index=products.index)
+        other = pd.Series("", index=products.index)
+        for field in _TEXT_FIELDS:
+            if field in products:
+                other = other + " " + products[field].fillna("").astype(str)
+        if "attributes" in products:
+            other = other + " " + products["attributes"].map(
+                lambda a: " ".join(str(v) for v in a.values()) if isinstance(a, dict) else ""
+            )
+
+        parts = []
+        for text, weight in ((name, NAME_WEIGHT), (other, 1)):
+            tokens = text.str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+            parts.append(pd.DataFrame({
+                "term": tokens.str.slice(0, MAX_TERM_LENGTH).to_numpy(dtype=object),
+                "doc": docs[tokens.index.to_numpy()],
+                "weight": weight,
+            }))
+        postings = pd.concat(parts, ignore_index=True)
+        codes, vocab = pd.factorize(postings["term"])
+        terms = _encode(vocab)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[np.argsort(terms, kind="stable")] = np.arange(len(terms))
+        term = rank[codes]
+        grouped = (
+            pd.DataFrame({"term": term, "doc": postings["doc"].to_numpy(), "weight": postings["weight"].to_numpy()})
+            .groupby(["term", "doc"], sort=True)["weight"]
+            .sum()
+        )
+        posting_terms = grouped.index.get_level_values(0).to_numpy()
+        posting_docs = grouped.index.get_level_values(1).to_numpy()
+        doc_len = np.bincount(postings["doc"].to_numpy(), weights=postings["weight"].to_numpy(), minlength=n)
+        # Postings of each term by decreasing BM25 term weight, for early termination of one-word queries.
+        tf = grouped.to_numpy().astype(float)
+        weight = tf / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len[posting_docs] / max(doc_len.mean(), 1e-9)))
+        impact_order = np.lexsort((posting_docs, -weight, posting_terms))
+
+        sku_hash = hash_keys(products["sku"])
+        sku_doc = np.argsort(sku_hash, kind="stable")
+        key_hash = _product_keys(products["sku"], products["marketplace"])
+        category = products["category"] if "category" in products else pd.Series("", index=products.index)
+        category_codes, categories = pd.factorize(category.fillna("").astype(str).str.lower())
+        payload = [p.encode() for p in products["_payload"]]
+        arrays = {
+            "terms": np.sort(terms),
+            "term_offsets": np.searchsorted(posting_terms, np.arange(len(terms) + 1)).astype(np.int64),
+            "doc_ids": posting_docs.astype(np.int32),
+            "tf": tf.astype(np.float32),
+            "impact_order": impact_order.astype(np.int64),
+            "doc_len": doc_len.astype(np.float32),
+            "sku_hash": sku_hash[sku_doc],
+            "sku_doc": sku_doc.astype(np.int32),
+            "key_hash": key_hash,
+            "row_hash": products["_row_hash"].to_numpy(dtype=np.uint64),
+            "category": category_codes.astype(np.int32),
+            "categories": _encode(categories),
+            "record_offsets": np.concatenate([[0], np.cumsum([len(p) for p in payload])]).astype(np.int64),
+            "record_bytes": np.frombuffer(b"".join(payload), dtype=np.uint8),
+        }
+        return cls(arrays, np.zeros(n, dtype=bool))
+
+    def save(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        for name, array in self.arrays.items():
+            np.save(path / f"{name}.npy", np.ascontiguousarray(array))
+        self.save_deleted(path)
+        self.path = path
+
+    def save_deleted(self, path: Optional[Path] = None) -> None:
+        path = path or self.path
+        if path is not None:
+            np.save(path / "deleted.tmp.npy", self.deleted)
+            (path / "deleted.tmp.npy").replace(path / "deleted.npy")
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "_Segment":
+        mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+        return cls(arrays, np.load(path / "deleted.npy").copy(), path)
+
+    def record(self, doc: int) -> Dict[str, Any]:
+        start, end = self.record_offsets[doc], self.record_offsets[doc + 1]
+        return json.loads(bytes(self.record_bytes[start:end]))
+
+    def docs_for_sku(self, sku: str) -> np.ndarray:
+        h = hash_keys(np.array([sku], dtype=object))[0]
+        lo, hi = np.searchsorted(self.sku_hash, h, side="left"), np.searchsorted(self.sku_hash, h, side="right")
+        docs = np.sort(self.sku_doc[lo:hi])
+        return docs[~self.deleted[docs]]
+
+    def term_range(self, term: str, prefix: bool) -> Tuple[int, int]:
+        key = term.encode()
+        lo = int(np.searchsorted(self.terms, key, side="left"))
+        if not prefix:
+            hit = lo < len(self.terms) and self.terms[lo] == key
+            return (lo, lo + 1) if hit else (lo, lo)
+        # Every term starting with `key` sorts between key and key + 0xff.
+        return lo, int(np.searchsorted(self.terms, key + b"\xff", side="left"))
+
+    def expand(self, token: str, prefix: bool) -> np.ndarray:
+        """Term ids matching `token`, or every term it prefixes (the most frequent ones)."""
+        lo, hi = self.term_range(token, prefix)
+        term_ids = np.arange(lo, hi)
+        if len(term_ids) > MAX_PREFIX_TERMS:
+            counts = self.term_offsets[term_ids + 1] - self.term_offsets[term_ids]
+            term_ids = np.sort(term_ids[np.argsort(-counts, kind="stable")[:MAX_PREFIX_TERMS]])
+        return term_ids
+
+    def _impacts(
+        self, term_id: int, positions: np.ndarray, df: Dict[bytes, int], n_docs: int, avg_len: float
+    ) -> np.ndarray:
+        """BM25 contribution of a term at the given posting positions."""
+        docs = self.doc_ids[positions]
+        tf = self.tf[positions].astype(float)
+        freq = df[self.terms[term_id]]
+        idf = np.log(1 + (n_docs - freq + 0.5) / (freq + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / max(avg_len, 1e-9))
+        return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    def _keep(self, docs: np.ndarray, code: Optional[int]) -> np.ndarray:
+        keep = ~self.deleted[docs]
+        return keep & (self.category[docs] == code) if code is not None else keep
+
+    def score(
+        self,
+        words: List[Tuple[np.ndarray, Dict[bytes, int]]],
+        n_docs: int,
+        avg_len: float,
+        limit: int,
+        code: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate documents for the top `limit`, with rank = words matched * _MATCH_WEIGHT + BM25.
+
+        One word reads only the head of each term's impact-ordered postings.
+        Several words first score the documents matching all of them, found
+        from the rarest word's postings; only when fewer than `limit` match
+        all words are the remaining postings scored.
+        """
+        words = [(term_ids, df) for term_ids, df in words if len(term_ids)]
+        if not words:
+            return np.array([], dtype=np.int64), np.array([])
+        if len(words) == 1:
+            return self._top_single(words[0], n_docs, avg_len, limit, code)
+
+        postings = [int((self.term_offsets[t + 1] - self.term_offsets[t]).sum()) for t, _ in words]
+        term_ids, _ = words[int(np.argmin(postings))]
+        candidates = np.concatenate([
+            self.doc_ids[self.term_offsets[t]:self.term_offsets[t + 1]] for t in term_ids.tolist()
+        ]).astype(np.int64)
+        if len(term_ids) > 1:
+            candidates = np.unique(candidates)
+        candidates = candidates[self._keep(candidates, code)]
+        total = np.zeros(len(candidates))
+        matched = np.zeros(len(candidates), dtype=np.int64)
+        for term_ids, df in words:
+            best = np.zeros(len(candidates))
+            for term_id in term_ids.tolist():
+                start, end = int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+                found = np.minimum(np.searchsorted(self.doc_ids[start:end], candidates), end - start - 1) + start
+                hit = self.doc_ids[found] == candidates
+                if hit.any():
+                    best[hit] = np.maximum(best[hit], self._impacts(term_id, found[hit], df, n_docs, avg_len))
+            total += best
+            matched += best > 0
+        everywhere = matched == len(words)
+        if everywhere.sum() >= limit:
+            return candidates[everywhere], len(words) * _MATCH_WEIGHT + total[everywhere]
+        return self._score_all(words, n_docs, avg_len, code, sum(postings))
+
+    def _top_single(
+        self, word: Tuple[np.ndarray, Dict[bytes, int]], n_docs: int, avg_len: float, limit: int, code: Optional[int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        term_ids, df = word
+        docs, impacts = [], []
+        for term_id in term_ids.tolist():
+            start, end = int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+            window = max(4 * limit, 64)
+            while True:
+                positions = self.impact_order[start:min(start + window, end)]
+                keep = self._keep(self.doc_ids[positions], code)
+                if keep.sum() >= limit or start + window >= end:
+                    break
+                window *= 4
+            positions = positions[keep]
+            docs.append(self.doc_ids[positions].astype(np.int64))
+            impacts.append(self._impacts(term_id, positions, df, n_docs, avg_len))
+        docs, impacts = _best_per_doc(np.concatenate(docs), np.concatenate(impacts))
+        return docs, _MATCH_WEIGHT + impacts
+
+    def _score_all(
+        self,
+        words: List[Tuple[np.ndarray, Dict[bytes, int]]],
+        n_docs: int,
+        avg_len: float,
+        code: Optional[int],
+        postings: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Score every posting of every word, in dense arrays when the postings cover much of the segment."""
+        dense = postings > self.size // 8
+        total = np.zeros(self.size) if dense else None
+        matched = np.zeros(self.size, dtype=np.int64) if dense else None
+        parts = []
+        for term_ids, df in words:
+            docs = np.concatenate([
+                self.doc_ids[self.term_offsets[t]:self.term_offsets[t + 1]] for t in term_ids.tolist()
+            ]).astype(np.int64)
+            impacts = np.concatenate([
+                self._impacts(t, np.arange(self.term_offsets[t], self.term_offsets[t + 1]), df, n_docs, avg_len)
+                for t in term_ids.tolist()
+            ])
+            if len(term_ids) > 1:
+                docs, impacts = _best_per_doc(docs, impacts)
+            if dense:
+                total[docs] += impacts
+                matched[docs] += 1
+            else:
+                parts.append((docs, impacts))
+        if dense:
+            docs = np.flatnonzero(matched)
+            rank = matched[docs] * _MATCH_WEIGHT + total[docs]
+        else:
+            docs, inverse = np.unique(np.concatenate([d for d, _ in parts]), return_inverse=True)
+            rank = (
+                np.bincount(inverse) * _MATCH_WEIGHT
+                + np.bincount(inverse, weights=np.concatenate([i for _, i in parts]))
+            )
+        keep = self._keep(docs, code)
+        return docs[keep], rank[keep]
+
+    def delete(self, docs: np.ndarray) -> int:
+        """Mark documents deleted; returns how many were live."""
+        docs = docs[~self.deleted[docs]]
+        if len(docs):
+            self.deleted[docs] = True
+            self._live = self._live_length = None
+            self.save_deleted()
+        return len(docs)
+
+    def category_code(self, category: str) -> int:
+        matches = np.flatnonzero(self.categories == category.lower().encode())
+        return int(matches[0]) if len(matches) else -1
+
+
+class CatalogIndex:
+    """Searchable, incrementally updated product catalog index.
+
+    Args:
+        directory: Where to persist segments. When it already holds an index it
+            is loaded memory-mapped; otherwise the index lives in memory.
+        max_segments: Merge the update segments once there are more than this.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None, max_segments: int = 8) -> None:
+        self.directory = Path(directory) if directory else None
+        self.max_segments = max_segments
+        self._segments: List[_Segment] = []
+        self._lock = threading.RLock()
+        self._next_id = 0
+        # Fingerprint of the snapshot last synced, while nothing else changed the index.
+        self._synced: Optional[str] = None
+        if self.directory is not None and (self.directory / "manifest.json").exists():
+            manifest = json.loads((self.directory / "manifest.json").read_text())
+            self._segments = [_Segment.load(self.directory / name) for name in manifest["segments"]]
+            self._next_id = manifest["next_id"]
+
+    def __len__(self) -> int:
+        return sum(segment.live for segment in self._segments)
+
+    # -- updates ------------------------------------------------------------
+
+    def upsert(self, products: pd.DataFrame) -> int:
+        """Add new products and replace changed ones.
+
+        Products are identified by (sku, marketplace). Rows identical to the
+        indexed version are skipped.
+
+        Returns:
+            Number of products added or replaced.
+        """
+        if products.empty:
+            return 0
+        self._synced = None
+        records = _records(products)
+        keys = _product_keys(records["sku"], records["marketplace"])
+        row_hash = records["_row_hash"].to_numpy(dtype=np.uint64)
+        with self._lock:
+            unchanged = np.zeros(len(records), dtype=bool)
+            stale = []
+            for segment in self._segments:
+                live = ~segment.deleted
+                indexed = pd.Series(segment.row_hash[live], index=segment.key_hash[live])
+                indexed = indexed[~indexed.index.duplicated(keep="last")]
+                previous = indexed.reindex(keys).to_numpy()
+                unchanged |= previous == row_hash
+                stale.append((segment, np.flatnonzero(live)[np.isin(segment.key_hash[live], keys)]))
+            changed = records[~unchanged]
+            if changed.empty:
+                return 0
+            changed_keys = keys[~unchanged]
+            for segment, docs in stale:
+                segment.delete(docs[np.isin(segment.key_hash[docs], changed_keys)])
+            self._add_segment(_Segment.build(changed.reset_index(drop=True)))
+            return len(changed)
+
+    def remove(self, skus: List[str]) -> int:
+        """Delete every product with one of these SKUs. Returns the number removed."""
+        removed = 0
+        with self._lock:
+            self._synced = None
+            for segment in self._segments:
+                for sku in skus:
+                    removed += segment.delete(segment.docs_for_sku(sku))
+        return removed
+
+    def sync(self, products: pd.DataFrame) -> int:
+        """Make the index match a full catalog snapshot: upsert changes, drop missing products.
+
+        A snapshot identical to the one last synced is recognized by its
+        fingerprint and skipped, so syncing on every query is cheap while the
+        catalog does not change.
+
+        Returns:
+            Number of products added, replaced or removed.
+        """
+        fingerprint = _snapshot_fingerprint(products)
+        with self._lock:
+            if fingerprint == self._synced:
+                return 0
+            if products.empty:
+                changed = sum(segment.delete(np.arange(segment.size)) for segment in self._segments)
+            else:
+                marketplace = (
+                    products["marketplace"] if "marketplace" in products else pd.Series("", index=products.index)
+                )
+                keys = _product_keys(products["sku"].astype(str), marketplace)
+                removed = sum(
+                    segment.delete(np.flatnonzero(~np.isin(segment.key_hash, keys))) for segment in self._segments
+                )
+                changed = removed + self.upsert(products)
+            self._synced = fingerprint
+            return changed
+
+    def _add_segment(self, segment: _Segment) -> None:
+        self._segments.append(segment)
+        if len(self._segments) > self.max_segments:
+            self._compact()
+        elif self.directory is not None:
+            self._persist_new(segment)
+            self._write_manifest()
+
+    def _persist_new(self, segment: _Segment) -> None:
+        self._next_id += 1
+        segment.save(self.directory / f"segment-{self._next_id:06d}")
+
+    def _write_manifest(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = {"segments": [s.path.name for s in self._segments], "next_id": self._next_id}
+        tmp = self.directory / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest))
+        tmp.replace(self.directory / "manifest.json")
+
+    def _compact(self) -> None:
+        """Merge the update segments, and the base segment too once a fifth of it is deleted."""
+        base = self._segments[0]
+        merge = self._segments[1:] if base.deleted.mean() < 0.2 else self._segments
+        keep = [s for s in self._segments if s not in merge]
+        rows = [segment.record(doc) for segment in merge for doc in np.flatnonzero(~segment.deleted)]
+        merged = [_Segment.build(_records(pd.DataFrame(rows)))] if rows else []
+        old_paths = [s.path for s in merge if s.path is not None]
+        self._segments = keep + merged
+        if self.directory is not None:
+            for segment in merged:
+                self._persist_new(segment)
+            self._write_manifest()
+            for path in old_paths:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def save(self, directory: Optional[Union[str, Path]] = None) -> None:
+        """Persist an in-memory index (or re-target a persisted one) to `directory`."""
+        with self._lock:
+            self.directory = Path(directory) if directory else self.directory
+            if self.directory is None:
+                raise ValueError("CatalogIndex.save needs a directory")
+            for segment in self._segments:
+                if segment.path is None or segment.path.parent != self.directory:
+                    self._persist_new(segment)
+            self._write_manifest()
+
+    # -- queries ------------------------------------------------------------
+
+    def details(self, sku: str) -> List[Dict[str, Any]]:
+        """All indexed products with this SKU (one per marketplace)."""
+        with self._lock:
+            segments = list(self._segments)
+        return [segment.record(int(doc)) for segment in segments for doc in segment.docs_for_sku(sku)]
+
+    def search(self, query: str = "", category: str = "", limit: int = 20, prefix: bool = True) -> List[Dict[str, Any]]:
+        """Ranked products matching `query`, optionally within a category.
+
+        Products matching more query words rank first, then by BM25 score. With
+        `prefix`, the last word also matches longer terms ("head" finds
+        "headphones"). An empty query lists the category.
+
+        Returns:
+            Product records, best match first, with a "score" field.
+        """
+        tokens = tokenize(query)
+        with self._lock:
+            segments = list(self._segments)
+        n_docs = sum(s.live for s in segments)
+        if not n_docs:
+            return []
+        avg_len = sum(s.live_length for s in segments) / n_docs
+
+        # Expand each word to term ids per segment, then sum document frequencies
+        # across segments (deleted rows included, as is usual for BM25).
+        expansions = []
+        for i, token in enumerate(tokens):
+            per_segment = [s.expand(token, prefix and i == len(tokens) - 1) for s in segments]
+            df: Dict[bytes, int] = {}
+            for segment, term_ids in zip(segments, per_segment):
+                counts = segment.term_offsets[term_ids + 1] - segment.term_offsets[term_ids]
+                for term, count in zip(segment.terms[term_ids].tolist(), counts.tolist()):
+                    df[term] = df.get(term, 0) + count
+            expansions.append((per_segment, df))
+
+        ranks, docs, owners = [], [], []
+        for si, segment in enumerate(segments):
+            code = segment.category_code(category) if category else None
+            if code == -1:
+                continue
+            if tokens:
+                doc, rank = segment.score(
+                    [(per_segment[si], df) for per_segment, df in expansions], n_docs, avg_len, limit, code
+                )
+            else:
+                doc = np.flatnonzero(segment._keep(np.arange(segment.size), code))
+                rank = np.zeros(len(doc))
+            ranks.append(rank)
+            docs.append(doc)
+            owners.append(np.full(len(doc), si))
+        if not ranks:
+            return []
+        ranks, docs, owners = np.concatenate(ranks), np.concatenate(docs), np.concatenate(owners)
+        top = np.argpartition(-ranks, limit - 1)[:limit] if len(ranks) > limit else np.arange(len(ranks))
+        top = top[np.lexsort((docs[top], owners[top], -ranks[top]))]
+        results = []
+        for i in top:
+            record = segments[owners[i]].record(int(docs[i]))
+            record["score"] = round(float(ranks[i] % _MATCH_WEIGHT), 4)
+            results.append(record)
+        return results
+
+
+_default_index = CatalogIndex()
+
+
+def catalog_search(
+    products: pd.DataFrame,
+    query: str = "",
+    category: str = "",
+    sku: str = "",
+    limit: int = 20,
+    index: Optional[CatalogIndex] = None,
+    **kwargs: Any,
+) -> List[ProductInfo]:
+    """Serve /products/catalog/search and /products/catalog/details from a CatalogIndex.
+
+    Args:
+        products: The current catalog as ProductInfo-shaped rows; the index is
+            synced to it first, which is skipped while the catalog is unchanged
+            and otherwise re-indexes only products that changed.
+        query: Search words; the last one may be partial.
+        category: Only return products in this category (case-insensitive).
+        sku: Return this SKU's details instead of searching.
+        limit: Maximum number of search results.
+        index: Index to use. Defaults to a shared in-memory index; pass a
+            persisted `CatalogIndex(directory)` to reuse it across restarts.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    index = index if index is not None else _default_index
+    index.sync(products)
+    records = index.details(sku) if sku else index.search(query, category=category, limit=int(limit))
+    fields = ProductInfo.model_fields
+    return [ProductInfo(**{k: v for k, v in r.items() if k in fields}) for r in records]
@@ -0,0 +1,184 @@
+"""Cohort retention engine - computes CustomerCohort from order-level data.
+
+Customers are assigned to the period of their first order (their acquisition
+cohort). For every cohort and every period since acquisition, the engine
+counts the customers who ordered again and the revenue they generated.
+
+Orders are reduced chunk by chunk to one row per (customer, period) with
+integer group-bys on hashed customer ids, so memory scales with active
+customer-periods rather than with the number of orders.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.utils import FrameInput, hash_keys, iter_chunks
+from openec_platform.models.customers import CustomerCohort
+
+PERIODS = ("daily", "weekly", "monthly", "quarterly")
+
+_COLUMNS = ["cohort_date", "period", "cohort_size", "retained", "retention_rate", "revenue"]
+
+# 1970-01-01 was a Thursday; shift so weekly buckets start on Monday.
+_WEEK_OFFSET = 3
+
+
+def _period_index(dates: pd.Series, period: str) -> np.ndarray:
+    """Map timestamps to consecutive integer period numbers."""
+    if period == "daily":
+        return dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    if period == "weekly":
+        return (dates.to_numpy(dtype="datetime64[D]").astype(np.int64) + _WEEK_OFFSET) // 7
+    years = dates.dt.year.to_numpy(dtype=np.int64)
+    months = dates.dt.month.to_numpy(dtype=np.int64) - 1
+    if period == "monthly":
+        return years * 12 + months
+    return years * 4 + months // 3
+
+
+def _period_start(index: np.ndarray, period: str) -> List[date]:
+    """Inverse of `_period_index`: first day of each period."""
+    if period == "daily":
+        return list(index.astype("datetime64[D]").astype(object))
+    if period == "weekly":
+        return list((index * 7 - _WEEK_OFFSET).astype("datetime64[D]").astype(object))
+    if period == "monthly":
+        return [date(int(i) // 12, int(i) % 12 + 1, 1) for i in index]
+    return [date(int(i) // 4, (int(i) % 4) * 3 + 1, 1) for i in index]
+
+
+class CohortAccumulator:
+    """Incremental cohort aggregation over chunks of orders.
+
+    Usage:
+        acc = CohortAccumulator(period="monthly")
+        for chunk in pd.read_csv("orders.csv", chunksize=1_000_000):
+            acc.add(chunk)
+        cohorts = acc.matrix()
+
+    New orders can be added at any time; `matrix()` reflects everything added
+    so far.
+    """
+
+    def __init__(
+        self,
+        period: str = "monthly",
+        customer_col: str = "customer_id",
+        date_col: str = "date",
+        value_col: str = "total",
+        compact_rows: int = 5_000_000,
+    ) -> None:
+        """Initialize the accumulator.
+
+        Args:
+            period: Cohort granularity: daily, weekly, monthly or quarterly.
+            customer_col: Column holding the customer identifier.
+            date_col: Column holding the order timestamp.
+            value_col: Column holding the order value.
+            compact_rows: Merge pending partial aggregates once they exceed this many rows.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown cohort period '{period}'. Choose from: {', '.join(PERIODS)}")
+        self.period = period
+        self.customer_col = customer_col
+        self.date_col = date_col
+        self.value_col = value_col
+        self.compact_rows = compact_rows
+        self._parts: List[pd.DataFrame] = []
+        self._pending_rows = 0
+
+    def add(self, orders: pd.DataFrame) -> None:
+        """Fold a chunk of orders into the running aggregate."""
+        orders = orders[orders[self.customer_col].notna() & (orders[self.customer_col] != "")]
+        if orders.empty:
+            return
+        reduced = (
+            pd.DataFrame({
+                "customer": hash_keys(orders[self.customer_col]),
+                "bucket": _period_index(pd.to_datetime(orders[self.date_col]), self.period),
+                "revenue": pd.to_numeric(orders[self.value_col], errors="coerce").fillna(0.0).to_numpy(),
+            })
+            .groupby(["customer", "bucket"], sort=False)["revenue"]
+            .sum()
+            .reset_index()
+        )
+        self._parts.append(reduced)
+        self._pending_rows += len(reduced)
+        if self._pending_rows > self.compact_rows:
+            self._compact()
+
+    def _compact(self) -> pd.DataFrame:
+        if len(self._parts) > 1:
+            merged = pd.concat(self._parts, ignore_index=True)
+            self._parts = [merged.groupby(["customer", "bucket"], sort=False)["revenue"].sum().reset_index()]
+        self._pending_rows = len(self._parts[0]) if self._parts else 0
+        return self._parts[0] if self._parts else pd.DataFrame(columns=["customer", "bucket", "revenue"])
+
+    def matrix(self, max_periods: Optional[int] = None) -> pd.DataFrame:
+        """The cohort x period matrix in long form.
+
+        Returns:
+            DataFrame with cohort_date, period, cohort_size, retained,
+            retention_rate (percent) and revenue.
+        """
+        activity = self._compact()
+        if activity.empty:
+            return pd.DataFrame(columns=_COLUMNS)
+
+        cohort = activity.groupby("customer")["bucket"].transform("min").to_numpy()
+        offset = activity["bucket"].to_numpy() - cohort
+        cells = (
+            pd.DataFrame({"cohort": cohort, "period": offset, "revenue": activity["revenue"].to_numpy()})
+            .groupby(["cohort", "period"], sort=True)
+            .agg(retained=("revenue", "size"), revenue=("revenue", "sum"))
+            .reset_index()
+        )
+        if max_periods is not None:
+            cells = cells[cells["period"] <= max_periods]
+        sizes = cells.loc[cells["period"] == 0].set_index("cohort")["retained"]
+        cells["cohort_size"] = cells["cohort"].map(sizes).to_numpy()
+        cells["retention_rate"] = (cells["retained"] / cells["cohort_size"] * 100).round(2)
+        cells["revenue"] = cells["revenue"].round(2)
+        cells["cohort_date"] = _period_start(cells["cohort"].to_numpy(), self.period)
+        return cells[_COLUMNS]
+
+
+def cohort_matrix(
+    orders: FrameInput,
+    period: str = "monthly",
+    max_periods: Optional[int] = None,
+    **kwargs: Any,
+) -> pd.DataFrame:
+    """Compute the cohort retention matrix from orders (a frame or chunks).
+
+    Keyword arguments are passed to `CohortAccumulator` (column names).
+    """
+    acc = CohortAccumulator(period=period, **kwargs)
+    for chunk in iter_chunks(orders):
+        acc.add(chunk)
+    return acc.matrix(max_periods=max_periods)
+
+
+def cohort_retention(
+    orders: FrameInput,
+    period: str = "monthly",
+    max_periods: Optional[int] = None,
+    currency: str = "USD",
+    **kwargs: Any,
+) -> List[CustomerCohort]:
+    """Compute CustomerCohort rows from OrderDetail-shaped data.
+
+    Args:
+        orders: Orders with customer_id, date and total columns, as one frame or chunks.
+        period: Cohort granularity: daily, weekly, monthly or quarterly.
+        max_periods: Drop cells more than this many periods after acquisition.
+        currency: Currency of the order totals.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    matrix = cohort_matrix(orders, period=period, max_periods=max_periods)
+    return [CustomerCohort(currency=currency, **row) for row in matrix.to_dict("records")]
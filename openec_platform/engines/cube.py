@@ -0,0 +1,355 @@
+"""Sales cube - materialized rollups of sales facts for drill-down queries.
+
+Category dashboards, sales summaries and order metrics are all slices of the
+same additive facts: units, revenue and orders by date x product x
+marketplace. The cube keeps those facts pre-aggregated at several levels of
+each dimension's hierarchy:
+
+    time         day -> week | month -> all
+    product      sku -> subcategory -> category -> all
+    marketplace  marketplace -> all
+
+Each materialized combination of levels (a cuboid) is a DataFrame. When new
+facts arrive, they replace the base rows of the days they cover, and only
+the periods those days fall in are recomputed in the other cuboids, each
+from the nearest finer cuboid. A query is answered by
+rolling up the smallest materialized cuboid that is fine enough, and
+`market_share` divides by the parent level's totals, which are materialized
+too.
+
+    cube = SalesCube()
+    cube.update(sales)                      # SalesHistorical rows
+    cube.query({"time": "week", "product": "category"}, category="Electronics")
+    cube.market_share({"time": "month", "product": "subcategory"}, category="Electronics")
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.models.analytics import CategoryPerformance
+
+ALL = "all"
+TIME_LEVELS = ("day", "week", "month")
+DEFAULT_HIERARCHIES: Dict[str, Tuple[str, ...]] = {
+    "product": ("sku", "subcategory", "category"),
+    "marketplace": ("marketplace",),
+}
+MEASURES = ("units_sold", "revenue", "orders", "views", "returns")
+
+Cuboid = Tuple[str, ...]  # one level per dimension: time first, then each hierarchy
+
+
+def period_start(dates: Any, level: str) -> np.ndarray:
+    """First day of the day, week (Monday) or month containing each date."""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if level == "week":
+        number = days.astype(np.int64)
+        days = (number - (number + 3) % 7).astype("datetime64[D]")  # 1970-01-01 was a Thursday
+    elif level == "month":
+        days = days.astype("datetime64[M]").astype("datetime64[D]")
+    return days.astype("datetime64[ns]")
+
+
+class SalesCube:
+    """Materialized rollups of additive sales measures.
+
+    Args:
+        hierarchies: Levels of each non-time dimension, finest first, e.g.
+            {"product": ("sku", "subcategory", "category")}. Each level must
+            determine the coarser ones (a SKU has one category).
+        time_levels: Time levels; "day" first, then any of "week" and "month".
+        measures: Additive columns summed in every cuboid. Missing columns count as 0.
+        materialize: Cuboids to keep, as {dimension: level} dicts (dimensions
+            left out are rolled up to "all"). Defaults to every combination
+            above the finest product level.
+    """
+
+    def __init__(
+        self,
+        hierarchies: Optional[Dict[str, Sequence[str]]] = None,
+        time_levels: Sequence[str] = TIME_LEVELS,
+        measures: Sequence[str] = MEASURES,
+        materialize: Optional[List[Dict[str, str]]] = None,
+    ) -> None:
+        self.hierarchies = {k: tuple(v) for k, v in (hierarchies or DEFAULT_HIERARCHIES).items()}
+        self.time_levels = tuple(time_levels)
+        if self.time_levels[0] != "day":
+            raise ValueError("time_levels must start with 'day'")
+        self.measures = list(measures)
+        self.dimensions = ["time", *self.hierarchies]
+        self.base: Cuboid = ("day", *(levels[0] for levels in self.hierarchies.values()))
+        self._keys = ["date", *(levels[0] for levels in self.hierarchies.values())]
+
+        cuboids = {self.base}
+        if materialize is None:
+            product, *others = self.hierarchies.values()
+            for combo in itertools.product(
+                self.time_levels + (ALL,), product[1:] + (ALL,), *(levels + (ALL,) for levels in others)
+            ):
+                cuboids.add(combo)
+        else:
+            cuboids.update(self._cuboid(spec) for spec in materialize)
+        # Finest first, so a cuboid's sources are always updated before it.
+        self._order = sorted(cuboids, key=self._coarseness)
+        self._views: Dict[Cuboid, pd.DataFrame] = {c: self._empty(c) for c in self._order}
+        self._lock = threading.Lock()
+
+    # -- levels -------------------------------------------------------------
+
+    def _levels(self, dimension: str) -> Tuple[str, ...]:
+        return self.time_levels if dimension == "time" else self.hierarchies[dimension]
+
+    def _rank(self, dimension: str, level: str) -> int:
+        if level == ALL:
+            return len(self._levels(dimension)) + 1
+        if dimension == "time":
+            return 0 if level == "day" else 1
+        return self.hierarchies[dimension].index(level)
+
+    def _coarseness(self, cuboid: Cuboid) -> int:
+        return sum(self._rank(d, level) for d, level in zip(self.dimensions, cuboid))
+
+    def _rolls_up(self, dimension: str, source: str, target: str) -> bool:
+        """Whether `source` level rows can be summed into `target` level rows."""
+        if target == ALL or source == target:
+            return True
+        if source == ALL:
+            return False
+        if dimension == "time":
+            return source == "day"
+        levels = self.hierarchies[dimension]
+        return levels.index(source) <= levels.index(target)
+
+    def _cuboid(self, spec: Dict[str, str]) -> Cuboid:
+        unknown = set(spec) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions {sorted(unknown)}; expected {self.dimensions}")
+        cuboid = tuple(spec.get(d, ALL) or ALL for d in self.dimensions)
+        for dimension, level in zip(self.dimensions, cuboid):
+            if level != ALL and level not in self._levels(dimension):
+                raise ValueError(f"Unknown {dimension} level '{level}'; expected one of {self._levels(dimension)}")
+        return cuboid
+
+    def _columns(self, cuboid: Cuboid) -> List[str]:
+        """Dimension columns of a cuboid: the date, then each level with the coarser levels it determines."""
+        columns = [] if cuboid[0] == ALL else ["date"]
+        for dimension, level in zip(self.dimensions[1:], cuboid[1:]):
+            if level != ALL:
+                levels = self.hierarchies[dimension]
+                columns.extend(levels[levels.index(level):])
+        return columns
+
+    def _empty(self, cuboid: Cuboid) -> pd.DataFrame:
+        return pd.DataFrame(columns=self._columns(cuboid) + self.measures)
+
+    def _rollup(self, frame: pd.DataFrame, target: Cuboid) -> pd.DataFrame:
+        columns = self._columns(target)
+        if "date" in columns and len(frame):
+            frame = frame.assign(date=period_start(frame["date"], target[0]))
+        if not columns:
+            return pd.DataFrame([frame[self.measures].sum()], columns=self.measures)
+        return frame.groupby(columns, sort=False, dropna=False)[self.measures].sum().reset_index()
+
+    def _source(self, target: Cuboid, needs: Sequence[str] = (), exclude: Optional[Cuboid] = None) -> Cuboid:
+        """Smallest materialized cuboid that rolls up to `target` and has the `needs` columns."""
+        candidates = [
+            c for c in self._order
+            if c != exclude
+            and all(self._rolls_up(d, s, t) for d, s, t in zip(self.dimensions, c, target))
+            and set(needs) <= set(self._columns(c))
+        ]
+        if not candidates:
+            raise ValueError(f"No materialized level can answer {dict(zip(self.dimensions, target))}")
+        return min(candidates, key=lambda c: len(self._views[c]))
+
+    # -- updates ------------------------------------------------------------
+
+    def update(self, facts: pd.DataFrame, scope: Optional[Dict[str, Any]] = None) -> None:
+        """Fold new or restated fact rows into every cuboid.
+
+        The facts replace everything held for the days they cover (e.g. a
+        re-fetched day), so rows that disappeared from the source are dropped
+        too. Only the affected periods of the coarser cuboids are recomputed.
+
+        Args:
+            facts: Fact rows with the base level columns and the measures.
+            scope: Filters the facts were fetched with, e.g. {"category":
+                "Electronics"}: only rows within them are replaced on the
+                covered days. A filter some fact rows do not satisfy is
+                ignored, since the source evidently did not apply it.
+        """
+        if facts.empty:
+            return
+        base_columns = self._columns(self.base)
+        frame = pd.DataFrame({
+            c: period_start(pd.to_datetime(facts[c], format="ISO8601"), "day") if c == "date"
+            else (facts[c].fillna("").astype(str).to_numpy(dtype=object) if c in facts else "")
+            for c in base_columns
+        })
+        for measure in self.measures:
+            frame[measure] = (
+                pd.to_numeric(facts[measure], errors="coerce").fillna(0).to_numpy() if measure in facts else 0
+            )
+        new = self._rollup(frame, self.base)
+        days = np.unique(new["date"].to_numpy())
+        scope = {
+            column: str(value) for column, value in (scope or {}).items()
+            if value not in ("", None) and column in new and (new[column] == str(value)).all()
+        }
+
+        with self._lock:
+            base = self._views[self.base]
+            if len(base):
+                replaced = np.isin(base["date"].to_numpy(), days)
+                for column, value in scope.items():
+                    replaced &= (base[column] == value).to_numpy()
+                # Rows outside the scope are still replaced when the fetch restated them.
+                replaced |= pd.util.hash_pandas_object(base[self._keys], index=False).isin(
+                    pd.util.hash_pandas_object(new[self._keys], index=False)
+                ).to_numpy()
+                base = pd.concat([base[~replaced], new], ignore_index=True)
+            else:
+                base = new
+            self._views[self.base] = base
+
+            for cuboid in self._order:
+                if cuboid == self.base:
+                    continue
+                view = self._views[cuboid]
+                source = self._views[self._source(cuboid, exclude=cuboid)]
+                if cuboid[0] == ALL:
+                    self._views[cuboid] = self._rollup(source, cuboid)
+                    continue
+                periods = np.unique(period_start(days, cuboid[0]))
+                affected = np.isin(period_start(source["date"], cuboid[0]), periods)
+                kept = view[~np.isin(view["date"].to_numpy(), periods)] if len(view) else view
+                self._views[cuboid] = pd.concat(
+                    [kept, self._rollup(source[affected], cuboid)], ignore_index=True
+                ) if len(kept) else self._rollup(source[affected], cuboid)
+
+    # -- queries ------------------------------------------------------------
+
+    def query(
+        self,
+        levels: Optional[Dict[str, str]] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        **filters: Any,
+    ) -> pd.DataFrame:
+        """Aggregate the measures at the requested levels.
+
+        Args:
+            levels: A level per dimension, e.g. {"time": "week", "product":
+                "category"}. Omitted dimensions are rolled up to "all".
+            start: First date; the whole period containing it is included.
+            end: Last date.
+            **filters: Equality filters on level columns, e.g.
+                category="Electronics", marketplace="amazon". Empty values are ignored.
+
+        Returns:
+            DataFrame with the level columns and the measures, sorted by them.
+        """
+        filters = {k: v for k, v in filters.items() if v not in ("", None)}
+        target = self._cuboid(levels or {})
+        needs = list(filters) + (["date"] if start is not None or end is not None else [])
+        with self._lock:
+            source = self._source(target, needs=needs)
+            frame = self._views[source]
+        for column, value in filters.items():
+            frame = frame[frame[column] == value]
+        if "date" in frame and (start is not None or end is not None):
+            level = target[0] if target[0] != ALL else "day"
+            if start is not None:
+                frame = frame[frame["date"] >= period_start([pd.Timestamp(start)], level)[0]]
+            if end is not None:
+                frame = frame[frame["date"] <= pd.Timestamp(end)]
+        result = self._rollup(frame, target) if source != target else frame.reset_index(drop=True)
+        columns = self._columns(target)
+        return result.sort_values(columns).reset_index(drop=True) if columns else result
+
+    def market_share(
+        self, levels: Optional[Dict[str, str]] = None, measure: str = "revenue", **filters: Any
+    ) -> pd.DataFrame:
+        """`query` results with each row's share (in %) of its parent product level.
+
+        Categories are compared with all products, subcategories with their
+        category, SKUs with their subcategory, within the same period and
+        marketplace.
+        """
+        levels = dict(levels or {})
+        rows = self.query(levels, **filters)
+        product = levels.get("product", ALL) or ALL
+        hierarchy = self.hierarchies["product"]
+        parent = ALL if product == ALL or product == hierarchy[-1] else hierarchy[hierarchy.index(product) + 1]
+        totals = self.query({**levels, "product": parent}, **filters)
+        on = self._columns(self._cuboid({**levels, "product": parent}))
+        if on:
+            total = rows[on].merge(totals[on + [measure]], on=on, how="left")[measure].to_numpy(dtype=float)
+        else:
+            total = np.full(len(rows), float(totals[measure].sum()))
+        share = np.divide(rows[measure].to_numpy(dtype=float), total, out=np.zeros(len(rows)), where=total > 0)
+        return rows.assign(market_share=np.round(share * 100, 2))
+
+    def levels(self) -> List[Dict[str, str]]:
+        """The materialized cuboids, as {dimension: level} dicts."""
+        return [dict(zip(self.dimensions, c)) for c in self._order]
+
+
+def category_performance(
+    sales: pd.DataFrame,
+    category: str = "",
+    marketplace: str = "",
+    grain: str = "day",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    cube: Optional[SalesCube] = None,
+    **kwargs: Any,
+) -> List[CategoryPerformance]:
+    """Compute CategoryPerformance rows from SalesHistorical data.
+
+    Args:
+        sales: Rows with date, sku, category, marketplace, units_sold and
+            revenue (optionally subcategory, orders and views).
+        category: Drill down into this category's subcategories. All
+            categories if empty.
+        marketplace: Only this marketplace.
+        grain: Time level, "day", "week" or "month".
+        start_date: First date reported.
+        end_date: Last date reported.
+        cube: Cube holding the facts, e.g. one kept per provider so repeated
+            requests only fold in the fetched days. A fresh cube is built for
+            this request when omitted.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    cube = cube if cube is not None else SalesCube()
+    cube.update(sales, scope={"category": category, "marketplace": marketplace})
+    rows = cube.market_share(
+        {"time": grain, "product": "subcategory" if category else "category"},
+        category=category,
+        marketplace=marketplace,
+        start=start_date,
+        end=end_date,
+    )
+    if rows.empty:
+        return []
+    units = rows["units_sold"].to_numpy(dtype=float)
+    views = rows["views"].to_numpy(dtype=float)
+    rows = rows.assign(
+        date=rows["date"].dt.date,
+        subcategory=rows["subcategory"] if category else "",
+        units_sold=rows["units_sold"].astype(int),
+        views=rows["views"].astype(int),
+        revenue=rows["revenue"].round(2),
+        average_price=np.round(np.divide(rows["revenue"], units, out=np.zeros(len(rows)), where=units > 0), 2),
+        conversion_rate=np.round(
+            np.divide(rows["orders"], views, out=np.zeros(len(rows)), where=views > 0) * 100, 2
+        ),
+    )
+    fields = CategoryPerformance.model_fields
+    return [CategoryPerformance(**{k: v for k, v in row.items() if k in fields}) for row in rows.to_dict("records")]
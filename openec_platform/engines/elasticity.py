@@ -0,0 +1,259 @@
+"""Price elasticity engine - log-log demand regressions and optimal prices.
+
+Daily prices are joined with daily units sold per SKU and every SKU is fitted
+at once: log(units) = a + b * log(price), where the slope b is the price
+elasticity. Fits are closed-form from per-SKU sufficient statistics (counts
+and sums of x, y, x^2, xy, y^2), so a new day only adds its statistics, a day
+leaving the window subtracts them and a restated day swaps them; the history is
+never refitted.
+
+The optimal price maximizes expected margin (price - unit cost) * demand over
+a grid around the current price, for all SKUs in one array operation.
+"""
+
+from __future__ import annotations
+
+import threading
+from statistics import NormalDist
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.models.pricing import PriceElasticity
+
+_STATS = ["n", "sx", "sy", "sxx", "sxy", "syy"]
+
+# Candidate prices, as multiples of the current price.
+PRICE_GRID = np.linspace(0.7, 1.3, 61)
+
+
+def _t_quantile(p: float, dof: np.ndarray) -> np.ndarray:
+    """Student-t quantile via the Cornish-Fisher expansion around the normal quantile."""
+    z = NormalDist().inv_cdf(p)
+    d = np.maximum(dof, 1).astype(float)
+    return (
+        z
+        + (z ** 3 + z) / (4 * d)
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * d ** 2)
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * d ** 3)
+    )
+
+
+def daily_observations(prices: pd.DataFrame, sales: pd.DataFrame) -> pd.DataFrame:
+    """Join prices and sales into one row per (sku, date) with log price and log units.
+
+    Prices are averaged across marketplaces and sellers; units are summed.
+    Days without a positive price or positive sales are dropped, since their
+    logarithm is undefined.
+    """
+    price = (
+        pd.DataFrame({
+            "sku": prices["sku"].astype(str).to_numpy(),
+            "date": pd.to_datetime(prices["date"]).dt.normalize().to_numpy(),
+            "price": pd.to_numeric(prices["price"], errors="coerce").to_numpy(),
+        })
+        .groupby(["sku", "date"])["price"]
+        .mean()
+    )
+    units = (
+        pd.DataFrame({
+            "sku": sales["sku"].astype(str).to_numpy(),
+            "date": pd.to_datetime(sales["date"]).dt.normalize().to_numpy(),
+            "units": pd.to_numeric(sales["units_sold"], errors="coerce").to_numpy(),
+        })
+        .groupby(["sku", "date"])["units"]
+        .sum()
+    )
+    joined = pd.concat([price, units], axis=1, join="inner").reset_index()
+    joined = joined[(joined["price"] > 0) & (joined["units"] > 0)]
+    joined["x"] = np.log(joined["price"].to_numpy())
+    joined["y"] = np.log(joined["units"].to_numpy())
+    return joined.reset_index(drop=True)
+
+
+def _sufficient_stats(obs: pd.DataFrame) -> pd.DataFrame:
+    x = obs["x"].to_numpy()
+    y = obs["y"].to_numpy()
+    return (
+        pd.DataFrame({
+            "sku": obs["sku"].to_numpy(), "n": 1.0, "sx": x, "sy": y, "sxx": x * x, "sxy": x * y, "syy": y * y,
+        })
+        .groupby("sku")[_STATS]
+        .sum()
+    )
+
+
+class ElasticityModel:
+    """Per-SKU log-log regressions maintained incrementally over a moving window.
+
+    Usage:
+        model = ElasticityModel()
+        model.update(daily_observations(prices, sales))
+        fits = model.fit()
+
+    Each `update()` receives the full current window for the SKUs it covers.
+    For those SKUs every day of the window replaces the held day: new days are
+    added to the sufficient statistics, days whose values changed (a restated
+    or still partial day) are swapped, and days no longer present are
+    subtracted. Other SKUs are left as they are.
+    """
+
+    def __init__(self) -> None:
+        self._obs = pd.DataFrame(columns=["sku", "date", "x", "y"])
+        self._stats = pd.DataFrame(columns=_STATS, dtype=float)
+        self._lock = threading.Lock()
+
+    def update(self, obs: pd.DataFrame, skus: Optional[Iterable[str]] = None) -> None:
+        """Move the model to a new window of daily observations.
+
+        Args:
+            obs: Daily observations, as from `daily_observations`.
+            skus: SKUs the window covers, e.g. when it was filtered to one
+                category. Held days of other SKUs are kept. Defaults to the
+                SKUs in `obs` plus every held SKU.
+        """
+        obs = obs[["sku", "date", "x", "y"]].reset_index(drop=True)
+        with self._lock:
+            held = self._obs
+            in_scope = held["sku"].isin(list(skus)) if skus is not None else pd.Series(True, index=held.index)
+            kept, scoped = held[~in_scope], held[in_scope]
+            if len(scoped):
+                # Rows identical in both windows cancel out; every other row is swapped.
+                both = obs.merge(scoped, on=["sku", "date", "x", "y"], how="outer", indicator=True)
+                added, removed = both[both["_merge"] == "left_only"], both[both["_merge"] == "right_only"]
+            else:
+                added, removed = obs, scoped
+            stats = self._stats
+            if len(added):
+                stats = stats.add(_sufficient_stats(added), fill_value=0.0)
+            if len(removed):
+                stats = stats.sub(_sufficient_stats(removed), fill_value=0.0)
+            self._stats = stats[stats["n"] > 0]
+            self._obs = pd.concat([kept, obs], ignore_index=True) if len(kept) else obs
+
+    def refit(self, obs: pd.DataFrame) -> None:
+        """Rebuild the statistics from scratch, e.g. after history was restated."""
+        with self._lock:
+            self._obs = obs[["sku", "date", "x", "y"]].reset_index(drop=True)
+            self._stats = _sufficient_stats(self._obs)
+
+    def fit(self, confidence: float = 0.95, min_samples: int = 14) -> pd.DataFrame:
+        """Closed-form OLS for every SKU.
+
+        Returns:
+            DataFrame indexed by sku with intercept, elasticity, std_error,
+            elasticity_lower, elasticity_upper, r_squared and sample_size. SKUs
+            with fewer than `min_samples` days or no price variation are omitted.
+        """
+        with self._lock:
+            stats = self._stats.copy()
+        n = stats["n"].to_numpy()
+        sxx = stats["sxx"].to_numpy() - stats["sx"].to_numpy() ** 2 / np.maximum(n, 1)
+        sxy = stats["sxy"].to_numpy() - stats["sx"].to_numpy() * stats["sy"].to_numpy() / np.maximum(n, 1)
+        syy = stats["syy"].to_numpy() - stats["sy"].to_numpy() ** 2 / np.maximum(n, 1)
+        valid = (n >= max(min_samples, 3)) & (sxx > 1e-12)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = sxy / sxx
+            intercept = (stats["sy"].to_numpy() - slope * stats["sx"].to_numpy()) / n
+            sse = np.maximum(syy - slope * sxy, 0.0)
+            std_error = np.sqrt(sse / (n - 2) / sxx)
+            r_squared = np.where(syy > 0, 1 - sse / syy, 0.0)
+        margin = _t_quantile(0.5 + confidence / 2, n - 2) * std_error
+        return pd.DataFrame({
+            "intercept": intercept,
+            "elasticity": slope,
+            "std_error": std_error,
+            "elasticity_lower": slope - margin,
+            "elasticity_upper": slope + margin,
+            "r_squared": r_squared,
+            "sample_size": n.astype(np.int64),
+        }, index=stats.index)[valid]
+
+
+def optimal_prices(
+    intercept: np.ndarray,
+    elasticity: np.ndarray,
+    current_price: np.ndarray,
+    unit_cost: np.ndarray,
+    grid: np.ndarray = PRICE_GRID,
+) -> np.ndarray:
+    """Margin-maximizing price per SKU over `grid` multiples of the current price."""
+    candidates = current_price[:, None] * grid[None, :]
+    demand = np.exp(intercept[:, None] + elasticity[:, None] * np.log(candidates))
+    margin = (candidates - unit_cost[:, None]) * demand
+    return candidates[np.arange(len(candidates)), np.argmax(margin, axis=1)]
+
+
+def price_elasticity(
+    prices: pd.DataFrame,
+    sales: pd.DataFrame,
+    sku: str = "",
+    category: str = "",
+    confidence: float = 0.95,
+    cost_ratio: float = 0.6,
+    min_samples: int = 14,
+    currency: str = "USD",
+    model: Optional[ElasticityModel] = None,
+    **kwargs: Any,
+) -> List[PriceElasticity]:
+    """Compute PriceElasticity rows from PriceHistorical and SalesHistorical data.
+
+    Args:
+        prices: Rows with date, sku and price.
+        sales: Rows with date, sku, units_sold and optionally category.
+        sku: Only analyze this SKU.
+        category: Only analyze SKUs in this category.
+        confidence: Coverage of the elasticity confidence interval.
+        cost_ratio: Unit cost as a fraction of the current price, used for the
+            margin-maximizing price when no cost data is available.
+        min_samples: Minimum days of joined data for a SKU to be fitted.
+        currency: Currency of the prices.
+        model: Model kept across calls, e.g. one per provider, so each call
+            only folds in the days that changed. Defaults to a fresh model.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    if sku:
+        prices = prices[prices["sku"] == sku]
+        sales = sales[sales["sku"] == sku]
+    if category and "category" in sales:
+        sales = sales[sales["category"] == category]
+        prices = prices[prices["sku"].isin(sales["sku"].unique())]
+    if prices.empty or sales.empty:
+        return []
+
+    obs = daily_observations(prices, sales)
+    model = model if model is not None else ElasticityModel()
+    # The window covers the SKUs left after the filters, including any without joined days.
+    scope = pd.unique(pd.concat([prices["sku"], sales["sku"]]).astype(str))
+    model.update(obs, skus=scope)
+    fits = model.fit(confidence=confidence, min_samples=min_samples)
+    fits = fits[fits.index.isin(scope)]
+    if fits.empty:
+        return []
+
+    current = obs.sort_values("date").groupby("sku")["price"].last().reindex(fits.index).to_numpy()
+    best = optimal_prices(
+        fits["intercept"].to_numpy(), fits["elasticity"].to_numpy(), current, current * cost_ratio
+    )
+    categories = (
+        sales.drop_duplicates("sku").set_index("sku")["category"].reindex(fits.index).fillna("")
+        if "category" in sales else pd.Series("", index=fits.index)
+    )
+    return [
+        PriceElasticity(
+            sku=s,
+            category=categories.iloc[i],
+            elasticity=round(float(fits["elasticity"].iloc[i]), 3),
+            elasticity_lower=round(float(fits["elasticity_lower"].iloc[i]), 3),
+            elasticity_upper=round(float(fits["elasticity_upper"].iloc[i]), 3),
+            r_squared=round(float(fits["r_squared"].iloc[i]), 3),
+            optimal_price=round(float(best[i]), 2),
+            current_price=round(float(current[i]), 2),
+            currency=currency,
+            confidence=confidence,
+            sample_size=int(fits["sample_size"].iloc[i]),
+        )
+        for i, s in enumerate(fits.index)
+    ]
@@ -0,0 +1,328 @@
+"""Demand forecasting engine - batch forecasts for every SKU at once.
+
+Sales are pivoted into a SKU x day matrix and every model is fitted to all
+rows simultaneously with NumPy array operations; the only Python loop runs
+over time steps, never over SKUs.
+
+Models:
+    seasonal_naive: repeats the last observed week.
+    ses: simple exponential smoothing, alpha chosen per SKU from a grid.
+    croston: Croston's method with the Syntetos-Boylan correction, for
+        intermittent demand.
+
+With method="auto", intermittent series (average inter-demand interval above
+1.32 days) use Croston; the others use whichever of seasonal naive and SES
+has the lower in-sample error. Forecasts are cached per SKU and reused until
+that SKU's history changes.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.models.inventory import DemandForecast
+
+if TYPE_CHECKING:
+    from openec_platform.core.executor import ProcessExecutor
+
+METHODS = ("auto", "seasonal_naive", "ses", "croston")
+SEASON = 7
+ADI_THRESHOLD = 1.32
+ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+CROSTON_ALPHA = 0.1
+
+
+def parse_horizon(horizon: Any) -> int:
+    """Horizon in days from an int or a string such as "30d", "4w" or "3m"."""
+    if isinstance(horizon, (int, np.integer)):
+        return int(horizon)
+    match = re.match(r"^\s*(\d+)\s*([dwm]?)\s*$", str(horizon), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid forecast horizon '{horizon}'")
+    return int(match.group(1)) * {"": 1, "d": 1, "w": 7, "m": 30}[match.group(2).lower()]
+
+
+def _seasonal_naive(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    season = min(SEASON, y.shape[1])
+    steps = np.arange(horizon)
+    forecast = y[:, y.shape[1] - season + (steps % season)]
+    residuals = y[:, season:] - y[:, :-season] if y.shape[1] > season else np.zeros((len(y), 1))
+    sigma = np.sqrt(np.mean(residuals ** 2, axis=1))
+    spread = np.sqrt(steps // season + 1)
+    return forecast, sigma[:, None] * spread[None, :]
+
+
+def _ses(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    n, t = y.shape
+    # One recursion per candidate alpha, vectorized over SKUs and alphas.
+    level = np.repeat(y[:, :1], len(ALPHAS), axis=1)
+    sse = np.zeros((n, len(ALPHAS)))
+    for i in range(1, t):
+        error = y[:, i:i + 1] - level
+        sse += error ** 2
+        level = level + ALPHAS[None, :] * error
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(n)
+    alpha = ALPHAS[best]
+    sigma = np.sqrt(sse[rows, best] / max(t - 1, 1))
+    steps = np.arange(horizon)
+    forecast = np.repeat(level[rows, best][:, None], horizon, axis=1)
+    spread = np.sqrt(1 + steps[None, :] * alpha[:, None] ** 2)
+    return forecast, sigma[:, None] * spread
+
+
+def _croston(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    n, t = y.shape
+    alpha = CROSTON_ALPHA
+    nonzero = y > 0
+    first = np.argmax(nonzero, axis=1)
+    rows = np.arange(n)
+    size = np.where(nonzero.any(axis=1), y[rows, first], 0.0)
+    interval = first + 1.0
+    since = np.zeros(n)
+    sse = np.zeros(n)
+    for i in range(t):
+        since += 1
+        estimate = np.where(i > first, size / interval, 0.0)
+        sse += np.where(i > first, (y[:, i] - estimate) ** 2, 0.0)
+        update = nonzero[:, i] & (i > first)
+        size = np.where(update, size + alpha * (y[:, i] - size), size)
+        interval = np.where(update, interval + alpha * (since - interval), interval)
+        since = np.where(nonzero[:, i], 0, since)
+    rate = (1 - alpha / 2) * size / np.maximum(interval, 1.0)
+    sigma = np.sqrt(sse / np.maximum(t - first - 1, 1))
+    forecast = np.repeat(rate[:, None], horizon, axis=1)
+    return forecast, np.repeat(sigma[:, None], horizon, axis=1)
+
+
+def forecast_matrix(
+    y: np.ndarray,
+    horizon: int,
+    method: str = "auto",
+    confidence: float = 0.8,
+) -> Dict[str, np.ndarray]:
+    """Forecast every row of a SKU x day matrix.
+
+    Returns:
+        Dict of (n_skus, horizon) arrays "forecast", "lower", "upper", and a
+        (n_skus,) array "method" naming the model used per row.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown forecast method '{method}'. Choose from: {', '.join(METHODS)}")
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    forecast = np.zeros((n, horizon))
+    sigma = np.zeros((n, horizon))
+    used = np.empty(n, dtype=object)
+
+    if method == "auto":
+        demand_days = np.count_nonzero(y > 0, axis=1)
+        intermittent = y.shape[1] / np.maximum(demand_days, 1) > ADI_THRESHOLD
+        groups = {"croston": intermittent}
+        smooth = ~intermittent
+        if smooth.any():
+            # Pick per SKU by in-sample RMSE (the one-step residual spread).
+            sn_f, sn_s = _seasonal_naive(y[smooth], horizon)
+            ses_f, ses_s = _ses(y[smooth], horizon)
+            use_ses = ses_s[:, 0] <= sn_s[:, 0]
+            forecast[smooth] = np.where(use_ses[:, None], ses_f, sn_f)
+            sigma[smooth] = np.where(use_ses[:, None], ses_s, sn_s)
+            used[smooth] = np.where(use_ses, "ses", "seasonal_naive")
+    else:
+        groups = {method: np.ones(n, dtype=bool)}
+
+    models = {"seasonal_naive": _seasonal_naive, "ses": _ses, "croston": _croston}
+    for name, mask in groups.items():
+        if mask.any():
+            f, s = models[name](y[mask], horizon)
+            forecast[mask] = f
+            sigma[mask] = s
+            used[mask] = name
+
+    forecast = np.maximum(forecast, 0.0)
+    return {
+        "forecast": forecast,
+        "lower": np.maximum(forecast - z * sigma, 0.0),
+        "upper": forecast + z * sigma,
+        "method": used,
+    }
+
+
+def _forecast_block(wide: pd.DataFrame, horizon: int, method: str, confidence: float) -> pd.DataFrame:
+    """Forecast one block of SKUs; a module-level function so it can run in a worker process.
+
+    Returns one row per SKU: sku, method, then forecast, lower and upper
+    bound columns for each step of the horizon.
+    """
+    y = wide.drop(columns=["sku"]).to_numpy(dtype=float)
+    out = forecast_matrix(y, horizon, method=method, confidence=confidence)
+    values = np.hstack([out["forecast"], out["lower"], out["upper"]]).round(2)
+    steps = [f"{kind}{i}" for kind in ("f", "l", "u") for i in range(horizon)]
+    result = pd.DataFrame(values, columns=steps)
+    result.insert(0, "method", out["method"].astype(str))
+    result.insert(0, "sku", wide["sku"].to_numpy())
+    return result
+
+
+class ForecastCache:
+    """Per-SKU forecast cache keyed by a fingerprint of the SKU's history.
+
+    A SKU is refitted only when its sales series (or the forecast settings)
+    change; every other SKU is served from the cache.
+    """
+
+    def __init__(self, max_skus: int = 200_000) -> None:
+        self.max_skus = max_skus
+        self._entries: "OrderedDict[str, Tuple[int, np.ndarray, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sku: str, fingerprint: int) -> Optional[Tuple[np.ndarray, str]]:
+        """Cached (values, method) for a SKU, or None if missing or stale."""
+        with self._lock:
+            entry = self._entries.get(sku)
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._entries.move_to_end(sku)
+            return entry[1], entry[2]
+
+    def put(self, sku: str, fingerprint: int, values: np.ndarray, method: str) -> None:
+        with self._lock:
+            self._entries[sku] = (fingerprint, values, method)
+            self._entries.move_to_end(sku)
+            while len(self._entries) > self.max_skus:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_cache = ForecastCache()
+
+
+def sales_matrix(sales: pd.DataFrame, value_col: str = "units_sold") -> pd.DataFrame:
+    """Pivot sales rows into a SKU x day matrix, filling days without sales with 0."""
+    wide = (
+        pd.DataFrame({
+            "sku": sales["sku"].astype(str).to_numpy(),
+            "date": pd.to_datetime(sales["date"]).dt.normalize().to_numpy(),
+            "units": pd.to_numeric(sales[value_col], errors="coerce").fillna(0.0).to_numpy(),
+        })
+        .groupby(["sku", "date"])["units"]
+        .sum()
+        .unstack("date", fill_value=0.0)
+    )
+    days = pd.date_range(wide.columns.min(), wide.columns.max(), freq="D")
+    return wide.reindex(columns=days, fill_value=0.0)
+
+
+def forecast_sales(
+    sales: pd.DataFrame,
+    horizon: Any = "30d",
+    method: str = "auto",
+    confidence: float = 0.8,
+    cache: Optional[ForecastCache] = None,
+    executor: Optional["ProcessExecutor"] = None,
+    block_size: int = 5_000,
+) -> pd.DataFrame:
+    """Forecast daily demand for every SKU in a sales frame.
+
+    Args:
+        sales: Rows with date, sku and units_sold columns.
+        horizon: Days to forecast, e.g. 30 or "30d".
+        method: auto, seasonal_naive, ses or croston.
+        confidence: Two-sided coverage of the prediction interval.
+        cache: Per-SKU cache; defaults to a process-wide cache.
+        executor: Process pool used to fit blocks of SKUs in parallel.
+        block_size: SKUs per block when fitting in parallel.
+
+    Returns:
+        Long DataFrame with sku, date, predicted_demand, lower_bound,
+        upper_bound and method, ordered by sku and date.
+    """
+    columns = ["sku", "date", "predicted_demand", "lower_bound", "upper_bound", "method"]
+    if sales.empty:
+        return pd.DataFrame(columns=columns)
+    days = parse_horizon(horizon)
+    cache = cache if cache is not None else _default_cache
+    wide = sales_matrix(sales)
+    last_day = wide.columns.max()
+    skus = wide.index.to_numpy()
+
+    settings = np.uint64(hash((days, method, confidence, last_day.value)) & (2 ** 64 - 1))
+    fingerprints = pd.util.hash_pandas_object(wide, index=True).to_numpy() ^ settings
+
+    values = np.empty((len(skus), 3 * days))
+    methods = np.empty(len(skus), dtype=object)
+    missing = []
+    for i, (sku, fp) in enumerate(zip(skus, fingerprints)):
+        hit = cache.get(sku, int(fp))
+        if hit is None:
+            missing.append(i)
+        else:
+            values[i], methods[i] = hit
+
+    if missing:
+        todo = pd.DataFrame(wide.to_numpy()[missing], columns=[f"d{i}" for i in range(wide.shape[1])])
+        todo.insert(0, "sku", skus[missing])
+        blocks = [todo.iloc[i:i + block_size] for i in range(0, len(todo), block_size)]
+        if executor is not None and len(blocks) > 1:
+            results = executor.map_frames(_forecast_block, blocks, horizon=days, method=method, confidence=confidence)
+        else:
+            results = [_forecast_block(b, days, method, confidence) for b in blocks]
+        fitted = pd.concat(results, ignore_index=True)
+        values[missing] = fitted.iloc[:, 2:].to_numpy(dtype=float)
+        methods[missing] = fitted["method"].to_numpy()
+        for i in missing:
+            cache.put(skus[i], int(fingerprints[i]), values[i], methods[i])
+
+    steps = np.arange(1, days + 1)
+    return pd.DataFrame({
+        "sku": np.repeat(skus, days),
+        "date": np.tile(last_day + pd.to_timedelta(steps, unit="D"), len(skus)),
+        "predicted_demand": values[:, :days].ravel(),
+        "lower_bound": values[:, days:2 * days].ravel(),
+        "upper_bound": values[:, 2 * days:].ravel(),
+        "method": np.repeat(methods, days),
+    })
+
+
+def demand_forecast(
+    sales: pd.DataFrame,
+    sku: str = "",
+    category: str = "",
+    horizon: Any = "30d",
+    method: str = "auto",
+    confidence: float = 0.8,
+    executor: Optional["ProcessExecutor"] = None,
+    **kwargs: Any,
+) -> List[DemandForecast]:
+    """Compute DemandForecast rows from SalesHistorical-shaped data.
+
+    Args:
+        sales: Rows with date, sku, units_sold and optionally category.
+        sku: Only forecast this SKU.
+        category: Only forecast SKUs in this category.
+        horizon: Days to forecast, e.g. "30d".
+        method: auto, seasonal_naive, ses or croston.
+        confidence: Two-sided coverage of the prediction interval.
+        executor: Process pool used to fit large catalogs in parallel.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    if sku:
+        sales = sales[sales["sku"] == sku]
+    if category and "category" in sales:
+        sales = sales[sales["category"] == category]
+    forecasts = forecast_sales(sales, horizon=horizon, method=method, confidence=confidence, executor=executor)
+    if "category" in sales:
+        categories = sales.drop_duplicates("sku").set_index("sku")["category"]
+        forecasts["category"] = forecasts["sku"].map(categories).fillna("").to_numpy()
+    forecasts["date"] = forecasts["date"].dt.date
+    return [DemandForecast(confidence=confidence, **row) for row in forecasts.to_dict("records")]
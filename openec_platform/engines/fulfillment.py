@@ -0,0 +1,454 @@
+"""Fulfillment engine - order status, fulfillment times and returns from order events.
+
+Marketplaces report orders as a log of status changes (placed, shipped,
+delivered, returned, ...). `FulfillmentTracker` folds the log into a state
+machine per order and keeps only mergeable aggregates of the transitions:
+
+    status counts (FulfillmentStatus): orders placed each day by current
+        status, and the share of them that shipped;
+    time in state (FulfillmentTime): percentiles of hours spent in each
+        status, from a t-digest per day and status;
+    returns (ReturnsSummary): returns, return rate, refunds and the most
+        common return reasons per day and marketplace.
+
+Each transition only moves counts between statuses, so chunks of any size
+can be added in time order and the tracker can be fed new events as they
+arrive. Events older than an order's current status, or repeating it, are
+ignored, so overlapping exports are safe to add again:
+
+    tracker = FulfillmentTracker()
+    for chunk in pd.read_csv("order_events.csv", chunksize=1_000_000):
+        tracker.add(chunk)
+    tracker.status_counts(), tracker.time_in_state(), tracker.returns(top_k=5)
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.cube import period_start
+from openec_platform.engines.sketches import TDigest
+from openec_platform.engines.utils import FrameInput, hash_keys, iter_chunks
+from openec_platform.models.orders import FulfillmentStatus, FulfillmentTime, ReturnsSummary
+
+STATUSES = ("pending", "processing", "shipped", "delivered", "cancelled", "returned")
+# Status names used by marketplaces for the same states.
+STATUS_ALIASES = {
+    "created": "pending", "placed": "pending", "unpaid": "pending",
+    "paid": "processing", "unshipped": "processing", "packed": "processing",
+    "fulfilled": "shipped", "in_transit": "shipped", "out_for_delivery": "shipped",
+    "canceled": "cancelled", "refunded": "returned",
+}
+TRANSITIONS = {
+    "pending": ("processing", "shipped", "delivered", "cancelled"),
+    "processing": ("shipped", "delivered", "cancelled"),
+    "shipped": ("delivered", "returned"),
+    "delivered": ("returned",),
+    "cancelled": (),
+    "returned": (),
+}
+# Statuses counting as fulfilled for the fulfillment rate.
+FULFILLED = ("shipped", "delivered", "returned")
+
+_STATUS_INDEX = {name: i for i, name in enumerate(STATUSES)}
+_ALLOWED = np.zeros((len(STATUSES), len(STATUSES)), dtype=bool)
+for _source, _targets in TRANSITIONS.items():
+    _ALLOWED[_STATUS_INDEX[_source], [_STATUS_INDEX[t] for t in _targets]] = True
+_TOTAL = len(STATUSES)  # pseudo-status counting orders placed
+_NEW = -1
+_HOUR_NS = 3_600 * 10**9
+_DAY_NS = 24 * _HOUR_NS
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class FulfillmentTracker:
+    """Per-order state machines folded into daily fulfillment and returns aggregates.
+
+    Args:
+        order_col: Column holding the order identifier.
+        time_col: Column holding the event timestamp.
+        status_col: Column holding the new status (see STATUSES and STATUS_ALIASES).
+        marketplace_col: Column holding the marketplace, if any.
+        reason_col: Column holding the return reason on return events, if any.
+        refund_col: Column holding the refunded amount on return events, if any.
+    """
+
+    def __init__(
+        self,
+        order_col: str = "order_id",
+        time_col: str = "timestamp",
+        status_col: str = "status",
+        marketplace_col: str = "marketplace",
+        reason_col: str = "reason",
+        refund_col: str = "refund_amount",
+    ) -> None:
+        self.order_col = order_col
+        self.time_col = time_col
+        self.status_col = status_col
+        self.marketplace_col = marketplace_col
+        self.reason_col = reason_col
+        self.refund_col = refund_col
+        self.rejected = 0  # events with an unknown status or an impossible transition
+        self.duplicates = 0  # events repeating or predating an order's current status
+        self._index = pd.Index([], dtype=np.uint64)
+        self._status = np.empty(0, dtype=np.int8)
+        self._entered = np.empty(0, dtype=np.int64)
+        self._placed = np.empty(0, dtype=np.int64)
+        self._marketplace = np.empty(0, dtype=np.int32)
+        self._marketplaces: List[str] = []
+        self._cohorts: List[pd.Series] = []
+        self._events: List[pd.Series] = []
+        self._returns: List[pd.DataFrame] = []
+        self._digests: Dict[Tuple[int, int, int], TDigest] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of orders tracked."""
+        return len(self._index)
+
+    def _marketplace_codes(self, values: np.ndarray) -> np.ndarray:
+        codes, uniques = pd.factorize(values)
+        known = {name: i for i, name in enumerate(self._marketplaces)}
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, name in enumerate(uniques):
+            if name not in known:
+                known[name] = len(self._marketplaces)
+                self._marketplaces.append(name)
+            mapping[i] = known[name]
+        return mapping[codes]
+
+    def _order_rows(self, ids: np.ndarray, marketplace: np.ndarray) -> np.ndarray:
+        """State row of each event's order, adding unseen orders as new."""
+        rows = self._index.get_indexer(ids)
+        unseen = rows < 0
+        if unseen.any():
+            fresh, first = np.unique(ids[unseen], return_index=True)
+            count = len(fresh)
+            self._index = self._index.append(pd.Index(fresh))
+            self._status = np.concatenate([self._status, np.full(count, _NEW, dtype=np.int8)])
+            self._entered = np.concatenate([self._entered, np.zeros(count, dtype=np.int64)])
+            self._placed = np.concatenate([self._placed, np.zeros(count, dtype=np.int64)])
+            self._marketplace = np.concatenate([self._marketplace, marketplace[unseen][first]])
+            rows = self._index.get_indexer(ids)
+        return rows
+
+    def add(self, events: pd.DataFrame) -> None:
+        """Fold a chunk of status-change events into the order states.
+
+        Events of one order may be spread over chunks, as long as chunks are
+        added in roughly time order: an event older than its order's current
+        status is ignored.
+        """
+        events = events[events[self.order_col].notna()]
+        if events.empty:
+            return
+        codes, names = pd.factorize(events[self.status_col].to_numpy(dtype=object))
+        # The trailing -1 is picked by missing statuses (code -1).
+        lookup = np.array(
+            [_STATUS_INDEX.get(STATUS_ALIASES.get(str(n).lower(), str(n).lower()), -1) for n in names] + [-1]
+        )
+        status = lookup[codes]
+        known = status >= 0
+        with self._lock:
+            self.rejected += int((~known).sum())
+            if not known.any():
+                return
+            events, status = events[known], status[known]
+            ids = hash_keys(events[self.order_col])
+            ts = pd.to_datetime(events[self.time_col], format="ISO8601").to_numpy(dtype="datetime64[ns]")
+            ts = ts.view(np.int64)
+            marketplace = self._marketplace_codes(
+                events[self.marketplace_col].fillna("").to_numpy(dtype=object)
+                if self.marketplace_col in events else np.full(len(events), "", dtype=object)
+            )
+            # Replay each order's events in time order; ties follow the status order.
+            order = np.lexsort((status, ts, ids))
+            ids, ts, status = ids[order], ts[order], status[order]
+            rows = self._order_rows(ids, marketplace[order])
+            starts = np.r_[True, ids[1:] != ids[:-1]]
+            rank = np.arange(len(ids)) - np.maximum.accumulate(np.where(starts, np.arange(len(ids)), 0))
+
+            accepted = [self._transition(step, rows[step], status[step], ts[step])
+                        for step in (np.flatnonzero(rank == k) for k in range(int(rank.max()) + 1))]
+            position, previous, entered = (np.concatenate(parts) for parts in zip(*accepted))
+            self._record(events, order, position, previous, entered, rows, status, ts)
+
+    def _transition(
+        self, step: np.ndarray, rows: np.ndarray, status: np.ndarray, ts: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Apply one event per order.
+
+        Returns:
+            Positions of the accepted events, and the status each order left
+            and when it had entered it.
+        """
+        previous = self._status[rows].astype(np.int64)
+        entered = self._entered[rows]
+        seen = previous != _NEW
+        repeated = seen & ((previous == status) | (ts < entered))
+        allowed = ~seen | _ALLOWED[np.maximum(previous, 0), status]
+        ok = ~repeated & allowed
+        self.duplicates += int(repeated.sum())
+        self.rejected += int((~repeated & ~allowed).sum())
+
+        rows, status, ts = rows[ok], status[ok], ts[ok]
+        new = ~seen[ok]
+        self._placed[rows[new]] = ts[new] // _DAY_NS
+        self._status[rows] = status
+        self._entered[rows] = ts
+        return step[ok], previous[ok], entered[ok]
+
+    def _record(
+        self,
+        events: pd.DataFrame,
+        order: np.ndarray,
+        position: np.ndarray,
+        previous: np.ndarray,
+        entered: np.ndarray,
+        rows: np.ndarray,
+        status: np.ndarray,
+        ts: np.ndarray,
+    ) -> None:
+        """Add the accepted transitions to the daily aggregates."""
+        if not len(position):
+            return
+        rows, status, ts = rows[position], status[position], ts[position]
+        placed = self._placed[rows]
+        marketplace = self._marketplace[rows]
+        day = ts // _DAY_NS
+        moved = previous != _NEW
+
+        # Orders placed each day, by current status: each transition moves one order between statuses.
+        cohort = pd.DataFrame({
+            "day": np.concatenate([placed, placed[moved], placed[~moved]]),
+            "marketplace": np.concatenate([marketplace, marketplace[moved], marketplace[~moved]]),
+            "status": np.concatenate([status, previous[moved], np.full((~moved).sum(), _TOTAL)]),
+            "delta": np.concatenate([np.ones(len(status)), -np.ones(moved.sum()), np.ones((~moved).sum())]),
+        })
+        self._cohorts.append(cohort.groupby(["day", "marketplace", "status"])["delta"].sum())
+        # Transitions into each status per day, for return rates.
+        daily = pd.DataFrame({"day": day, "marketplace": marketplace, "status": status, "count": 1})
+        self._events.append(daily.groupby(["day", "marketplace", "status"])["count"].sum())
+
+        hours = (ts[moved] - entered[moved]) / _HOUR_NS
+        spans = pd.DataFrame({"day": day[moved], "status": previous[moved], "marketplace": marketplace[moved]})
+        for key, group in spans.groupby(["day", "status", "marketplace"]).indices.items():
+            digest = self._digests.setdefault(tuple(int(k) for k in key), TDigest())
+            digest.add(hours[group])
+
+        returned = status == _STATUS_INDEX["returned"]
+        if returned.any():
+            source = events.iloc[order[position[returned]]]
+            self._returns.append(pd.DataFrame({
+                "day": day[returned],
+                "marketplace": marketplace[returned],
+                "reason": source[self.reason_col].fillna("unspecified").astype(str).to_numpy(dtype=object)
+                if self.reason_col in source else "unspecified",
+                "refund": pd.to_numeric(source[self.refund_col], errors="coerce").fillna(0.0).to_numpy()
+                if self.refund_col in source else 0.0,
+            }).groupby(["day", "marketplace", "reason"]).agg(returns=("refund", "size"), refunds=("refund", "sum")))
+        self._compact()
+
+    def _compact(self) -> None:
+        if len(self._cohorts) > 16:
+            self._cohorts = [pd.concat(self._cohorts).groupby(level=[0, 1, 2]).sum()]
+            self._events = [pd.concat(self._events).groupby(level=[0, 1, 2]).sum()]
+        if len(self._returns) > 16:
+            self._returns = [pd.concat(self._returns).groupby(level=[0, 1, 2]).sum()]
+
+    def _marketplace_code(self, marketplace: str) -> Optional[int]:
+        return self._marketplaces.index(marketplace) if marketplace in self._marketplaces else None
+
+    def status_counts(self, marketplace: str = "") -> pd.DataFrame:
+        """Orders placed per day by their current status.
+
+        Returns:
+            DataFrame with date, total_orders, one count column per status and
+            fulfillment_rate (percent of non-cancelled orders that shipped).
+        """
+        columns = ["date", "total_orders", *STATUSES, "fulfillment_rate"]
+        with self._lock:
+            if not self._cohorts:
+                return pd.DataFrame(columns=columns)
+            counts = pd.concat(self._cohorts).groupby(level=[0, 1, 2]).sum()
+            self._cohorts = [counts]
+        if marketplace:
+            code = self._marketplace_code(marketplace)
+            counts = counts[counts.index.get_level_values(1) == code]
+        wide = counts.groupby(level=[0, 2]).sum().unstack(fill_value=0)
+        wide = wide.reindex(columns=range(len(STATUSES) + 1), fill_value=0).astype(np.int64).sort_index()
+        table = pd.DataFrame(wide.to_numpy()[:, : len(STATUSES)], columns=list(STATUSES))
+        table.insert(0, "total_orders", wide[_TOTAL].to_numpy())
+        table.insert(0, "date", pd.to_datetime(wide.index.to_numpy(), unit="D").date)
+        open_orders = (table["total_orders"] - table["cancelled"]).to_numpy()
+        fulfilled = table[list(FULFILLED)].sum(axis=1).to_numpy()
+        table["fulfillment_rate"] = np.round(
+            np.divide(fulfilled * 100.0, open_orders, out=np.zeros(len(table)), where=open_orders > 0), 1
+        )
+        return table[columns]
+
+    def time_in_state(self, marketplace: str = "", quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> pd.DataFrame:
+        """Hours orders spent in each status before leaving it, per day they left.
+
+        Returns:
+            DataFrame with date, status, transitions and one `p<q>_hours`
+            column per quantile (e.g. p50_hours).
+        """
+        code = self._marketplace_code(marketplace) if marketplace else None
+        names = [f"p{round(q * 100):g}_hours" for q in quantiles]
+        merged: Dict[Tuple[int, int], TDigest] = {}
+        with self._lock:
+            for (day, status, market), digest in self._digests.items():
+                if marketplace and market != code:
+                    continue
+                key = (day, status)
+                merged[key] = merged[key].merge(digest) if key in merged else digest.copy()
+        records = []
+        for (day, status), digest in sorted(merged.items()):
+            values = np.round(np.atleast_1d(digest.quantile(np.asarray(quantiles))), 2)
+            records.append({
+                "date": date.fromordinal(int(day) + _EPOCH_ORDINAL),
+                "status": STATUSES[status],
+                "transitions": int(round(digest.count())),
+                **dict(zip(names, values)),
+            })
+        return pd.DataFrame(records, columns=["date", "status", "transitions", *names])
+
+    def returns(self, marketplace: str = "", grain: str = "day", top_k: int = 5) -> pd.DataFrame:
+        """Returns per period and marketplace.
+
+        Args:
+            marketplace: Only this marketplace.
+            grain: "day", "week", "month", or "period" for one row per
+                marketplace over everything tracked.
+            top_k: Number of return reasons listed, most common first.
+
+        Returns:
+            DataFrame with date (period start), marketplace, total_returns,
+            return_rate (percent of deliveries in the period), total_refunds
+            and top_return_reasons.
+        """
+        if grain not in ("day", "week", "month", "period"):
+            raise ValueError(f"Unknown grain '{grain}'; expected day, week, month or period")
+        columns = ["date", "marketplace", "total_returns", "return_rate", "total_refunds", "top_return_reasons"]
+        with self._lock:
+            if not self._returns:
+                return pd.DataFrame(columns=columns)
+            reasons = pd.concat(self._returns).groupby(level=[0, 1, 2]).sum()
+            events = pd.concat(self._events).groupby(level=[0, 1, 2]).sum()
+            self._returns, self._events = [reasons], [events]
+            marketplaces = np.array(self._marketplaces, dtype=object)
+        reasons = reasons.reset_index()
+        deliveries = events.xs(_STATUS_INDEX["delivered"], level=2).rename("deliveries").reset_index()
+        # "period" rows share one start, so returns and deliveries join on it.
+        first = min(reasons["day"].min(), deliveries["day"].min()) if len(deliveries) else reasons["day"].min()
+        for frame in (reasons, deliveries):
+            frame["marketplace"] = marketplaces[frame["marketplace"].to_numpy()]
+            days = frame["day"].to_numpy().astype("datetime64[D]")
+            if grain == "period":
+                starts = np.full(len(days), np.datetime64(int(first), "D"))
+            else:
+                starts = period_start(days, grain)
+            frame["date"] = pd.to_datetime(starts).date
+        if marketplace:
+            reasons = reasons[reasons["marketplace"] == marketplace]
+            deliveries = deliveries[deliveries["marketplace"] == marketplace]
+        if reasons.empty:
+            return pd.DataFrame(columns=columns)
+
+        keys = ["date", "marketplace"]
+        reasons = reasons.groupby([*keys, "reason"], as_index=False)[["returns", "refunds"]].sum()
+        totals = reasons.groupby(keys).agg(total_returns=("returns", "sum"), total_refunds=("refunds", "sum"))
+        ranked = reasons.sort_values([*keys, "returns", "reason"], ascending=[True, True, False, True])
+        top = ranked.groupby(keys).head(top_k).groupby(keys)["reason"].agg(list).rename("top_return_reasons")
+        delivered = deliveries.groupby(keys)["deliveries"].sum()
+        table = totals.join(top).join(delivered).reset_index()
+        shipped = table["deliveries"].fillna(0).to_numpy()
+        table["return_rate"] = np.round(
+            np.divide(table["total_returns"] * 100.0, shipped, out=np.zeros(len(table)), where=shipped > 0), 1
+        )
+        table["total_returns"] = table["total_returns"].astype(np.int64)
+        table["total_refunds"] = table["total_refunds"].round(2)
+        return table[columns].sort_values(keys).reset_index(drop=True)
+
+
+def track_orders(events: FrameInput, tracker: Optional[FulfillmentTracker] = None) -> FulfillmentTracker:
+    """Fold a frame or a stream of event chunks into a tracker (a new one by default)."""
+    tracker = tracker if tracker is not None else FulfillmentTracker()
+    for chunk in iter_chunks(events):
+        tracker.add(chunk)
+    return tracker
+
+
+def fulfillment_status(
+    events: FrameInput,
+    marketplace: str = "",
+    tracker: Optional[FulfillmentTracker] = None,
+    **kwargs: Any,
+) -> List[FulfillmentStatus]:
+    """Compute FulfillmentStatus rows from order status events.
+
+    Args:
+        events: Events with order_id, timestamp, status and optionally
+            marketplace columns, as one frame or time-ordered chunks.
+        marketplace: Only count this marketplace.
+        tracker: Tracker to fold the events into, e.g. one kept between
+            calls; a fresh one by default.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = track_orders(events, tracker).status_counts(marketplace=marketplace)
+    return [FulfillmentStatus(**row) for row in table.to_dict("records")]
+
+
+def fulfillment_times(
+    events: FrameInput,
+    marketplace: str = "",
+    status: str = "",
+    tracker: Optional[FulfillmentTracker] = None,
+    **kwargs: Any,
+) -> List[FulfillmentTime]:
+    """Compute FulfillmentTime rows (hours spent per status) from order status events.
+
+    Args:
+        events: Events with order_id, timestamp, status and optionally
+            marketplace columns, as one frame or time-ordered chunks.
+        marketplace: Only this marketplace.
+        status: Only this status.
+        tracker: Tracker to fold the events into; a fresh one by default.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = track_orders(events, tracker).time_in_state(marketplace=marketplace)
+    if status:
+        table = table[table["status"] == status]
+    return [FulfillmentTime(**row) for row in table.to_dict("records")]
+
+
+def returns_summary(
+    events: FrameInput,
+    marketplace: str = "",
+    grain: str = "day",
+    top_k: int = 5,
+    currency: str = "USD",
+    tracker: Optional[FulfillmentTracker] = None,
+    **kwargs: Any,
+) -> List[ReturnsSummary]:
+    """Compute ReturnsSummary rows from order status events.
+
+    Args:
+        events: Events with order_id, timestamp, status and optionally
+            marketplace, reason and refund_amount columns, as one frame or
+            time-ordered chunks.
+        marketplace: Only this marketplace.
+        grain: "day", "week", "month" or "period".
+        top_k: Number of return reasons listed per row.
+        currency: Currency of the refund amounts.
+        tracker: Tracker to fold the events into; a fresh one by default.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = track_orders(events, tracker).returns(marketplace=marketplace, grain=grain, top_k=top_k)
+    return [ReturnsSummary(currency=currency, **row) for row in table.to_dict("records")]
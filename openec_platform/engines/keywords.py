@@ -0,0 +1,245 @@
+"""Keyword opportunity engine - expected click and value uplift per search keyword.
+
+The clicks a keyword can bring depend on where it ranks: click-through rate
+falls steeply with search position. Per marketplace, the engine fits a CTR
+curve by position from the keywords' own clicks and impressions (a power law,
+refined per position where data is plentiful and kept non-increasing), and
+scores every keyword against it:
+
+    expected clicks now      search_volume x CTR(position) x relevance
+    expected clicks at target   search_volume x CTR(target_position) x relevance
+    value uplift             extra clicks x CPC (what they would cost as ads)
+
+`relevance` is the keyword's own CTR relative to the curve, shrunk towards 1
+for keywords with few impressions. The opportunity score discounts the value
+uplift by the number of positions still to climb. All steps work on whole
+columns, curves are cached per marketplace, and the top keywords are picked
+with a partial sort, so a universe of hundreds of thousands of keywords is
+scored in a fraction of a second.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.models.marketing import KeywordOpportunity
+
+MAX_POSITION = 100
+# Power law used when a marketplace has too little data for its own fit.
+DEFAULT_CURVE = (0.28, 0.9)
+# Impressions-worth of weight the power law gets at each position.
+_PRIOR_IMPRESSIONS = 1_000.0
+# Clicks-worth of weight pulling a keyword's relevance towards 1.
+_PRIOR_CLICKS = 10.0
+_POSITIONS = np.arange(1, MAX_POSITION + 1, dtype=float)
+
+
+@dataclass
+class CtrCurve:
+    """Click-through rate by search position for one marketplace.
+
+    Attributes:
+        scale: Power-law CTR at position 1.
+        decay: Power-law exponent, CTR ~ scale * position ** -decay.
+        ctr: CTR at positions 1..MAX_POSITION.
+    """
+
+    scale: float
+    decay: float
+    ctr: np.ndarray
+
+    def __call__(self, position: Any) -> np.ndarray:
+        """CTR at (fractional) positions."""
+        return np.interp(np.clip(np.asarray(position, dtype=float), 1, MAX_POSITION), _POSITIONS, self.ctr)
+
+
+def position_totals(position: np.ndarray, clicks: np.ndarray, impressions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Clicks and impressions summed per whole position 1..MAX_POSITION."""
+    bins = np.clip(np.rint(position), 1, MAX_POSITION).astype(np.int64) - 1
+    return (
+        np.bincount(bins, weights=clicks, minlength=MAX_POSITION),
+        np.bincount(bins, weights=impressions, minlength=MAX_POSITION),
+    )
+
+
+def fit_ctr_curve(clicks: np.ndarray, impressions: np.ndarray) -> CtrCurve:
+    """Fit a CTR curve to clicks and impressions per position (see `position_totals`)."""
+    seen = (impressions > 0) & (clicks > 0)
+    if seen.sum() >= 3:
+        slope, intercept = np.polyfit(
+            np.log(_POSITIONS[seen]), np.log(clicks[seen] / impressions[seen]), 1, w=np.sqrt(impressions[seen])
+        )
+        scale, decay = float(np.exp(intercept)), float(max(-slope, 0.0))
+    else:
+        scale, decay = DEFAULT_CURVE
+    prior = np.clip(scale * _POSITIONS ** -decay, 0.0, 1.0)
+    ctr = (clicks + _PRIOR_IMPRESSIONS * prior) / (impressions + _PRIOR_IMPRESSIONS)
+    # A lower position never earns a higher CTR.
+    return CtrCurve(scale, decay, np.minimum.accumulate(np.clip(ctr, 0.0, 1.0)))
+
+
+class CurveCache:
+    """CTR curves per marketplace, refitted only when the position totals change."""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], CtrCurve]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def curve(self, marketplace: str, clicks: np.ndarray, impressions: np.ndarray) -> CtrCurve:
+        key = (marketplace, hash((clicks.tobytes(), impressions.tobytes())))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        curve = fit_ctr_curve(clicks, impressions)
+        with self._lock:
+            self._entries[key] = curve
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return curve
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_cache = CurveCache()
+
+
+def _column(keywords: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in keywords:
+        return np.zeros(len(keywords))
+    return pd.to_numeric(keywords[name], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+
+def score_keywords(
+    keywords: pd.DataFrame,
+    target_position: float = 3.0,
+    effort_positions: float = 10.0,
+    curves: Optional[Dict[str, CtrCurve]] = None,
+    cache: Optional[CurveCache] = None,
+) -> pd.DataFrame:
+    """Expected click and value uplift of moving each keyword up to `target_position`.
+
+    Args:
+        keywords: Rows with keyword, marketplace, search_volume, position,
+            clicks, impressions and cpc.
+        target_position: Position each keyword is assumed to reach; keywords
+            already ranking at or above it have no uplift.
+        effort_positions: Positions to climb at which the opportunity score
+            is half the value uplift.
+        curves: CTR curves to use per marketplace instead of fitting them.
+        cache: Curve cache for fitted curves; defaults to a process-wide cache.
+
+    Returns:
+        `keywords` with expected_ctr, target_ctr, relevance, current_clicks,
+        potential_clicks, click_uplift, value_uplift and opportunity_score
+        columns added.
+    """
+    cache = cache if cache is not None else _default_cache
+    marketplace = (
+        keywords["marketplace"].fillna("").to_numpy(dtype=object)
+        if "marketplace" in keywords else np.full(len(keywords), "", dtype=object)
+    )
+    codes, names = pd.factorize(marketplace)
+    position = np.clip(_column(keywords, "position"), 1, MAX_POSITION)
+    clicks, impressions = _column(keywords, "clicks"), _column(keywords, "impressions")
+    volume, cpc = _column(keywords, "search_volume"), _column(keywords, "cpc")
+
+    table = np.empty((len(names), MAX_POSITION))
+    for code, name in enumerate(names):
+        if curves is not None and name in curves:
+            table[code] = curves[name].ctr
+            continue
+        rows = codes == code
+        table[code] = cache.curve(str(name), *position_totals(position[rows], clicks[rows], impressions[rows])).ctr
+
+    def ctr_at(p: np.ndarray) -> np.ndarray:
+        # Linear interpolation between whole positions, per row's curve.
+        low = np.minimum(np.floor(p).astype(np.int64), MAX_POSITION - 1)
+        frac = p - low
+        return table[codes, low - 1] * (1 - frac) + table[codes, low] * frac
+
+    expected = ctr_at(position)
+    target = ctr_at(np.minimum(position, target_position))
+    relevance = (clicks + _PRIOR_CLICKS) / (impressions * expected + _PRIOR_CLICKS)
+    current = volume * expected * relevance
+    potential = volume * target * relevance
+    uplift = potential - current
+    value = uplift * cpc
+    gap = np.maximum(position - target_position, 0.0)
+    return keywords.assign(
+        expected_ctr=expected,
+        target_ctr=target,
+        relevance=relevance,
+        current_clicks=current,
+        potential_clicks=potential,
+        click_uplift=uplift,
+        value_uplift=value,
+        opportunity_score=value / (1.0 + gap / effort_positions),
+    )
+
+
+def top_keywords(scored: pd.DataFrame, top_k: int, by: str = "opportunity_score") -> pd.DataFrame:
+    """The `top_k` rows by `by`, highest first, using a partial sort."""
+    values = scored[by].to_numpy(dtype=float)
+    if top_k <= 0 or not len(values):
+        return scored.iloc[:0]
+    if top_k < len(values):
+        candidates = np.argpartition(-values, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(values))
+    best = candidates[np.argsort(-values[candidates], kind="stable")]
+    return scored.iloc[best]
+
+
+def keyword_opportunities(
+    keywords: pd.DataFrame,
+    category: str = "",
+    marketplace: str = "",
+    target_position: float = 3.0,
+    top_k: int = 100,
+    min_volume: int = 0,
+    by: str = "opportunity_score",
+    cache: Optional[CurveCache] = None,
+    **kwargs: Any,
+) -> List[KeywordOpportunity]:
+    """Compute KeywordOpportunity rows from KeywordPerformance data.
+
+    Curves are fitted on every marketplace's keywords, before filtering.
+
+    Args:
+        keywords: KeywordPerformance rows, optionally with a category column.
+        category: Only rank keywords of this category.
+        marketplace: Only rank this marketplace.
+        target_position: Position keywords are assumed to reach.
+        top_k: Number of keywords returned.
+        min_volume: Only rank keywords with at least this search volume.
+        by: Ranking column, "opportunity_score", "value_uplift" or "click_uplift".
+        cache: Curve cache; defaults to a process-wide cache.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    if keywords.empty:
+        return []
+    scored = score_keywords(keywords, target_position=target_position, cache=cache)
+    mask = np.ones(len(scored), dtype=bool)
+    for column, value in (("category", category), ("marketplace", marketplace)):
+        if value and column in scored:
+            mask &= (scored[column] == value).to_numpy()
+    if min_volume:
+        mask &= _column(scored, "search_volume") >= min_volume
+    best = top_keywords(scored[mask], top_k, by=by)
+    fields = KeywordOpportunity.model_fields
+    rounded = best.round({"expected_ctr": 4, "target_ctr": 4, "relevance": 3, "current_clicks": 1,
+                          "potential_clicks": 1, "click_uplift": 1, "value_uplift": 2, "opportunity_score": 2})
+    records = rounded[[c for c in rounded.columns if c in fields]].to_dict("records")
+    return [
+        KeywordOpportunity(rank=rank, target_position=target_position, **row)
+        for rank, row in enumerate(records, start=1)
+    ]
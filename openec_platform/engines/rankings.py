@@ -0,0 +1,278 @@
+"""Bestseller ranking engine - top-K products per category and marketplace.
+
+Units sold are kept per product and day for the last two ranking periods
+only, as sparse arrays. When new SalesHistorical rows arrive, just the days
+they touch are replaced; a ranking is then the sum over the current period
+(one bincount over its days) followed by a partial sort per (category,
+marketplace) group, so millions of SKUs are never fully sorted.
+
+The previous period's ranks come from the same retained days, so `change`
+needs no extra pass over history. Finished rankings are stored per group and
+served by lookup until more data arrives; the state can be saved to disk and
+reloaded without the raw sales.
+
+    engine = RankingEngine(period_days=7, top_k=100)
+    engine.update(sales)                    # DataFrame of SalesHistorical rows
+    engine.rankings(category="Electronics", marketplace="amazon")
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.models.products import ProductRanking
+
+_KEY_COLUMNS = ["sku", "name", "category", "marketplace"]
+_RANKING_COLUMNS = ["date", "sku", "name", "rank", "category", "marketplace", "change"]
+
+Group = Tuple[str, str]
+
+
+class RankingEngine:
+    """Incrementally maintained bestseller rankings.
+
+    Args:
+        period_days: Length of a ranking period; rankings cover the period
+            ending on the latest day with sales, and `change` compares with
+            the period before it.
+        top_k: Products kept per (category, marketplace) ranking.
+        value_col: Column ranked on, e.g. "units_sold" or "revenue".
+    """
+
+    def __init__(self, period_days: int = 7, top_k: int = 100, value_col: str = "units_sold") -> None:
+        self.period_days = period_days
+        self.top_k = top_k
+        self.value_col = value_col
+        self._keys = pd.DataFrame(columns=_KEY_COLUMNS)
+        self._key_index = pd.Index(np.array([], dtype=np.uint64))
+        self._days: Dict[date, pd.Series] = {}
+        self._tables: Optional[Dict[Group, pd.DataFrame]] = None
+        self._lock = threading.Lock()
+
+    # -- updates ------------------------------------------------------------
+
+    def _key_ids(self, sales: pd.DataFrame) -> np.ndarray:
+        """Ids of the (sku, category, marketplace) keys of `sales`, registering new ones."""
+        keys = pd.DataFrame({
+            c: sales[c].fillna("").to_numpy(dtype=object) if c in sales else "" for c in _KEY_COLUMNS
+        }, dtype=object)
+        hashes = pd.util.hash_pandas_object(keys[["sku", "category", "marketplace"]], index=False).to_numpy()
+        ids = self._key_index.get_indexer(hashes)
+        new = ids < 0
+        if new.any():
+            fresh = ~pd.Series(hashes[new]).duplicated().to_numpy()
+            added = keys[new][fresh]
+            self._keys = (
+                pd.concat([self._keys, added], ignore_index=True) if len(self._keys) else added.reset_index(drop=True)
+            )
+            self._key_index = self._key_index.append(pd.Index(hashes[new][fresh]))
+            ids = self._key_index.get_indexer(hashes)
+        return ids
+
+    def update(self, sales: pd.DataFrame, scope: Optional[Dict[str, Any]] = None) -> None:
+        """Fold SalesHistorical rows into the retained days.
+
+        The rows are the full values of the days they cover: a day already
+        held is replaced wholesale, so restatements and repeated fetches are
+        not double counted and products missing from a re-fetch drop out.
+
+        Args:
+            sales: SalesHistorical rows.
+            scope: Filters the rows were fetched with, e.g. {"category":
+                "Electronics"}: held values outside them are kept. A filter
+                some rows do not satisfy is ignored, since the source
+                evidently did not apply it.
+        """
+        if sales.empty:
+            return
+        scope = {
+            column: str(value) for column, value in (scope or {}).items()
+            if value not in ("", None) and column in sales and (sales[column].astype(str) == str(value)).all()
+        }
+        with self._lock:
+            ids = self._key_ids(sales)
+            days = pd.to_datetime(sales["date"], format="ISO8601").dt.date.to_numpy()
+            values = pd.to_numeric(sales[self.value_col], errors="coerce").fillna(0.0).to_numpy()
+            per_day = pd.Series(values).groupby([days, ids]).sum()
+            outside = np.zeros(len(self._keys), dtype=bool)
+            for column, value in scope.items():
+                outside |= (self._keys[column] != value).to_numpy()
+            for day, day_values in per_day.groupby(level=0):
+                day_values = day_values.droplevel(0)
+                held = self._days.get(day)
+                if held is not None and outside.any():
+                    kept = held[outside[held.index.to_numpy()]]
+                    day_values = pd.concat([kept[~kept.index.isin(day_values.index)], day_values])
+                self._days[day] = day_values
+            # Only the last two periods are ever ranked.
+            cutoff = max(self._days) - timedelta(days=2 * self.period_days - 1)
+            self._days = {d: v for d, v in self._days.items() if d >= cutoff}
+            self._tables = None
+
+    # -- rankings -----------------------------------------------------------
+
+    def _window_totals(self, end: date) -> np.ndarray:
+        start = end - timedelta(days=self.period_days - 1)
+        totals = np.zeros(len(self._keys))
+        for day, values in self._days.items():
+            if start <= day <= end:
+                totals += np.bincount(values.index.to_numpy(), weights=values.to_numpy(), minlength=len(totals))
+        return totals
+
+    def _rank(self) -> Dict[Group, pd.DataFrame]:
+        if not self._days:
+            return {}
+        end = max(self._days)
+        current = self._window_totals(end)
+        previous = self._window_totals(end - timedelta(days=self.period_days))
+        groups = self._keys.groupby(["category", "marketplace"], sort=True).indices
+        skus = self._keys["sku"].to_numpy(dtype=object)
+        tables = {}
+        for group, members in groups.items():
+            sold = members[current[members] > 0]
+            if not len(sold):
+                continue
+            values = current[sold]
+            if len(sold) > self.top_k:
+                # Partial sort: only the top K (and ties with the K-th) are ordered.
+                kth = -np.partition(-values, self.top_k - 1)[self.top_k - 1]
+                head = values >= kth
+                sold, values = sold[head], values[head]
+            order = np.lexsort((skus[sold], -values))[:self.top_k]
+            top = sold[order]
+            rank = np.arange(1, len(top) + 1)
+            # Previous rank = 1 + products in the group that sold more last period.
+            before = np.sort(-previous[members])
+            previous_rank = np.searchsorted(before, -previous[top], side="left") + 1
+            change = np.where(previous[top] > 0, previous_rank - rank, 0)
+            tables[group] = pd.DataFrame({
+                "date": end,
+                "sku": skus[top],
+                "name": self._keys["name"].to_numpy(dtype=object)[top],
+                "rank": rank,
+                "category": group[0],
+                "marketplace": group[1],
+                "change": change.astype(np.int64),
+            })
+        return tables
+
+    def rankings(self, category: str = "", marketplace: str = "", top_k: Optional[int] = None) -> pd.DataFrame:
+        """Bestseller rankings for the latest period.
+
+        Args:
+            category: Only this category. All categories if empty.
+            marketplace: Only this marketplace. All marketplaces if empty.
+            top_k: Return fewer than the engine's `top_k` rows per ranking.
+
+        Returns:
+            DataFrame with date, sku, name, rank, category, marketplace and
+            change (positive when the product moved up).
+        """
+        with self._lock:
+            if self._tables is None:
+                self._tables = self._rank()
+            tables = self._tables
+        if category and marketplace:
+            selected = [tables[(category, marketplace)]] if (category, marketplace) in tables else []
+        else:
+            selected = [
+                table for (c, m), table in tables.items()
+                if (not category or c == category) and (not marketplace or m == marketplace)
+            ]
+        if not selected:
+            return pd.DataFrame(columns=_RANKING_COLUMNS)
+        limit = self.top_k if top_k is None else min(top_k, self.top_k)
+        return pd.concat([table.head(limit) for table in selected], ignore_index=True)
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the retained days and product keys to an .npz file."""
+        with self._lock:
+            days = sorted(self._days)
+            arrays = {
+                f"key_{c}": self._keys[c].to_numpy(dtype=str) if len(self._keys) else np.array([], dtype=str)
+                for c in _KEY_COLUMNS
+            }
+            np.savez(
+                path,
+                settings=np.array([self.period_days, self.top_k]),
+                value_col=np.array(self.value_col),
+                key_hash=self._key_index.to_numpy(dtype=np.uint64),
+                day_ordinal=np.array([d.toordinal() for d in days], dtype=np.int64),
+                day_offsets=np.cumsum([0] + [len(self._days[d]) for d in days]),
+                ids=(
+                    np.concatenate([self._days[d].index.to_numpy() for d in days])
+                    if days else np.array([], dtype=np.int64)
+                ),
+                values=np.concatenate([self._days[d].to_numpy() for d in days]) if days else np.array([]),
+                **arrays,
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "RankingEngine":
+        """Restore an engine saved with `save()`; rankings are recomputed on first use."""
+        data = np.load(path, allow_pickle=False)
+        period_days, top_k = (int(v) for v in data["settings"])
+        engine = cls(period_days=period_days, top_k=top_k, value_col=str(data["value_col"]))
+        engine._keys = pd.DataFrame({c: data[f"key_{c}"].astype(object) for c in _KEY_COLUMNS})
+        engine._key_index = pd.Index(data["key_hash"])
+        offsets = data["day_offsets"]
+        for i, ordinal in enumerate(data["day_ordinal"]):
+            window = slice(offsets[i], offsets[i + 1])
+            engine._days[date.fromordinal(int(ordinal))] = pd.Series(data["values"][window], index=data["ids"][window])
+        return engine
+
+
+class RankingEngines:
+    """Ranking engines kept per (period_days, top_k, value column), e.g. one pool per provider."""
+
+    def __init__(self) -> None:
+        self._engines: Dict[Tuple[int, int, str], RankingEngine] = {}
+        self._lock = threading.Lock()
+
+    def get(self, period_days: int, top_k: int, value_col: str) -> RankingEngine:
+        with self._lock:
+            key = (period_days, top_k, value_col)
+            if key not in self._engines:
+                self._engines[key] = RankingEngine(period_days=period_days, top_k=top_k, value_col=value_col)
+            return self._engines[key]
+
+
+def bestseller_rankings(
+    sales: pd.DataFrame,
+    category: str = "",
+    marketplace: str = "",
+    top_k: int = 100,
+    period_days: int = 7,
+    by: str = "units_sold",
+    engine: Optional[RankingEngine] = None,
+    engines: Optional[RankingEngines] = None,
+    **kwargs: Any,
+) -> List[ProductRanking]:
+    """Compute ProductRanking rows from SalesHistorical data.
+
+    Args:
+        sales: Rows with date, sku, name, category, marketplace and units_sold.
+        category: Only rank this category.
+        marketplace: Only rank this marketplace.
+        top_k: Products per (category, marketplace) ranking.
+        period_days: Length of the ranking period.
+        by: Column to rank on, "units_sold" or "revenue".
+        engine: Engine holding the ranking state.
+        engines: Pool to take the engine for these settings from when no
+            `engine` is given, so repeated requests only fold in new days. A
+            fresh engine is built for this request when both are omitted.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    if engine is None:
+        engine = engines.get(period_days, top_k, by) if engines is not None else RankingEngine(period_days, top_k, by)
+    engine.update(sales, scope={"category": category, "marketplace": marketplace})
+    table = engine.rankings(category=category, marketplace=marketplace)
+    return [ProductRanking(**row) for row in table.to_dict("records")]
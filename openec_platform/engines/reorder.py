@@ -0,0 +1,338 @@
+"""Reorder engine - Monte Carlo stockout risk and reorder points per SKU and warehouse.
+
+Demand over the replenishment lead time is simulated for every SKU x
+warehouse at once. Each path draws daily demand from the item's own recent
+history (a bootstrap, so intermittent and skewed demand keep their shape),
+optionally rescaled to the level of a DemandForecast. Paths for a block of
+items are one NumPy array of shape (items, paths, days):
+
+    stockout_probability     share of paths whose lead-time demand exceeds stock
+    expected_days_of_supply  mean day on which a path runs out (capped at the horizon)
+    reorder_point            lead-time demand quantile at the service level
+
+Blocks are sized to a fixed number of array cells, so memory stays bounded
+however many items are simulated. Items whose stock exceeds any demand the
+horizon could produce skip the days-of-supply simulation; only their lead-time
+demand is simulated. Results are cached per item until its history, stock or
+the simulation settings change.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.forecasting import parse_horizon, sales_matrix
+from openec_platform.models.inventory import StockoutRisk
+
+# Simulated array cells (items x paths x days) per block.
+BLOCK_CELLS = 16_000_000
+_RESULT_FIELDS = ["stockout_probability", "expected_days_of_supply", "reorder_point", "safety_stock", "mean_demand"]
+
+
+class RiskCache:
+    """Per-item simulation results keyed by a fingerprint of the item's inputs."""
+
+    def __init__(self, max_items: int = 200_000) -> None:
+        self.max_items = max_items
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str], fingerprint: int) -> Optional[np.ndarray]:
+        """Cached results for an item, or None if missing or stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple[str, str], fingerprint: int, values: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = (fingerprint, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_cache = RiskCache()
+
+
+def _draw_demand(history: np.ndarray, paths: int, days: int, rng: np.random.Generator) -> np.ndarray:
+    """Bootstrapped daily demand, shape (items, paths, days)."""
+    items, observed = history.shape
+    return history[np.arange(items)[:, None, None], rng.integers(0, observed, size=(items, paths, days))]
+
+
+def _lead_demand(
+    cumulative: np.ndarray, lead_days: np.ndarray, lead_std: float, horizon: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Demand over each path's lead time, from cumulative daily demand of shape (items, paths, days)."""
+    items, paths, days = cumulative.shape
+    # Lead time per path: fixed, or normally distributed around the item's lead time.
+    lead = np.broadcast_to(lead_days[:, None], (items, paths)).astype(np.float64)
+    if lead_std > 0:
+        lead = lead + rng.normal(0.0, lead_std, size=(items, paths))
+    lead = np.clip(np.rint(lead), 1, min(horizon, days)).astype(np.int64)
+    return np.take_along_axis(cumulative, lead[:, :, None] - 1, axis=2)[:, :, 0]
+
+
+def _reorder_fields(lead_demand: np.ndarray, service_level: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reorder point, safety stock and mean of the lead-time demand per item."""
+    reorder_point = np.quantile(lead_demand, service_level, axis=1)
+    mean_demand = lead_demand.mean(axis=1)
+    return reorder_point, reorder_point - mean_demand, mean_demand
+
+
+def _simulate_block(
+    history: np.ndarray,
+    quantity: np.ndarray,
+    lead_days: np.ndarray,
+    lead_std: float,
+    horizon: int,
+    paths: int,
+    service_level: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Simulate one block of items; returns an (items, len(_RESULT_FIELDS)) array."""
+    draws = _draw_demand(history, paths, horizon, rng)
+    cumulative = draws.cumsum(axis=2)
+    lead_demand = _lead_demand(cumulative, lead_days, lead_std, horizon, rng)
+
+    # Days of supply: the day stock runs out, with the last day counted fractionally.
+    stock = quantity[:, None, None]
+    out = cumulative > stock
+    ran_out = out.any(axis=2)
+    day = out.argmax(axis=2)
+    before = np.where(day > 0, np.take_along_axis(cumulative, np.maximum(day - 1, 0)[:, :, None], axis=2)[:, :, 0], 0.0)
+    demand_that_day = np.take_along_axis(draws, day[:, :, None], axis=2)[:, :, 0]
+    fraction = (quantity[:, None] - before) / np.where(demand_that_day > 0, demand_that_day, 1.0)
+    supply = np.where(ran_out, day + fraction, horizon)
+
+    return np.column_stack([
+        (lead_demand > quantity[:, None]).mean(axis=1),
+        supply.mean(axis=1),
+        *_reorder_fields(lead_demand, service_level),
+    ])
+
+
+def _lead_demand_block(
+    history: np.ndarray,
+    lead_days: np.ndarray,
+    lead_std: float,
+    horizon: int,
+    paths: int,
+    service_level: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Results for a block of items that cannot run out within the horizon.
+
+    Only lead-time demand is simulated (days of supply is the whole horizon),
+    so the reorder point is the same service-level quantile as for simulated
+    items.
+    """
+    # Fixed lead times need no draws past the longest one.
+    days = horizon if lead_std > 0 else int(np.clip(lead_days.max(), 1, horizon))
+    cumulative = _draw_demand(history, paths, days, rng).cumsum(axis=2)
+    lead_demand = _lead_demand(cumulative, lead_days, lead_std, horizon, rng)
+    return np.column_stack([
+        np.zeros(len(history)),
+        np.full(len(history), float(horizon)),
+        *_reorder_fields(lead_demand, service_level),
+    ])
+
+
+def simulate_stockout_risk(
+    inventory: pd.DataFrame,
+    sales: pd.DataFrame,
+    forecast: Optional[pd.DataFrame] = None,
+    lead_time: Any = "7d",
+    lead_time_std: float = 0.0,
+    service_level: float = 0.95,
+    horizon: Any = "30d",
+    paths: int = 1_000,
+    history_days: int = 90,
+    seed: int = 0,
+    cache: Optional[RiskCache] = None,
+) -> pd.DataFrame:
+    """Simulate stockout risk for every inventory row.
+
+    Args:
+        inventory: InventoryLevel rows (sku, warehouse, quantity; optionally
+            lead_time_days per row).
+        sales: SalesHistorical rows. With a warehouse column, demand history is
+            per warehouse; otherwise a SKU's demand is split evenly across the
+            warehouses stocking it.
+        forecast: Optional DemandForecast rows; each SKU's simulated demand is
+            rescaled to its mean predicted daily demand.
+        lead_time: Replenishment lead time, e.g. 7 or "7d".
+        lead_time_std: Standard deviation of the lead time in days.
+        service_level: Probability of not stocking out that the reorder point covers.
+        horizon: Days simulated for days of supply, e.g. "30d".
+        paths: Simulated paths per item.
+        history_days: Most recent days of sales used as the demand distribution.
+        seed: Random seed.
+        cache: Result cache; defaults to a process-wide cache.
+
+    Returns:
+        The inventory rows with stockout_probability, expected_days_of_supply,
+        reorder_point, safety_stock, mean_demand and lead_time_days columns.
+    """
+    cache = cache if cache is not None else _default_cache
+    horizon_days = parse_horizon(horizon)
+    default_lead = parse_horizon(lead_time)
+    items = inventory.reset_index(drop=True).copy()
+    items["sku"] = items["sku"].astype(str)
+    items["warehouse"] = items["warehouse"].astype(str) if "warehouse" in items else ""
+    quantity = pd.to_numeric(items["quantity"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    lead_days = (
+        pd.to_numeric(items["lead_time_days"], errors="coerce").fillna(default_lead).to_numpy(dtype=float)
+        if "lead_time_days" in items else np.full(len(items), float(default_lead))
+    )
+    horizon_days = max(horizon_days, int(np.ceil(lead_days.max() + 3 * lead_time_std)) if len(items) else 1)
+
+    # Daily demand history per item, most recent `history_days`.
+    if sales.empty:
+        history = np.zeros((len(items), 1))
+    elif "warehouse" in sales:
+        keyed = sales.assign(sku=sales["sku"].astype(str) + "\x1f" + sales["warehouse"].astype(str))
+        wide = sales_matrix(keyed).iloc[:, -history_days:]
+        history = wide.reindex(items["sku"] + "\x1f" + items["warehouse"], fill_value=0.0).to_numpy()
+    else:
+        wide = sales_matrix(sales).iloc[:, -history_days:]
+        share = 1.0 / items.groupby("sku")["warehouse"].transform("size").to_numpy()
+        history = wide.reindex(items["sku"], fill_value=0.0).to_numpy() * share[:, None]
+    if forecast is not None and not forecast.empty:
+        level = forecast.groupby(forecast["sku"].astype(str))["predicted_demand"].mean()
+        target = items["sku"].map(level).to_numpy(dtype=float)
+        current = history.mean(axis=1)
+        scale = np.where(np.isnan(target) | (current <= 0), 1.0, target / np.where(current > 0, current, 1.0))
+        history = history * scale[:, None]
+    history = history.astype(np.float32)
+
+    settings = np.uint64(hash((paths, horizon_days, service_level, lead_time_std, seed)) & (2 ** 64 - 1))
+    fingerprints = (
+        pd.util.hash_pandas_object(pd.DataFrame(history), index=False).to_numpy()
+        ^ pd.util.hash_array(quantity) ^ pd.util.hash_array(lead_days * 1_000_003) ^ settings
+    )
+    keys = list(zip(items["sku"], items["warehouse"]))
+
+    results = np.empty((len(items), len(_RESULT_FIELDS)))
+    missing = []
+    for i, (key, fp) in enumerate(zip(keys, fingerprints)):
+        hit = cache.get(key, int(fp))
+        if hit is None:
+            missing.append(i)
+        else:
+            results[i] = hit
+
+    if missing:
+        missing = np.array(missing)
+        # Stock beyond the largest demand the horizon could bring never runs out.
+        safe = quantity[missing] >= history[missing].max(axis=1) * horizon_days
+        rng = np.random.default_rng(seed)
+        block = max(1, BLOCK_CELLS // (paths * horizon_days))
+        # Such items skip the days-of-supply simulation but not the lead-time demand.
+        sure = missing[safe]
+        for start in range(0, len(sure), block):
+            rows = sure[start:start + block]
+            results[rows] = _lead_demand_block(
+                history[rows], lead_days[rows], lead_time_std, horizon_days, paths, service_level, rng
+            )
+        todo = missing[~safe]
+        for start in range(0, len(todo), block):
+            rows = todo[start:start + block]
+            results[rows] = _simulate_block(
+                history[rows], quantity[rows], lead_days[rows], lead_time_std,
+                horizon_days, paths, service_level, rng,
+            )
+        for i in missing:
+            cache.put(keys[i], int(fingerprints[i]), results[i].copy())
+
+    out = items.assign(**{name: results[:, j] for j, name in enumerate(_RESULT_FIELDS)})
+    out["lead_time_days"] = lead_days
+    out["quantity"] = quantity
+    return out
+
+
+def _status(frame: pd.DataFrame, critical: float) -> np.ndarray:
+    return np.select(
+        [
+            frame["quantity"] <= 0,
+            frame["stockout_probability"] >= critical,
+            frame["quantity"] <= frame["reorder_point"],
+        ],
+        ["out_of_stock", "critical", "reorder"],
+        "ok",
+    )
+
+
+def reorder_alerts(
+    inventory: pd.DataFrame,
+    sales: pd.DataFrame,
+    forecast: Optional[pd.DataFrame] = None,
+    threshold: int = 0,
+    warehouse: str = "",
+    sku: str = "",
+    lead_time: Any = "7d",
+    lead_time_std: float = 0.0,
+    service_level: float = 0.95,
+    paths: int = 1_000,
+    critical: float = 0.5,
+    alerts_only: bool = True,
+    **kwargs: Any,
+) -> List[StockoutRisk]:
+    """Compute StockoutRisk rows from inventory levels and sales history.
+
+    Args:
+        inventory: InventoryLevel rows.
+        sales: SalesHistorical rows used as the demand distribution.
+        forecast: Optional DemandForecast rows setting the demand level.
+        threshold: Also alert on any item with this many units or fewer.
+        warehouse: Only this warehouse.
+        sku: Only this SKU.
+        lead_time: Replenishment lead time, e.g. "7d".
+        lead_time_std: Standard deviation of the lead time in days.
+        service_level: Service level of the recommended reorder point.
+        paths: Simulated paths per item.
+        critical: Stockout probability at which an item is critical.
+        alerts_only: Only return items that need reordering; all items otherwise.
+        **kwargs: Ignored; allows passing command parameters through.
+
+    Returns:
+        One row per SKU and warehouse, riskiest first.
+    """
+    if warehouse and "warehouse" in inventory:
+        inventory = inventory[inventory["warehouse"] == warehouse]
+    if sku:
+        inventory = inventory[inventory["sku"] == sku]
+    if inventory.empty:
+        return []
+    risk = simulate_stockout_risk(
+        inventory, sales, forecast=forecast, lead_time=lead_time, lead_time_std=lead_time_std,
+        service_level=service_level, paths=paths,
+    )
+    risk["status"] = _status(risk, critical)
+    if alerts_only:
+        risk = risk[(risk["status"] != "ok") | (risk["quantity"] <= threshold)]
+    risk = risk.sort_values(["stockout_probability", "expected_days_of_supply"], ascending=[False, True])
+    fields = StockoutRisk.model_fields
+    return [
+        StockoutRisk(**{k: v for k, v in row.items() if k in fields})
+        for row in risk.assign(
+            quantity=risk["quantity"].astype(int),
+            stockout_probability=risk["stockout_probability"].round(4),
+            expected_days_of_supply=risk["expected_days_of_supply"].round(1),
+            reorder_point=np.ceil(risk["reorder_point"]).astype(int),
+            safety_stock=np.ceil(risk["safety_stock"].clip(lower=0)).astype(int),
+            lead_time_demand=risk["mean_demand"].round(1),
+            lead_time_days=risk["lead_time_days"].round(1),
+        ).to_dict("records")
+    ]
@@ -0,0 +1,323 @@
+"""RFM segmentation engine - recency, frequency and monetary scoring from orders.
+
+Orders are folded chunk by chunk into one row per customer (last order date,
+order count, total spend), so memory is bounded by the number of customers,
+not orders. Customers are then scored 1-5 on each dimension by quantile
+binning and mapped to named segments. Above APPROXIMATE_THRESHOLD customers
+the bin edges and medians come from t-digest sketches instead of a full sort.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.sketches import TDigest
+from openec_platform.engines.utils import FrameInput, hash_keys, iter_chunks
+from openec_platform.models.customers import CustomerLifetimeValue, CustomerRFM, CustomerSegment
+
+# Evaluated in order; the first matching rule names the segment.
+SEGMENTS = ("Champions", "Loyal", "New Customers", "Potential Loyalists", "At Risk", "Lost")
+
+# Above this many customers, quantile edges are estimated instead of ranking everyone.
+APPROXIMATE_THRESHOLD = 1_000_000
+
+
+def _segment(r: np.ndarray, f: np.ndarray, m: np.ndarray) -> np.ndarray:
+    fm = np.floor((f + m) / 2 + 0.5)
+    conditions = [
+        (r >= 4) & (fm >= 4),
+        (r >= 3) & (fm >= 3),
+        (r >= 4) & (f <= 1),
+        r >= 3,
+        fm >= 3,
+    ]
+    return np.select(conditions, list(SEGMENTS[:5]), default=SEGMENTS[5])
+
+
+def _binned_scores(array: np.ndarray, edges: np.ndarray, bins: int, reverse: bool) -> np.ndarray:
+    # Ties at an edge fall into the lower bin, so equal values always share a score
+    # and heavily tied values (e.g. one-time buyers) share the lowest one.
+    scores = np.searchsorted(edges, array, side="left") + 1
+    return (bins + 1 - scores) if reverse else scores
+
+
+def _exact_scores(values: pd.Series, bins: int, reverse: bool = False) -> np.ndarray:
+    array = values.to_numpy(dtype=float)
+    return _binned_scores(array, np.quantile(array, np.linspace(0, 1, bins + 1)[1:-1]), bins, reverse)
+
+
+def _approximate_scores(values: pd.Series, bins: int, reverse: bool = False) -> np.ndarray:
+    array = values.to_numpy(dtype=float)
+    edges = TDigest().add(array).quantile(np.linspace(0, 1, bins + 1)[1:-1])
+    return _binned_scores(array, edges, bins, reverse)
+
+
+class RFMAccumulator:
+    """Incremental per-customer RFM aggregation over chunks of orders.
+
+    Usage:
+        acc = RFMAccumulator()
+        for chunk in pd.read_csv("orders.csv", chunksize=1_000_000):
+            acc.add(chunk)
+        table = acc.table()
+    """
+
+    def __init__(
+        self,
+        customer_col: str = "customer_id",
+        date_col: str = "date",
+        value_col: str = "total",
+        exclude_statuses: Sequence[str] = ("cancelled",),
+        compact_rows: int = 5_000_000,
+    ) -> None:
+        """Initialize the accumulator.
+
+        Args:
+            customer_col: Column holding the customer identifier.
+            date_col: Column holding the order timestamp.
+            value_col: Column holding the order value.
+            exclude_statuses: Orders with these `status` values are ignored.
+            compact_rows: Merge pending partial aggregates once they exceed this many rows.
+        """
+        self.customer_col = customer_col
+        self.date_col = date_col
+        self.value_col = value_col
+        self.exclude_statuses = set(exclude_statuses)
+        self.compact_rows = compact_rows
+        self._parts: List[pd.DataFrame] = []
+        self._pending_rows = 0
+
+    def add(self, orders: pd.DataFrame) -> None:
+        """Fold a chunk of orders into the per-customer aggregate."""
+        mask = orders[self.customer_col].notna() & (orders[self.customer_col] != "")
+        if self.exclude_statuses and "status" in orders:
+            mask &= ~orders["status"].isin(self.exclude_statuses)
+        orders = orders[mask]
+        if orders.empty:
+            return
+        placed = pd.to_datetime(orders[self.date_col], format="ISO8601").to_numpy(dtype="datetime64[ns]")
+        reduced = (
+            pd.DataFrame({
+                "key": hash_keys(orders[self.customer_col]),
+                "customer_id": orders[self.customer_col].astype(str).to_numpy(),
+                "first_order": placed,
+                "last_order": placed,
+                "frequency": np.ones(len(orders), dtype=np.int64),
+                "monetary": pd.to_numeric(orders[self.value_col], errors="coerce").fillna(0.0).to_numpy(),
+            })
+            .groupby("key", sort=False)
+            .agg(customer_id=("customer_id", "first"), first_order=("first_order", "min"),
+                 last_order=("last_order", "max"), frequency=("frequency", "sum"), monetary=("monetary", "sum"))
+        )
+        self._parts.append(reduced)
+        self._pending_rows += len(reduced)
+        if self._pending_rows > self.compact_rows:
+            self._compact()
+
+    def customers(self) -> pd.DataFrame:
+        """Per-customer aggregate: customer_id, first_order, last_order, frequency, monetary."""
+        return self._compact()
+
+    def _compact(self) -> pd.DataFrame:
+        if len(self._parts) > 1:
+            merged = pd.concat(self._parts)
+            self._parts = [
+                merged.groupby(level=0, sort=False).agg(
+                    customer_id=("customer_id", "first"), first_order=("first_order", "min"),
+                    last_order=("last_order", "max"), frequency=("frequency", "sum"), monetary=("monetary", "sum"),
+                )
+            ]
+        self._pending_rows = len(self._parts[0]) if self._parts else 0
+        return self._parts[0] if self._parts else pd.DataFrame(
+            columns=["customer_id", "first_order", "last_order", "frequency", "monetary"]
+        )
+
+    def table(
+        self,
+        as_of: Optional[Union[date, datetime, str]] = None,
+        bins: int = 5,
+        approximate: Optional[bool] = None,
+    ) -> pd.DataFrame:
+        """Score every customer and assign a segment.
+
+        Args:
+            as_of: Reference date for recency. Defaults to the latest order date.
+            bins: Number of quantile bins per dimension.
+            approximate: Estimate quantile edges with a t-digest instead of ranking
+                every customer. Defaults to True above APPROXIMATE_THRESHOLD customers.
+
+        Returns:
+            DataFrame with one row per customer: customer_id, recency_days,
+            frequency, monetary, r/f/m scores, rfm_score and segment.
+        """
+        customers = self._compact()
+        if customers.empty:
+            return pd.DataFrame(columns=[
+                "customer_id", "recency_days", "frequency", "monetary",
+                "r_score", "f_score", "m_score", "rfm_score", "segment",
+            ])
+        last = customers["last_order"]
+        reference = pd.Timestamp(as_of) if as_of is not None else last.max().normalize() + pd.Timedelta(days=1)
+        recency = (reference - last).dt.days.astype(np.int64)
+
+        if approximate is None:
+            approximate = len(customers) > APPROXIMATE_THRESHOLD
+        score = _approximate_scores if approximate else _exact_scores
+        r = score(recency, bins, reverse=True)
+        f = score(customers["frequency"], bins)
+        m = score(customers["monetary"], bins)
+
+        table = pd.DataFrame({
+            "customer_id": customers["customer_id"].to_numpy(),
+            "recency_days": recency.to_numpy(),
+            "frequency": customers["frequency"].to_numpy(),
+            "monetary": customers["monetary"].round(2).to_numpy(),
+            "r_score": r,
+            "f_score": f,
+            "m_score": m,
+        })
+        table["rfm_score"] = (
+            pd.Series(r).astype(str) + pd.Series(f).astype(str) + pd.Series(m).astype(str)
+        ).to_numpy()
+        # Segment rules are defined on a 1-5 scale.
+        table["segment"] = _segment(np.ceil(r * 5 / bins), np.ceil(f * 5 / bins), np.ceil(m * 5 / bins))
+        return table
+
+
+def _accumulate(orders: FrameInput, **kwargs: Any) -> RFMAccumulator:
+    acc = RFMAccumulator(**kwargs)
+    for chunk in iter_chunks(orders):
+        acc.add(chunk)
+    return acc
+
+
+def rfm_table(
+    orders: FrameInput,
+    as_of: Any = None,
+    bins: int = 5,
+    approximate: Optional[bool] = None,
+    **kwargs: Any,
+) -> pd.DataFrame:
+    """Per-customer RFM table from orders (a frame or chunks).
+
+    Keyword arguments are passed to `RFMAccumulator` (column names, excluded statuses).
+    """
+    return _accumulate(orders, **kwargs).table(as_of=as_of, bins=bins, approximate=approximate)
+
+
+def summarize_segments(table: pd.DataFrame) -> pd.DataFrame:
+    """Collapse a per-customer RFM table into one row per segment."""
+    summary = (
+        table.groupby("segment")
+        .agg(customer_count=("customer_id", "size"), avg_recency_days=("recency_days", "mean"),
+             avg_frequency=("frequency", "mean"), avg_monetary=("monetary", "mean"))
+        .reindex(list(SEGMENTS))
+        .dropna()
+        .reset_index()
+    )
+    summary["customer_count"] = summary["customer_count"].astype(np.int64)
+    summary["percentage"] = (summary["customer_count"] / max(len(table), 1) * 100).round(1)
+    return summary.round({"avg_recency_days": 1, "avg_frequency": 1, "avg_monetary": 2})
+
+
+def rfm_segments(
+    orders: FrameInput,
+    as_of: Any = None,
+    approximate: Optional[bool] = None,
+    currency: str = "USD",
+    **kwargs: Any,
+) -> List[CustomerSegment]:
+    """Compute the RFM segment summary as CustomerSegment rows.
+
+    Args:
+        orders: Orders with customer_id, date and total columns, as one frame or chunks.
+        as_of: Reference date for recency. Defaults to the latest order date.
+        approximate: Force approximate (True) or exact (False) quantile binning.
+        currency: Currency of the order totals.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    summary = summarize_segments(rfm_table(orders, as_of=as_of, approximate=approximate))
+    return [CustomerSegment(currency=currency, **row) for row in summary.to_dict("records")]
+
+
+def rfm_assignments(
+    orders: FrameInput,
+    segment: str = "",
+    as_of: Any = None,
+    approximate: Optional[bool] = None,
+    currency: str = "USD",
+    **kwargs: Any,
+) -> List[CustomerRFM]:
+    """Compute the per-customer RFM assignment table as CustomerRFM rows.
+
+    Args:
+        orders: Orders with customer_id, date and total columns, as one frame or chunks.
+        segment: Only return customers in this segment.
+        as_of: Reference date for recency. Defaults to the latest order date.
+        approximate: Force approximate (True) or exact (False) quantile binning.
+        currency: Currency of the order totals.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = rfm_table(orders, as_of=as_of, approximate=approximate)
+    if segment:
+        table = table[table["segment"] == segment]
+    return [CustomerRFM(currency=currency, **row) for row in table.to_dict("records")]
+
+
+def lifetime_value(
+    orders: FrameInput,
+    segment: str = "",
+    as_of: Any = None,
+    approximate: Optional[bool] = None,
+    currency: str = "USD",
+    **kwargs: Any,
+) -> List[CustomerLifetimeValue]:
+    """Compute CustomerLifetimeValue rows per RFM segment, plus an "All" row.
+
+    LTV is the customer's total spend so far; lifespan is the time between the
+    first and last order.
+
+    Args:
+        orders: Orders with customer_id, date and total columns, as one frame or chunks.
+        segment: Only return this segment ("All" for the whole customer base).
+        as_of: Reference date for recency when assigning segments.
+        approximate: Estimate quantiles with t-digests (True) or exactly (False).
+            Defaults to True above APPROXIMATE_THRESHOLD customers.
+        currency: Currency of the order totals.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    acc = _accumulate(orders)
+    customers = acc.customers()
+    if customers.empty:
+        return []
+    if approximate is None:
+        approximate = len(customers) > APPROXIMATE_THRESHOLD
+    table = acc.table(as_of=as_of, approximate=approximate)
+    frame = pd.DataFrame({
+        "segment": table["segment"].to_numpy(),
+        "ltv": customers["monetary"].to_numpy(),
+        "frequency": customers["frequency"].to_numpy(),
+        "lifespan": (customers["last_order"] - customers["first_order"]).dt.days.to_numpy(),
+    })
+    groups = [("All", frame)] + [(name, frame[frame["segment"] == name]) for name in SEGMENTS]
+    results = []
+    for name, group in groups:
+        if group.empty or (segment and name != segment):
+            continue
+        ltv = group["ltv"].to_numpy()
+        median = TDigest().add(ltv).quantile(0.5) if approximate else float(np.median(ltv))
+        results.append(CustomerLifetimeValue(
+            segment=name,
+            average_ltv=round(float(ltv.mean()), 2),
+            median_ltv=round(float(median), 2),
+            average_order_frequency=round(float(group["frequency"].mean()), 2),
+            average_order_value=round(float(ltv.sum() / group["frequency"].sum()), 2),
+            average_lifespan_days=int(round(group["lifespan"].mean())),
+            currency=currency,
+            customer_count=len(group),
+        ))
+    return results
@@ -0,0 +1,332 @@
+"""Review sentiment engine - lexicon scoring and per-SKU sentiment distributions.
+
+Reviews are scored offline with a rule-based lexicon scorer: every word's
+valence is looked up in one vectorized pass over the whole batch, flipped
+when one of the three words before it is a negation ("not good") and
+strengthened after an intensifier ("very good"). A review's word valences
+are summed and squashed into a compound score in [-1, 1], as VADER does.
+
+Scores are cached by a hash of the review text, so re-fetched reviews are
+never scored twice, and large backfills are split into batches that a
+`ProcessExecutor` scores in parallel. `SentimentAggregator` folds scored
+reviews into per (sku, marketplace) counts as they arrive, skipping reviews
+it has already counted.
+"""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.utils import hash_keys
+from openec_platform.models.products import ReviewSentiment
+
+if TYPE_CHECKING:
+    from openec_platform.core.executor import ProcessExecutor
+
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+NEGATION_SCALAR = -0.74
+INTENSIFIER_SCALAR = 1.3
+NORMALIZATION_ALPHA = 15.0
+NEGATION_WINDOW = 3
+
+LEXICON: Dict[str, float] = {
+    # positive
+    "amazing": 2.8, "awesome": 3.1, "beautiful": 2.9, "best": 3.2, "comfortable": 1.9, "durable": 1.8,
+    "easy": 1.9, "excellent": 3.2, "fantastic": 2.6, "fast": 1.3, "favorite": 2.0, "fine": 0.8,
+    "glad": 2.0, "good": 1.9, "great": 3.1, "happy": 2.7, "impressed": 2.1, "love": 3.2, "loved": 2.9,
+    "loves": 2.7, "nice": 1.8, "perfect": 2.7, "perfectly": 2.7, "pleased": 1.9, "quality": 1.0,
+    "recommend": 1.5, "recommended": 1.6, "reliable": 1.9, "satisfied": 1.8, "solid": 1.4, "sturdy": 1.5,
+    "super": 2.9, "well": 1.1, "wonderful": 2.7, "worth": 1.2,
+    # negative
+    "awful": -2.0, "bad": -2.5, "broke": -1.8, "broken": -2.1, "cheap": -0.9, "defective": -2.2,
+    "difficult": -1.5, "disappointed": -1.9, "disappointing": -2.2, "flimsy": -1.6, "garbage": -2.5,
+    "hate": -2.7, "horrible": -2.5, "junk": -2.2, "late": -1.0, "leaked": -1.5, "leaks": -1.5,
+    "mediocre": -1.0, "missing": -1.2, "poor": -2.1, "poorly": -2.1, "problem": -1.7, "refund": -1.0,
+    "return": -0.6, "returned": -1.1, "slow": -1.2, "stopped": -1.2, "terrible": -2.1, "useless": -1.8,
+    "waste": -1.8, "worse": -2.1, "worst": -3.1, "wrong": -2.1,
+}
+NEGATIONS = frozenset({
+    "not", "no", "never", "nothing", "neither", "nor", "without", "hardly", "barely",
+    "dont", "doesnt", "didnt", "isnt", "wasnt", "arent", "werent", "cant", "couldnt", "wont", "wouldnt",
+})
+INTENSIFIERS = frozenset({
+    "very", "really", "extremely", "so", "super", "totally", "absolutely", "incredibly", "highly", "too",
+})
+LABELS = ("positive", "neutral", "negative")
+
+_SEPARATOR = "\x01"
+_WORD_BYTES = bytes(
+    c if chr(c).islower() and c < 128 or c == 1 else c + 32 if chr(c).isupper() and c < 128 else 32
+    for c in range(256)
+)
+
+
+def score_texts(texts: Union[pd.Series, List[str]], lexicon: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Compound sentiment score in [-1, 1] for each text.
+
+    Args:
+        texts: Review texts.
+        lexicon: Word valences (roughly -4 to 4); defaults to `LEXICON`.
+
+    Returns:
+        Float array aligned with `texts`.
+    """
+    texts = pd.Series(texts, dtype=object).fillna("").astype(str).to_numpy(dtype=object)
+    if not len(texts):
+        return np.zeros(0)
+    lexicon = lexicon if lexicon is not None else LEXICON
+    # Tokenize the whole batch as one byte string: letters are lowercased, apostrophes
+    # dropped and everything else becomes a space; a separator token ends each review.
+    joined = f" {_SEPARATOR} ".join(texts).encode("utf-8").translate(_WORD_BYTES, b"'")
+    tokens = np.array(joined.split(), dtype=object)
+    boundary = tokens == _SEPARATOR.encode()
+    doc = np.cumsum(boundary)[~boundary]
+    codes, vocabulary = pd.factorize(tokens[~boundary])
+    if not len(codes):
+        return np.zeros(len(texts))
+    # Look up each distinct word once.
+    vocabulary = [w.decode() for w in vocabulary]
+    valence = np.array([lexicon.get(w, 0.0) for w in vocabulary])[codes]
+    negation = np.array([w in NEGATIONS for w in vocabulary])[codes]
+    intensifier = np.array([w in INTENSIFIERS for w in vocabulary])[codes]
+
+    # Modifiers only apply within the same review.
+    def before(flags: np.ndarray, k: int) -> np.ndarray:
+        shifted = np.zeros_like(flags)
+        shifted[k:] = flags[:-k] & (doc[k:] == doc[:-k])
+        return shifted
+
+    negated = np.zeros(len(codes), dtype=bool)
+    for k in range(1, NEGATION_WINDOW + 1):
+        negated |= before(negation, k)
+    valence = np.where(before(intensifier, 1), valence * INTENSIFIER_SCALAR, valence)
+    valence = np.where(negated, valence * NEGATION_SCALAR, valence)
+
+    totals = np.bincount(doc, weights=valence, minlength=len(texts))
+    return totals / np.sqrt(totals * totals + NORMALIZATION_ALPHA)
+
+
+def label_scores(scores: np.ndarray) -> np.ndarray:
+    """Map compound scores to "positive", "neutral" or "negative"."""
+    return np.select(
+        [scores >= POSITIVE_THRESHOLD, scores <= NEGATIVE_THRESHOLD], ["positive", "negative"], "neutral"
+    ).astype(object)
+
+
+def review_texts(reviews: pd.DataFrame) -> pd.Series:
+    """Title and body of each review as one text."""
+    title = reviews["title"].fillna("").astype(str) if "title" in reviews else ""
+    body = reviews["body"].fillna("").astype(str) if "body" in reviews else ""
+    return (title + ". " + body).astype(object)
+
+
+def _score_block(frame: pd.DataFrame) -> pd.DataFrame:
+    """Score one batch of texts; runs in worker processes for backfills."""
+    return pd.DataFrame({"score": score_texts(frame["text"])})
+
+
+class ScoreCache:
+    """Sentiment scores keyed by a 64-bit hash of the review text.
+
+    Scores live in flat arrays looked up a batch at a time. Once `max_entries`
+    is exceeded the oldest scores are dropped.
+    """
+
+    def __init__(self, max_entries: int = 5_000_000) -> None:
+        self.max_entries = max_entries
+        self._index = pd.Index(np.array([], dtype=np.uint64))
+        self._scores = np.array([], dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def lookup(self, hashes: np.ndarray) -> np.ndarray:
+        """Cached scores for `hashes`, NaN where missing."""
+        with self._lock:
+            positions = self._index.get_indexer(hashes)
+            scores = self._scores
+        found = np.full(len(hashes), np.nan)
+        hit = positions >= 0
+        found[hit] = scores[positions[hit]]
+        return found
+
+    def store(self, hashes: np.ndarray, scores: np.ndarray) -> None:
+        """Add scores for hashes not cached yet."""
+        with self._lock:
+            new = self._index.get_indexer(hashes) < 0
+            if not new.any():
+                return
+            hashes, first = np.unique(hashes[new], return_index=True)
+            index = self._index.append(pd.Index(hashes))
+            values = np.concatenate([self._scores, np.asarray(scores)[new][first].astype(np.float32)])
+            if len(index) > self.max_entries:
+                index, values = index[-self.max_entries:], values[-self.max_entries:]
+            self._index, self._scores = index, values
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the cache to an .npz file."""
+        with self._lock:
+            np.savez(path, hashes=self._index.to_numpy(dtype=np.uint64), scores=self._scores)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], max_entries: int = 5_000_000) -> "ScoreCache":
+        data = np.load(path, allow_pickle=False)
+        cache = cls(max_entries=max_entries)
+        cache._index = pd.Index(data["hashes"])
+        cache._scores = data["scores"]
+        return cache
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+_default_cache = ScoreCache()
+
+
+def score_reviews(
+    reviews: pd.DataFrame,
+    cache: Optional[ScoreCache] = None,
+    executor: Optional["ProcessExecutor"] = None,
+    batch_size: int = 50_000,
+) -> pd.DataFrame:
+    """Add score and sentiment columns to a frame of ProductReview rows.
+
+    Args:
+        reviews: Rows with title and body columns.
+        cache: Score cache; defaults to a process-wide cache.
+        executor: Process pool used to score uncached texts in parallel.
+        batch_size: Texts per batch when scoring in parallel.
+
+    Returns:
+        A copy of `reviews` with content_hash, score and sentiment columns.
+    """
+    cache = cache if cache is not None else _default_cache
+    texts = review_texts(reviews)
+    hashes = hash_keys(texts)
+    scores = cache.lookup(hashes)
+
+    missing = np.isnan(scores)
+    if missing.any():
+        todo_hashes, first = np.unique(hashes[missing], return_index=True)
+        todo = pd.DataFrame({"text": texts.to_numpy()[missing][first]})
+        blocks = [todo.iloc[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+        if executor is not None and len(blocks) > 1:
+            results = executor.map_frames(_score_block, blocks)
+        else:
+            results = [_score_block(b) for b in blocks]
+        fresh = pd.concat(results, ignore_index=True)["score"].to_numpy()
+        cache.store(todo_hashes, fresh)
+        scores[missing] = fresh[np.searchsorted(todo_hashes, hashes[missing])]
+
+    return reviews.assign(content_hash=hashes, score=scores, sentiment=label_scores(scores))
+
+
+class SentimentAggregator:
+    """Per (sku, marketplace) sentiment counts, updated as reviews arrive.
+
+    A review is identified by its sku, marketplace, date and text, so
+    overlapping fetches are counted once.
+    """
+
+    _COLUMNS = ["review_count", "positive", "neutral", "negative", "score_sum", "rating_sum"]
+
+    def __init__(self) -> None:
+        self._totals = pd.DataFrame(
+            columns=self._COLUMNS, index=pd.MultiIndex.from_tuples([], names=["sku", "marketplace"]), dtype=float
+        )
+        self._seen = pd.Index(np.array([], dtype=np.uint64))
+        self._lock = threading.Lock()
+
+    def update(self, scored: pd.DataFrame) -> int:
+        """Fold reviews scored by `score_reviews` into the totals.
+
+        Returns:
+            Number of reviews not seen before.
+        """
+        if scored.empty:
+            return 0
+        keys = pd.DataFrame({
+            "sku": scored["sku"].astype(str).to_numpy(dtype=object),
+            "marketplace": scored["marketplace"].fillna("").astype(str).to_numpy(dtype=object)
+            if "marketplace" in scored else "",
+            "date": scored["date"].astype(str).to_numpy(dtype=object),
+            "content_hash": scored["content_hash"].to_numpy(),
+        })
+        review_ids = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+        with self._lock:
+            new = (self._seen.get_indexer(review_ids) < 0) & ~pd.Series(review_ids).duplicated().to_numpy()
+            if not new.any():
+                return 0
+            self._seen = self._seen.append(pd.Index(review_ids[new]))
+            fresh = scored[new]
+            labels = fresh["sentiment"].to_numpy()
+            rating = pd.to_numeric(fresh["rating"], errors="coerce") if "rating" in fresh else 0.0
+            batch = pd.DataFrame({
+                "sku": keys["sku"].to_numpy()[new],
+                "marketplace": keys["marketplace"].to_numpy()[new],
+                "review_count": 1.0,
+                "positive": (labels == "positive").astype(float),
+                "neutral": (labels == "neutral").astype(float),
+                "negative": (labels == "negative").astype(float),
+                "score_sum": fresh["score"].to_numpy(dtype=float),
+                "rating_sum": np.nan_to_num(np.asarray(rating, dtype=float)),
+            }).groupby(["sku", "marketplace"]).sum()
+            self._totals = batch if self._totals.empty else self._totals.add(batch, fill_value=0.0)
+            return int(new.sum())
+
+    def distributions(self, sku: str = "", marketplace: str = "") -> pd.DataFrame:
+        """Sentiment distribution per (sku, marketplace), optionally filtered."""
+        with self._lock:
+            totals = self._totals.reset_index()
+        if sku:
+            totals = totals[totals["sku"] == sku]
+        if marketplace:
+            totals = totals[totals["marketplace"] == marketplace]
+        count = totals["review_count"].clip(lower=1)
+        return pd.DataFrame({
+            "sku": totals["sku"],
+            "marketplace": totals["marketplace"],
+            "review_count": totals["review_count"].astype(int),
+            "positive": totals["positive"].astype(int),
+            "neutral": totals["neutral"].astype(int),
+            "negative": totals["negative"].astype(int),
+            "positive_share": (totals["positive"] / count).round(4),
+            "negative_share": (totals["negative"] / count).round(4),
+            "average_score": (totals["score_sum"] / count).round(4),
+            "average_rating": (totals["rating_sum"] / count).round(2),
+        }).sort_values(["sku", "marketplace"]).reset_index(drop=True)
+
+
+_default_aggregator = SentimentAggregator()
+
+
+def review_sentiment(
+    reviews: pd.DataFrame,
+    sku: str = "",
+    marketplace: str = "",
+    aggregator: Optional[SentimentAggregator] = None,
+    cache: Optional[ScoreCache] = None,
+    executor: Optional["ProcessExecutor"] = None,
+    **kwargs: Any,
+) -> List[ReviewSentiment]:
+    """Compute ReviewSentiment rows from ProductReview data.
+
+    Args:
+        reviews: Rows with date, sku, marketplace, rating, title and body.
+        sku: Only report this SKU.
+        marketplace: Only report this marketplace.
+        aggregator: Running per-SKU totals; defaults to a process-wide one, so
+            the distributions cover every review seen so far.
+        cache: Score cache; defaults to a process-wide cache.
+        executor: Process pool for scoring large batches.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    aggregator = aggregator if aggregator is not None else _default_aggregator
+    if not reviews.empty:
+        aggregator.update(score_reviews(reviews, cache=cache, executor=executor))
+    table = aggregator.distributions(sku=sku, marketplace=marketplace)
+    return [ReviewSentiment(**row) for row in table.to_dict("records")]
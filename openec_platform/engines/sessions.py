@@ -0,0 +1,266 @@
+"""Sessionization engine - funnels and traffic metrics from raw clickstream events.
+
+Events are grouped into sessions per user: a session ends after
+`timeout_minutes` without activity. From the sessions the engine computes
+
+    an ordered funnel (FunnelConversion): how many users reached each stage,
+        counting a stage only if the earlier stages happened before it in the
+        same session;
+    per-source traffic (TrafficSource): sessions, users, bounce rate, pages
+        per session, average duration, conversions and revenue, attributed to
+        the source of each session's first event.
+
+Each chunk is processed with sorting, prefix sums and segment reductions over
+NumPy arrays. Only per-day aggregates are kept between chunks, so a stream of
+user-ordered chunks is handled in a single pass with bounded memory.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.utils import FrameInput, hash_keys, iter_complete_groups
+from openec_platform.models.analytics import FunnelConversion, TrafficSource
+
+# Stages after the session start ("visit"), in funnel order.
+FUNNEL_STAGES = ("product_view", "add_to_cart", "checkout", "purchase")
+
+# Events counted as page views for pages per session.
+PAGE_EVENTS = ("page_view", "product_view")
+
+_NOT_REACHED = np.iinfo(np.int64).max
+
+
+class SessionAccumulator:
+    """Incremental sessionization over chunks of clickstream events.
+
+    Usage:
+        acc = SessionAccumulator(timeout_minutes=30)
+        for chunk in iter_complete_groups(pd.read_csv("events.csv", chunksize=5_000_000), "user_id"):
+            acc.add(chunk)
+        funnel, traffic = acc.funnel(), acc.traffic()
+
+    Each chunk passed to `add()` must hold all events of its users.
+    """
+
+    def __init__(
+        self,
+        timeout_minutes: float = 30,
+        stages: Sequence[str] = FUNNEL_STAGES,
+        user_col: str = "user_id",
+        time_col: str = "timestamp",
+        event_col: str = "event",
+        source_col: str = "source",
+        value_col: str = "revenue",
+        marketplace_col: str = "marketplace",
+    ) -> None:
+        """Initialize the accumulator.
+
+        Args:
+            timeout_minutes: Inactivity gap that ends a session.
+            stages: Funnel stages after the visit, as event names in order.
+            user_col: Column holding the user identifier.
+            time_col: Column holding the event timestamp.
+            event_col: Column holding the event name.
+            source_col: Column holding the traffic source.
+            value_col: Column holding the purchase value.
+            marketplace_col: Column holding the marketplace, if any.
+        """
+        self.timeout = int(pd.Timedelta(minutes=timeout_minutes).value)
+        self.stages = ("visit",) + tuple(stages)
+        self.user_col = user_col
+        self.time_col = time_col
+        self.event_col = event_col
+        self.source_col = source_col
+        self.value_col = value_col
+        self.marketplace_col = marketplace_col
+        self._funnel: List[pd.Series] = []
+        self._traffic: List[pd.DataFrame] = []
+
+    def _column(self, events: pd.DataFrame, name: str, default: Any, rows: np.ndarray) -> np.ndarray:
+        if name not in events:
+            return np.full(len(rows), default, dtype=object)
+        return events[name].iloc[rows].fillna(default).to_numpy(dtype=object)
+
+    def add(self, events: pd.DataFrame) -> None:
+        """Sessionize a chunk of events holding complete users."""
+        events = events[events[self.user_col].notna()]
+        if events.empty:
+            return
+        user = hash_keys(events[self.user_col])
+        ts = pd.to_datetime(events[self.time_col], format="ISO8601").to_numpy(dtype="datetime64[ns]").view(np.int64)
+        order = np.lexsort((ts, user))
+        user, ts = user[order], ts[order]
+        # Classify the few distinct event names once, then index by code.
+        codes, names = pd.factorize(events[self.event_col])
+        names = names.astype(str)
+        codes = codes[order]
+        n = len(ts)
+
+        starts_mask = np.ones(n, dtype=bool)
+        starts_mask[1:] = (user[1:] != user[:-1]) | (ts[1:] - ts[:-1] > self.timeout)
+        starts = np.flatnonzero(starts_mask)
+        sid = np.cumsum(starts_mask) - 1
+        ends = np.append(starts[1:], n) - 1
+
+        levels = {name: level for level, name in enumerate(self.stages) if level}
+        stage = np.array([levels.get(name, 0) for name in names], dtype=np.int64)[codes]
+        is_page = np.isin(names, PAGE_EVENTS)[codes]
+        is_purchase = (names == "purchase")[codes]
+        values = (
+            pd.to_numeric(events[self.value_col], errors="coerce").fillna(0.0).to_numpy()[order]
+            if self.value_col in events else np.zeros(n)
+        )
+
+        sessions = pd.DataFrame({
+            "date": ts[starts].astype("datetime64[ns]").astype("datetime64[D]"),
+            "user": user[starts],
+            "source": self._column(events, self.source_col, "direct", order[starts]),
+            "marketplace": self._column(events, self.marketplace_col, "", order[starts]),
+            "level": self._funnel_levels(ts, sid, starts, stage),
+            "events": np.diff(np.append(starts, n)),
+            "pages": np.add.reduceat(is_page.astype(np.int64), starts),
+            "duration": (ts[ends] - ts[starts]) / 1e9,
+            "conversions": np.add.reduceat(is_purchase.astype(np.int64), starts) > 0,
+            "revenue": np.add.reduceat(values, starts),
+        })
+        self._add_funnel(sessions)
+        self._add_traffic(sessions)
+
+    def _funnel_levels(self, ts: np.ndarray, sid: np.ndarray, starts: np.ndarray, stage: np.ndarray) -> np.ndarray:
+        """Deepest funnel stage each session reached in order."""
+        level = np.zeros(len(starts), dtype=np.int64)
+        reached = ts[starts].copy()
+        for s in range(1, len(self.stages)):
+            candidates = np.flatnonzero((stage == s) & (ts >= reached[sid]))
+            # Events are sorted by time within a session: keep each session's first candidate.
+            owners = sid[candidates]
+            first = candidates[np.r_[True, owners[1:] != owners[:-1]]] if len(candidates) else candidates
+            reached_now = np.full(len(starts), _NOT_REACHED, dtype=np.int64)
+            reached_now[sid[first]] = ts[first]
+            level[sid[first]] = s
+            reached = reached_now
+        return level
+
+    def _add_funnel(self, sessions: pd.DataFrame) -> None:
+        # A user counts once per day, at the deepest stage of any of their sessions.
+        deepest = sessions.groupby(["date", "marketplace", "user"], sort=False)["level"].max()
+        counts = deepest.groupby(level=["date", "marketplace"]).value_counts().unstack(fill_value=0)
+        counts = counts.reindex(columns=range(len(self.stages)), fill_value=0)
+        at_least = counts.iloc[:, ::-1].cumsum(axis=1).iloc[:, ::-1]
+        self._funnel.append(at_least.stack())
+        if len(self._funnel) > 16:
+            self._funnel = [pd.concat(self._funnel).groupby(level=[0, 1, 2]).sum()]
+
+    def _add_traffic(self, sessions: pd.DataFrame) -> None:
+        traffic = sessions.assign(bounces=sessions["events"] == 1).groupby(["date", "source"]).agg(
+            sessions=("user", "size"), users=("user", "nunique"), bounces=("bounces", "sum"),
+            pages=("pages", "sum"), duration=("duration", "sum"), conversions=("conversions", "sum"),
+            revenue=("revenue", "sum"),
+        )
+        self._traffic.append(traffic)
+        if len(self._traffic) > 16:
+            self._traffic = [pd.concat(self._traffic).groupby(level=[0, 1]).sum()]
+
+    def funnel(self) -> pd.DataFrame:
+        """Users reaching each stage per date and marketplace.
+
+        Returns:
+            DataFrame with date, marketplace, stage, users, conversion_rate (from
+            the previous stage, percent) and drop_off_rate (percent).
+        """
+        columns = ["date", "marketplace", "stage", "users", "conversion_rate", "drop_off_rate"]
+        if not self._funnel:
+            return pd.DataFrame(columns=columns)
+        wide = pd.concat(self._funnel).groupby(level=[0, 1, 2]).sum().unstack(fill_value=0).sort_index()
+        users = wide.to_numpy()
+        previous = np.concatenate([users[:, :1], users[:, :-1]], axis=1)
+        rate = np.divide(users * 100.0, previous, out=np.zeros(users.shape), where=previous > 0)
+        table = pd.DataFrame({
+            "date": np.repeat(pd.to_datetime(wide.index.get_level_values(0)).date, len(self.stages)),
+            "marketplace": np.repeat(wide.index.get_level_values(1).to_numpy(), len(self.stages)),
+            "stage": np.tile(np.array(self.stages, dtype=object), len(wide)),
+            "users": users.ravel(),
+            "conversion_rate": rate.ravel().round(1),
+        })
+        table["drop_off_rate"] = (100.0 - table["conversion_rate"]).where(previous.ravel() > 0, 0.0).round(1)
+        return table[columns]
+
+    def traffic(self) -> pd.DataFrame:
+        """Session metrics per date and traffic source.
+
+        Returns:
+            DataFrame with date, source, sessions, users, bounce_rate (percent),
+            pages_per_session, avg_session_duration (seconds), conversions and revenue.
+        """
+        columns = ["date", "source", "sessions", "users", "bounce_rate", "pages_per_session",
+                   "avg_session_duration", "conversions", "revenue"]
+        if not self._traffic:
+            return pd.DataFrame(columns=columns)
+        totals = pd.concat(self._traffic).groupby(level=[0, 1]).sum().reset_index()
+        sessions = totals["sessions"].to_numpy()
+        return pd.DataFrame({
+            "date": pd.to_datetime(totals["date"]).dt.date,
+            "source": totals["source"].astype(str),
+            "sessions": sessions,
+            "users": totals["users"].to_numpy(),
+            "bounce_rate": (totals["bounces"] / sessions * 100).round(1),
+            "pages_per_session": (totals["pages"] / sessions).round(2),
+            "avg_session_duration": (totals["duration"] / sessions).round(1),
+            "conversions": totals["conversions"].astype(np.int64),
+            "revenue": totals["revenue"].round(2),
+        })[columns]
+
+
+def sessionize(events: FrameInput, **kwargs: Any) -> SessionAccumulator:
+    """Run a frame or a user-ordered stream of chunks through a SessionAccumulator.
+
+    Keyword arguments are passed to `SessionAccumulator`.
+    """
+    acc = SessionAccumulator(**kwargs)
+    for chunk in iter_complete_groups(events, acc.user_col):
+        acc.add(chunk)
+    return acc
+
+
+def funnel_conversion(
+    events: FrameInput,
+    timeout_minutes: float = 30,
+    marketplace: str = "",
+    **kwargs: Any,
+) -> List[FunnelConversion]:
+    """Compute FunnelConversion rows from clickstream events.
+
+    Args:
+        events: Events with user_id, timestamp, event and optionally source,
+            revenue and marketplace columns, as one frame or user-ordered chunks.
+        timeout_minutes: Inactivity gap that ends a session.
+        marketplace: Only return this marketplace.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = sessionize(events, timeout_minutes=timeout_minutes).funnel()
+    if marketplace:
+        table = table[table["marketplace"] == marketplace]
+    return [FunnelConversion(**row) for row in table.to_dict("records")]
+
+
+def traffic_sources(
+    events: FrameInput,
+    timeout_minutes: float = 30,
+    currency: str = "USD",
+    **kwargs: Any,
+) -> List[TrafficSource]:
+    """Compute TrafficSource rows from clickstream events.
+
+    Args:
+        events: Events with user_id, timestamp, event and source columns, as one
+            frame or user-ordered chunks.
+        timeout_minutes: Inactivity gap that ends a session.
+        currency: Currency of the purchase values.
+        **kwargs: Ignored; allows passing command parameters through.
+    """
+    table = sessionize(events, timeout_minutes=timeout_minutes).traffic()
+    return [TrafficSource(currency=currency, **row) for row in table.to_dict("records")]
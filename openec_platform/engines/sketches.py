@@ -0,0 +1,348 @@
+"""Mergeable sketches for distinct counts and quantiles over large populations.
+
+HyperLogLog estimates the number of distinct values (e.g. customers) in a few
+kilobytes; t-digest estimates quantiles (e.g. median order value or LTV) from
+a few hundred centroids. Both merge losslessly with sketches of the same kind,
+so a sketch per partition can be rolled up over any window instead of
+rescanning the raw data.
+
+SketchStore keeps one sketch per (metric, day, marketplace) partition:
+
+    store = SketchStore("sketches/")
+    store.update("customers", orders, "customer_id", kind="hll")
+    store.update("order_value", orders, "total", kind="tdigest")
+    store.rollup("customers", start=date(2025, 1, 1), end=date(2025, 3, 31)).count()
+    store.rollup("order_value", marketplaces=["amazon"]).quantile(0.5)
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.engines.utils import hash_keys
+
+Partition = Tuple[date, str]
+
+
+def _leading_zeros(x: np.ndarray) -> np.ndarray:
+    """Count leading zero bits of unsigned 64-bit integers."""
+    n = np.zeros(len(x), dtype=np.int64)
+    y = x.astype(np.uint64, copy=True)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (y >> np.uint64(64 - shift)) == 0
+        n += empty * shift
+        y = np.where(empty, y << np.uint64(shift), y)
+    return n + ((y >> np.uint64(63)) == 0)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**precision registers.
+
+    The standard error is about 1.04 / sqrt(2**precision): 0.8% at the default
+    precision of 14, using 16 KB.
+    """
+
+    kind = "hll"
+
+    def __init__(self, precision: int = 14) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values: Union[pd.Series, np.ndarray, Iterable]) -> "HyperLogLog":
+        """Add values (hashed with `hash_keys`)."""
+        values = values if isinstance(values, (pd.Series, np.ndarray)) else np.asarray(list(values), dtype=object)
+        return self.add_hashes(hash_keys(values))
+
+    def add_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        """Add pre-computed 64-bit hashes."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return self
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Merge another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        """Estimated number of distinct values added."""
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting.
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+    def copy(self) -> "HyperLogLog":
+        sketch = HyperLogLog(self.precision)
+        sketch.registers[:] = self.registers
+        return sketch
+
+    def to_bytes(self) -> bytes:
+        return struct.pack("<B", self.precision) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls(struct.unpack_from("<B", data)[0])
+        sketch.registers[:] = np.frombuffer(data, dtype=np.uint8, offset=1)
+        return sketch
+
+
+class TDigest:
+    """Merging t-digest for approximate quantiles.
+
+    Values are buffered and periodically merged into at most about
+    `compression` centroids, sized so that the tails stay precise. Compression
+    is a sort followed by segment sums, so adding large arrays is cheap.
+    """
+
+    kind = "tdigest"
+
+    def __init__(self, compression: float = 200, buffer_size: int = 50_000) -> None:
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._buffered = 0
+
+    @property
+    def total(self) -> float:
+        return float(self.weights.sum()) + sum(float(w.sum()) for _, w in self._buffer)
+
+    def add(self, values: Union[pd.Series, np.ndarray, Iterable[float]]) -> "TDigest":
+        """Add values with weight one; NaNs are ignored."""
+        values = np.asarray(values, dtype=float)
+        return self._push(values[~np.isnan(values)], None)
+
+    def _push(self, means: np.ndarray, weights: Optional[np.ndarray]) -> "TDigest":
+        if not len(means):
+            return self
+        self.min = min(self.min, float(means.min()))
+        self.max = max(self.max, float(means.max()))
+        self._buffer.append((means, np.ones(len(means)) if weights is None else weights))
+        self._buffered += len(means)
+        if self._buffered >= self.buffer_size:
+            self._compress()
+        return self
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [m for m, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [w for _, w in self._buffer])
+        self._buffer, self._buffered = [], 0
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        # k1 scale function: centroids are small near q=0 and q=1, large in the middle.
+        q = (cumulative - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q - 1)
+        bucket = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Merge another digest into this one."""
+        other._compress()
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._buffer.append((other.means.copy(), other.weights.copy()))
+            self._buffered += len(other.means)
+            if self._buffered >= self.buffer_size:
+                self._compress()
+        return self
+
+    def quantile(self, q: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Estimated value at quantile(s) `q` in [0, 1]; NaN if the digest is empty."""
+        self._compress()
+        scalar = np.ndim(q) == 0
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if not len(self.means):
+            result = np.full(len(q), np.nan)
+        else:
+            total = self.weights.sum()
+            centers = np.cumsum(self.weights) - self.weights / 2
+            xs = np.concatenate([[0.0], centers, [total]])
+            ys = np.concatenate([[self.min], self.means, [self.max]])
+            result = np.interp(np.clip(q, 0, 1) * total, xs, ys)
+        return float(result[0]) if scalar else result
+
+    def count(self) -> float:
+        """Total weight (number of values) added."""
+        return self.total
+
+    def copy(self) -> "TDigest":
+        self._compress()
+        sketch = TDigest(self.compression, self.buffer_size)
+        sketch.means, sketch.weights = self.means.copy(), self.weights.copy()
+        sketch.min, sketch.max = self.min, self.max
+        return sketch
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        header = struct.pack("<dddI", self.compression, self.min, self.max, len(self.means))
+        return header + self.means.tobytes() + self.weights.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        compression, low, high, n = struct.unpack_from("<dddI", data)
+        offset = struct.calcsize("<dddI")
+        sketch = cls(compression)
+        sketch.means = np.frombuffer(data, dtype=float, count=n, offset=offset).copy()
+        sketch.weights = np.frombuffer(data, dtype=float, count=n, offset=offset + 8 * n).copy()
+        sketch.min, sketch.max = low, high
+        return sketch
+
+
+Sketch = Union[HyperLogLog, TDigest]
+SKETCH_TYPES = {"hll": HyperLogLog, "tdigest": TDigest}
+# File name of the "" marketplace; `quote` never produces a bare "%".
+_NO_MARKETPLACE = "%"
+
+
+def _file_name(marketplace: str) -> str:
+    """Reversible file name for a marketplace."""
+    return quote(marketplace, safe="") if marketplace else _NO_MARKETPLACE
+
+
+def _marketplace(name: str) -> str:
+    return "" if name == _NO_MARKETPLACE else unquote(name)
+
+
+class SketchStore:
+    """Sketches stored per (metric, day, marketplace) partition.
+
+    Incremental syncs update only the partitions their rows fall into, and
+    rollups over any window merge the stored sketches. When `directory` is
+    given, each partition is persisted as its own file:
+    <directory>/<metric>/<day>/<marketplace>.<kind>, with the marketplace
+    percent-encoded ("%" for no marketplace).
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None) -> None:
+        self.directory = Path(directory) if directory else None
+        self._sketches: Dict[str, Dict[Partition, Sketch]] = {}
+        self._lock = threading.Lock()
+        if self.directory is not None and self.directory.exists():
+            self._load()
+
+    def _load(self) -> None:
+        for path in self.directory.glob("*/*/*.*"):
+            metric, day = path.parent.parent.name, date.fromisoformat(path.parent.name)
+            name, kind = path.name.rsplit(".", 1)
+            if kind in SKETCH_TYPES:
+                sketch = SKETCH_TYPES[kind].from_bytes(path.read_bytes())
+                self._sketches.setdefault(metric, {})[(day, _marketplace(name))] = sketch
+
+    def _save(self, metric: str, partition: Partition, sketch: Sketch) -> None:
+        if self.directory is None:
+            return
+        folder = self.directory / metric / partition[0].isoformat()
+        folder.mkdir(parents=True, exist_ok=True)
+        name = _file_name(partition[1])
+        tmp = folder / f"{name}.{sketch.kind}.tmp"
+        tmp.write_bytes(sketch.to_bytes())
+        tmp.replace(folder / f"{name}.{sketch.kind}")
+
+    def update(
+        self,
+        metric: str,
+        frame: pd.DataFrame,
+        value_col: str,
+        kind: str = "hll",
+        date_col: str = "date",
+        partition_col: str = "marketplace",
+    ) -> List[Partition]:
+        """Fold rows into the sketches of the partitions they fall into.
+
+        Args:
+            metric: Name of the sketched metric, e.g. "customers".
+            frame: Rows to add.
+            value_col: Column to sketch: identifiers for "hll", numbers for "tdigest".
+            kind: "hll" for distinct counts, "tdigest" for quantiles.
+            date_col: Column holding the row timestamp; rows are partitioned by day.
+            partition_col: Column holding the marketplace, if any.
+
+        Returns:
+            The partitions that were updated.
+        """
+        if kind not in SKETCH_TYPES:
+            raise ValueError(f"Unknown sketch kind '{kind}'. Choose from: {', '.join(SKETCH_TYPES)}")
+        if frame.empty:
+            return []
+        days = pd.to_datetime(frame[date_col], format="ISO8601").dt.date
+        if partition_col in frame:
+            markets = frame[partition_col].fillna("").astype(str)
+        else:
+            markets = pd.Series("", index=frame.index)
+        if kind == "hll":
+            values = hash_keys(frame[value_col])
+        else:
+            values = pd.to_numeric(frame[value_col], errors="coerce").to_numpy()
+        updated = []
+        for (day, market), rows in pd.Series(np.arange(len(frame))).groupby([days.to_numpy(), markets.to_numpy()]):
+            partition = (day, market)
+            with self._lock:
+                sketch = self._sketches.setdefault(metric, {}).get(partition)
+                if sketch is None:
+                    sketch = self._sketches[metric][partition] = SKETCH_TYPES[kind]()
+                if kind == "hll":
+                    sketch.add_hashes(values[rows.to_numpy()])
+                else:
+                    sketch.add(values[rows.to_numpy()])
+                self._save(metric, partition, sketch)
+            updated.append(partition)
+        return updated
+
+    def partitions(self, metric: str) -> List[Partition]:
+        return sorted(self._sketches.get(metric, {}))
+
+    def get(self, metric: str, day: date, marketplace: str = "") -> Optional[Sketch]:
+        return self._sketches.get(metric, {}).get((day, marketplace))
+
+    def rollup(
+        self,
+        metric: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        marketplaces: Optional[Iterable[str]] = None,
+    ) -> Optional[Sketch]:
+        """Merge the stored sketches of a metric over a window of days and marketplaces.
+
+        Returns:
+            A new sketch, or None if no partition matches.
+        """
+        wanted = set(marketplaces) if marketplaces is not None else None
+        merged = None
+        with self._lock:
+            for (day, market), sketch in self._sketches.get(metric, {}).items():
+                if (start and day < start) or (end and day > end) or (wanted is not None and market not in wanted):
+                    continue
+                merged = sketch.copy() if merged is None else merged.merge(sketch)
+        return merged
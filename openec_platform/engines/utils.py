@@ -0,0 +1,67 @@
+"""Shared helpers for the analytics engines."""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+FrameInput = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+
+def iter_chunks(data: FrameInput) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks from a single frame or an iterable of frames.
+
+    Accepts anything producing DataFrames, e.g. `pd.read_csv(path, chunksize=...)`.
+    """
+    if isinstance(data, pd.DataFrame):
+        yield data
+        return
+    for chunk in data:
+        yield chunk if isinstance(chunk, pd.DataFrame) else pd.DataFrame(chunk)
+
+
+def iter_complete_groups(data: FrameInput, key_col: str) -> Iterator[pd.DataFrame]:
+    """Re-chunk a stream grouped by `key_col` so that no key is split across chunks.
+
+    The input must be contiguous by key (e.g. an export sorted by user). The
+    rows of the last key in each chunk are held back and prepended to the next
+    chunk, so every yielded frame holds complete groups. A single DataFrame
+    is yielded whole and need not be sorted.
+    """
+    if isinstance(data, pd.DataFrame):
+        yield data
+        return
+    carry = None
+    for chunk in iter_chunks(data):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        keys = chunk[key_col].to_numpy()
+        tail = len(keys)
+        while tail > 0 and keys[tail - 1] == keys[-1]:
+            tail -= 1
+        carry = chunk.iloc[tail:]
+        if tail:
+            yield chunk.iloc[:tail]
+    if carry is not None and len(carry):
+        yield carry
+
+
+def hash_keys(values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+    """Map identifiers to stable 64-bit hashes for compact integer group-bys.
+
+    Hashes are consistent across chunks and processes, so partial aggregates
+    keyed by them can be merged.
+    """
+    array = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if array.dtype.kind in "iub":
+        return pd.util.hash_array(array)
+    array = array.astype(object)
+    try:
+        return pd.util.hash_array(array, categorize=False)
+    except TypeError:
+        # Mixed types (e.g. ints and strings): hash their string form.
+        return pd.util.hash_array(array.astype(str).astype(object), categorize=False)
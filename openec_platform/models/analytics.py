@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from openec_platform.core.provider_interface import StandardModel
 
@@ -11,6 +11,8 @@ from openec_platform.core.provider_interface import StandardModel
 class FunnelConversion(StandardModel):
     """Conversion funnel data."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "stage", "marketplace")
+
     date: date
     stage: str  # visit, product_view, add_to_cart, checkout, purchase
     users: int = 0
@@ -22,6 +24,9 @@ class FunnelConversion(StandardModel):
 class TrafficSource(StandardModel):
     """Traffic source breakdown."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "source")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("revenue",)
+
     date: date
     source: str  # organic, paid, direct, social, email, referral
     sessions: int = 0
@@ -37,6 +42,9 @@ class TrafficSource(StandardModel):
 class CategoryPerformance(StandardModel):
     """Performance metrics by product category."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "category", "subcategory")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("revenue", "average_price")
+
     date: date
     category: str
     subcategory: str = ""
@@ -47,3 +55,24 @@ class CategoryPerformance(StandardModel):
     average_price: float = 0.0
     currency: str = "USD"
     market_share: float = 0.0
+
+
+class MetricAnomaly(StandardModel):
+    """A metric value far from its series' baseline."""
+
+    date: date
+    metric: str
+    value: float = 0.0
+    expected: float = 0.0
+    score: float = 0.0  # robust z-score, positive for spikes
+    method: str = ""  # robust, ewma, seasonal
+    direction: str = ""  # up, down
+    severity: str = ""  # warning, critical
+
+
+class TrafficAnomaly(MetricAnomaly):
+    """Anomaly in a traffic source's metrics."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "metric", "source")
+
+    source: str = ""
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from openec_platform.core.provider_interface import StandardModel
 
@@ -11,6 +11,9 @@ from openec_platform.core.provider_interface import StandardModel
 class CustomerCohort(StandardModel):
     """Customer cohort retention analysis."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("cohort_date", "period")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("revenue",)
+
     cohort_date: date
     period: int = 0  # months since acquisition
     cohort_size: int = 0
@@ -23,6 +26,9 @@ class CustomerCohort(StandardModel):
 class CustomerLifetimeValue(StandardModel):
     """Customer lifetime value metrics."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("segment",)
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("average_ltv", "median_ltv", "average_order_value")
+
     segment: str = ""
     average_ltv: float = 0.0
     median_ltv: float = 0.0
@@ -36,6 +42,9 @@ class CustomerLifetimeValue(StandardModel):
 class CustomerSegment(StandardModel):
     """Customer segmentation data (RFM or custom)."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("segment",)
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("avg_monetary",)
+
     segment: str
     customer_count: int = 0
     percentage: float = 0.0
@@ -45,9 +54,30 @@ class CustomerSegment(StandardModel):
     currency: str = "USD"
 
 
+class CustomerRFM(StandardModel):
+    """Per-customer RFM scores and segment assignment."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("customer_id",)
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("monetary",)
+
+    customer_id: str
+    recency_days: int = 0
+    frequency: int = 0
+    monetary: float = 0.0
+    r_score: int = 0
+    f_score: int = 0
+    m_score: int = 0
+    rfm_score: str = ""
+    segment: str = ""
+    currency: str = "USD"
+
+
 class CustomerAcquisition(StandardModel):
     """Customer acquisition metrics by channel."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "channel")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("cost", "cac")
+
     date: date
     channel: str = ""
     new_customers: int = 0
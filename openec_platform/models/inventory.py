@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from openec_platform.core.provider_interface import StandardModel
 
@@ -11,6 +11,8 @@ from openec_platform.core.provider_interface import StandardModel
 class InventoryLevel(StandardModel):
     """Current inventory snapshot."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("sku", "warehouse")
+
     sku: str
     name: str = ""
     quantity: int = 0
@@ -21,9 +23,29 @@ class InventoryLevel(StandardModel):
     last_updated: Optional[datetime] = None
 
 
+class StockoutRisk(StandardModel):
+    """Simulated stockout risk and recommended reorder point for a SKU in a warehouse."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("sku", "warehouse")
+
+    sku: str
+    name: str = ""
+    warehouse: str = ""
+    quantity: int = 0
+    status: str = "ok"  # ok, reorder, critical, out_of_stock
+    stockout_probability: float = 0.0  # within the lead time
+    expected_days_of_supply: float = 0.0
+    reorder_point: int = 0
+    safety_stock: int = 0
+    lead_time_days: float = 0.0
+    lead_time_demand: float = 0.0  # mean units sold over the lead time
+
+
 class DemandForecast(StandardModel):
     """Demand forecasting data."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "sku", "category")
+
     date: date
     sku: str = ""
     category: str = ""
@@ -37,6 +59,8 @@ class DemandForecast(StandardModel):
 class StockMovement(StandardModel):
     """Stock movement / turnover data."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "sku")
+
     date: date
     sku: str
     name: str = ""
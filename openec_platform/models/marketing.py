@@ -3,14 +3,18 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from openec_platform.core.provider_interface import StandardModel
+from openec_platform.models.analytics import MetricAnomaly
 
 
 class CampaignPerformance(StandardModel):
     """Marketing campaign performance metrics."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "campaign_id", "channel")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("spend", "revenue", "cpc", "cpa")
+
     date: date
     campaign_id: str = ""
     campaign_name: str = ""
@@ -30,19 +34,28 @@ class CampaignPerformance(StandardModel):
 class ChannelAttribution(StandardModel):
     """Marketing channel attribution data."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "channel")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("revenue",)
+
     date: date
     channel: str
     first_touch_conversions: int = 0
     last_touch_conversions: int = 0
     linear_conversions: float = 0.0
-    revenue: float = 0.0
+    time_decay_conversions: float = 0.0
+    position_based_conversions: float = 0.0
+    markov_conversions: float = 0.0
+    revenue: float = 0.0  # attributed under attribution_model
     assisted_conversions: int = 0
+    attribution_model: str = ""
     currency: str = "USD"
 
 
 class KeywordPerformance(StandardModel):
     """Search keyword / SEO performance."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "keyword", "marketplace")
+
     date: date
     keyword: str
     search_volume: int = 0
@@ -52,3 +65,34 @@ class KeywordPerformance(StandardModel):
     ctr: float = 0.0
     cpc: float = 0.0
     marketplace: str = ""
+
+
+class KeywordOpportunity(StandardModel):
+    """Expected click and value uplift of improving a keyword's search position."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "keyword", "marketplace")
+
+    date: date
+    keyword: str
+    marketplace: str = ""
+    rank: int = 0
+    search_volume: int = 0
+    position: float = 0.0
+    target_position: float = 0.0
+    expected_ctr: float = 0.0  # CTR expected at the current position
+    target_ctr: float = 0.0
+    relevance: float = 1.0  # keyword CTR relative to the marketplace curve
+    current_clicks: float = 0.0
+    potential_clicks: float = 0.0
+    click_uplift: float = 0.0
+    cpc: float = 0.0
+    value_uplift: float = 0.0  # click uplift valued at CPC
+    opportunity_score: float = 0.0
+
+
+class CampaignAnomaly(MetricAnomaly):
+    """Anomaly in a marketing channel's campaign metrics."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "metric", "channel")
+
+    channel: str = ""
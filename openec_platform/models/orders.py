@@ -3,14 +3,18 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from openec_platform.core.provider_interface import StandardModel
+from openec_platform.models.analytics import MetricAnomaly
 
 
 class OrderSummary(StandardModel):
     """Aggregated order summary data."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "marketplace")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("total_revenue", "average_order_value")
+
     date: date
     total_orders: int = 0
     total_revenue: float = 0.0
@@ -25,6 +29,9 @@ class OrderSummary(StandardModel):
 class OrderDetail(StandardModel):
     """Individual order detail."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("order_id",)
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("total",)
+
     order_id: str
     date: datetime
     status: str = ""
@@ -40,6 +47,8 @@ class OrderDetail(StandardModel):
 class FulfillmentStatus(StandardModel):
     """Order fulfillment tracking."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date",)
+
     date: date
     total_orders: int = 0
     pending: int = 0
@@ -51,9 +60,25 @@ class FulfillmentStatus(StandardModel):
     fulfillment_rate: float = 0.0
 
 
+class FulfillmentTime(StandardModel):
+    """Time orders spent in a fulfillment status before moving on."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "status")
+
+    date: date
+    status: str  # the status orders left on this date
+    transitions: int = 0
+    p50_hours: float = 0.0
+    p90_hours: float = 0.0
+    p99_hours: float = 0.0
+
+
 class ReturnsSummary(StandardModel):
     """Returns and refunds summary."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "marketplace")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("total_refunds",)
+
     date: date
     total_returns: int = 0
     return_rate: float = 0.0
@@ -61,3 +86,11 @@ class ReturnsSummary(StandardModel):
     currency: str = "USD"
     top_return_reasons: List[str] = []
     marketplace: str = ""
+
+
+class OrderAnomaly(MetricAnomaly):
+    """Anomaly in a marketplace's order metrics."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "metric", "marketplace")
+
+    marketplace: str = ""
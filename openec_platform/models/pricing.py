@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from openec_platform.core.provider_interface import StandardModel
 
@@ -11,6 +11,9 @@ from openec_platform.core.provider_interface import StandardModel
 class PriceHistorical(StandardModel):
     """Historical price tracking."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "sku", "marketplace", "seller")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("price",)
+
     date: date
     sku: str
     name: str = ""
@@ -25,6 +28,9 @@ class PriceHistorical(StandardModel):
 class CompetitorPrice(StandardModel):
     """Competitor pricing data."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "sku", "competitor", "marketplace")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("price", "price_difference")
+
     date: date
     sku: str = ""
     product_name: str = ""
@@ -41,9 +47,15 @@ class CompetitorPrice(StandardModel):
 class PriceElasticity(StandardModel):
     """Price elasticity analysis."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("sku", "category")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("current_price", "optimal_price")
+
     sku: str = ""
     category: str = ""
     elasticity: float = 0.0  # % change in demand / % change in price
+    elasticity_lower: float = 0.0
+    elasticity_upper: float = 0.0
+    r_squared: float = 0.0
     optimal_price: float = 0.0
     current_price: float = 0.0
     currency: str = "USD"
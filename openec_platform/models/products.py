@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from openec_platform.core.provider_interface import StandardModel
 
@@ -11,6 +11,9 @@ from openec_platform.core.provider_interface import StandardModel
 class ProductInfo(StandardModel):
     """Canonical product information."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("sku", "marketplace")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("price",)
+
     sku: str
     name: str
     category: str = ""
@@ -30,6 +33,9 @@ class ProductInfo(StandardModel):
 class SalesHistorical(StandardModel):
     """Historical sales data for a product or category."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "sku", "marketplace")
+    monetary_fields: ClassVar[Tuple[str, ...]] = ("revenue", "average_selling_price")
+
     date: date
     sku: str = ""
     name: str = ""
@@ -46,6 +52,8 @@ class SalesHistorical(StandardModel):
 class ProductRanking(StandardModel):
     """Product ranking / best seller rank data."""
 
+    natural_key: ClassVar[Tuple[str, ...]] = ("date", "sku", "category", "marketplace")
+
     date: date
     sku: str
     name: str = ""
@@ -66,3 +74,20 @@ class ProductReview(StandardModel):
     verified_purchase: bool = False
     marketplace: str = ""
     helpful_votes: int = 0
+
+
+class ReviewSentiment(StandardModel):
+    """Review sentiment distribution for a product on a marketplace."""
+
+    natural_key: ClassVar[Tuple[str, ...]] = ("sku", "marketplace")
+
+    sku: str
+    marketplace: str = ""
+    review_count: int = 0
+    positive: int = 0
+    neutral: int = 0
+    negative: int = 0
+    positive_share: float = 0.0
+    negative_share: float = 0.0
+    average_score: float = 0.0  # mean compound score, -1 to 1
+    average_rating: float = 0.0
@@ -4,15 +4,45 @@ This provider is used for development, testing, and demonstration purposes.
 It requires no API keys or external services.
 """
 
-from openec_platform.core.provider_interface import ProviderInfo
+from functools import partial
+
+from openec_platform.core.provider_interface import DerivedFetcher, ProviderInfo
+from openec_platform.engines.anomalies import (
+    AnomalyDetectors,
+    campaign_anomalies,
+    order_anomalies,
+    traffic_anomalies,
+)
+from openec_platform.engines.attribution import channel_attribution
+from openec_platform.engines.catalog import catalog_search
+from openec_platform.engines.cohorts import cohort_retention
+from openec_platform.engines.cube import SalesCube, category_performance
+from openec_platform.engines.elasticity import ElasticityModel, price_elasticity
+from openec_platform.engines.forecasting import demand_forecast
+from openec_platform.engines.fulfillment import fulfillment_status, fulfillment_times, returns_summary
+from openec_platform.engines.keywords import keyword_opportunities
+from openec_platform.engines.rankings import RankingEngines, bestseller_rankings
+from openec_platform.engines.reorder import reorder_alerts
+from openec_platform.engines.rfm import lifetime_value, rfm_assignments, rfm_segments
+from openec_platform.engines.sentiment import review_sentiment
+from openec_platform.engines.sessions import funnel_conversion, traffic_sources
 from openec_providers.demo.fetchers import (
-    DemoAnalyticsFetcher,
+    DemoCatalogFetcher,
+    DemoClickstreamFetcher,
     DemoCustomersFetcher,
     DemoInventoryFetcher,
+    DemoKeywordsFetcher,
     DemoMarketingFetcher,
+    DemoOrderDetailFetcher,
+    DemoOrderEventsFetcher,
     DemoOrdersFetcher,
+    DemoPriceHistoryFetcher,
+    DemoPriceResponseFetcher,
     DemoPricingFetcher,
     DemoProductsFetcher,
+    DemoReviewsFetcher,
+    DemoStockMovementFetcher,
+    DemoTouchpointFetcher,
 )
 
 provider = ProviderInfo(
@@ -21,41 +51,65 @@ provider = ProviderInfo(
     website="https://github.com/bankyresearch/openEC",
     credentials=[],
     fetchers={},
+    max_concurrency=8,
 )
 
 # Register all fetchers
 _fetcher_map = {
     # Products
-    "ProductInfo": DemoProductsFetcher(),
+    "ProductInfo": DerivedFetcher(catalog_search, products=DemoCatalogFetcher()),
     "SalesHistorical": DemoProductsFetcher(),
-    "ProductRanking": DemoProductsFetcher(),
-    "ProductReview": DemoProductsFetcher(),
+    "ProductRanking": DerivedFetcher(
+        partial(bestseller_rankings, engines=RankingEngines()), sales=DemoProductsFetcher()
+    ),
+    "ProductReview": DemoReviewsFetcher(),
+    "ReviewSentiment": DerivedFetcher(review_sentiment, reviews=DemoReviewsFetcher()),
     # Orders
     "OrderSummary": DemoOrdersFetcher(),
-    "OrderDetail": DemoOrdersFetcher(),
-    "FulfillmentStatus": DemoOrdersFetcher(),
-    "ReturnsSummary": DemoOrdersFetcher(),
+    "OrderDetail": DemoOrderDetailFetcher(),
+    "OrderAnomaly": DerivedFetcher(
+        partial(order_anomalies, detectors=AnomalyDetectors()), orders=DemoOrdersFetcher()
+    ),
+    "FulfillmentStatus": DerivedFetcher(fulfillment_status, events=DemoOrderEventsFetcher()),
+    "FulfillmentTime": DerivedFetcher(fulfillment_times, events=DemoOrderEventsFetcher()),
+    "ReturnsSummary": DerivedFetcher(returns_summary, events=DemoOrderEventsFetcher()),
     # Customers
-    "CustomerCohort": DemoCustomersFetcher(),
-    "CustomerLifetimeValue": DemoCustomersFetcher(),
-    "CustomerSegment": DemoCustomersFetcher(),
+    "CustomerCohort": DerivedFetcher(cohort_retention, orders=DemoOrderDetailFetcher()),
+    "CustomerLifetimeValue": DerivedFetcher(lifetime_value, orders=DemoOrderDetailFetcher()),
+    "CustomerSegment": DerivedFetcher(rfm_segments, orders=DemoOrderDetailFetcher()),
+    "CustomerRFM": DerivedFetcher(rfm_assignments, orders=DemoOrderDetailFetcher()),
     "CustomerAcquisition": DemoCustomersFetcher(),
     # Inventory
     "InventoryLevel": DemoInventoryFetcher(),
-    "DemandForecast": DemoInventoryFetcher(),
-    "StockMovement": DemoInventoryFetcher(),
+    "StockoutRisk": DerivedFetcher(reorder_alerts, inventory=DemoInventoryFetcher(), sales=DemoProductsFetcher()),
+    "DemandForecast": DerivedFetcher(demand_forecast, sales=DemoProductsFetcher()),
+    "StockMovement": DemoStockMovementFetcher(),
     # Marketing
     "CampaignPerformance": DemoMarketingFetcher(),
-    "ChannelAttribution": DemoMarketingFetcher(),
-    "KeywordPerformance": DemoMarketingFetcher(),
+    "ChannelAttribution": DerivedFetcher(channel_attribution, touchpoints=DemoTouchpointFetcher()),
+    "KeywordPerformance": DemoKeywordsFetcher(),
+    "KeywordOpportunity": DerivedFetcher(keyword_opportunities, keywords=DemoKeywordsFetcher()),
+    "CampaignAnomaly": DerivedFetcher(
+        partial(campaign_anomalies, detectors=AnomalyDetectors()), campaigns=DemoMarketingFetcher()
+    ),
     # Analytics
-    "FunnelConversion": DemoAnalyticsFetcher(),
-    "TrafficSource": DemoAnalyticsFetcher(),
-    "CategoryPerformance": DemoAnalyticsFetcher(),
+    "FunnelConversion": DerivedFetcher(funnel_conversion, events=DemoClickstreamFetcher()),
+    "TrafficSource": DerivedFetcher(traffic_sources, events=DemoClickstreamFetcher()),
+    "TrafficAnomaly": DerivedFetcher(
+        partial(traffic_anomalies, detectors=AnomalyDetectors()), events=DemoClickstreamFetcher()
+    ),
+    # One cube per provider, so refreshes only fold in the re-fetched days.
+    "CategoryPerformance": DerivedFetcher(
+        partial(category_performance, cube=SalesCube()), sales=DemoProductsFetcher()
+    ),
     # Pricing
-    "PriceHistorical": DemoPricingFetcher(),
+    "PriceHistorical": DemoPriceHistoryFetcher(),
     "CompetitorPrice": DemoPricingFetcher(),
-    "PriceElasticity": DemoPricingFetcher(),
+    "PriceElasticity": DerivedFetcher(
+        partial(price_elasticity, model=ElasticityModel()),
+        prices=DemoPriceHistoryFetcher(),
+        sales=DemoPriceResponseFetcher(),
+    ),
 }
 
 for model_name, fetcher in _fetcher_map.items():
@@ -4,24 +4,34 @@ from __future__ import annotations
 
 import random
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
-from openec_platform.core.provider_interface import ProviderFetcher, QueryParams, StandardModel
+from openec_platform.core.provider_interface import ProviderFetcher, QueryParams, RecordSource, StandardModel
 
 # Seed for reproducibility
 random.seed(42)
 
 DEMO_PRODUCTS = [
-    {"sku": "EC-1001", "name": "Wireless Bluetooth Headphones", "category": "Electronics", "brand": "SoundMax", "price": 79.99},
-    {"sku": "EC-1002", "name": "Organic Cotton T-Shirt", "category": "Apparel", "brand": "EcoWear", "price": 29.99},
-    {"sku": "EC-1003", "name": "Stainless Steel Water Bottle", "category": "Home & Kitchen", "brand": "HydroFlow", "price": 24.99},
-    {"sku": "EC-1004", "name": "Running Shoes Pro", "category": "Sports", "brand": "SprintX", "price": 129.99},
-    {"sku": "EC-1005", "name": "Vitamin C Serum", "category": "Beauty", "brand": "GlowUp", "price": 34.99},
-    {"sku": "EC-1006", "name": "Mechanical Keyboard RGB", "category": "Electronics", "brand": "TypeMaster", "price": 89.99},
-    {"sku": "EC-1007", "name": "Yoga Mat Premium", "category": "Sports", "brand": "ZenFit", "price": 49.99},
-    {"sku": "EC-1008", "name": "Coffee Grinder Electric", "category": "Home & Kitchen", "brand": "BrewPerfect", "price": 59.99},
-    {"sku": "EC-1009", "name": "Kids Building Blocks Set", "category": "Toys", "brand": "BrainBuild", "price": 39.99},
-    {"sku": "EC-1010", "name": "Phone Case Ultra Slim", "category": "Electronics", "brand": "ShieldPro", "price": 19.99},
+    {"sku": "EC-1001", "name": "Wireless Bluetooth Headphones", "category": "Electronics",
+     "subcategory": "Audio", "brand": "SoundMax", "price": 79.99},
+    {"sku": "EC-1002", "name": "Organic Cotton T-Shirt", "category": "Apparel",
+     "subcategory": "Tops", "brand": "EcoWear", "price": 29.99},
+    {"sku": "EC-1003", "name": "Stainless Steel Water Bottle", "category": "Home & Kitchen",
+     "subcategory": "Drinkware", "brand": "HydroFlow", "price": 24.99},
+    {"sku": "EC-1004", "name": "Running Shoes Pro", "category": "Sports",
+     "subcategory": "Footwear", "brand": "SprintX", "price": 129.99},
+    {"sku": "EC-1005", "name": "Vitamin C Serum", "category": "Beauty",
+     "subcategory": "Skincare", "brand": "GlowUp", "price": 34.99},
+    {"sku": "EC-1006", "name": "Mechanical Keyboard RGB", "category": "Electronics",
+     "subcategory": "Computer Accessories", "brand": "TypeMaster", "price": 89.99},
+    {"sku": "EC-1007", "name": "Yoga Mat Premium", "category": "Sports",
+     "subcategory": "Fitness", "brand": "ZenFit", "price": 49.99},
+    {"sku": "EC-1008", "name": "Coffee Grinder Electric", "category": "Home & Kitchen",
+     "subcategory": "Coffee", "brand": "BrewPerfect", "price": 59.99},
+    {"sku": "EC-1009", "name": "Kids Building Blocks Set", "category": "Toys",
+     "subcategory": "Building Toys", "brand": "BrainBuild", "price": 39.99},
+    {"sku": "EC-1010", "name": "Phone Case Ultra Slim", "category": "Electronics",
+     "subcategory": "Phone Accessories", "brand": "ShieldPro", "price": 19.99},
 ]
 
 CHANNELS = ["google_ads", "meta_ads", "tiktok_ads", "email", "organic", "direct", "referral"]
@@ -33,10 +43,33 @@ def _date_range(days: int = 30) -> List[date]:
     return [today - timedelta(days=i) for i in range(days, 0, -1)]
 
 
+def _requested_dates(kwargs: Dict[str, Any], default_days: int = 30) -> List[date]:
+    """Dates for a request: an explicit start_date/end_date window, a period, or the default."""
+    from openec_platform.core.sharding import resolve_date_range
+
+    window = resolve_date_range(kwargs)
+    if window is None:
+        return _date_range(default_days)
+    start, end = window
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _demo_price(product: Dict[str, Any], d: date) -> Tuple[float, bool, float]:
+    """Price, deal flag and discount of a demo product on a day."""
+    # Seeded per SKU and day so overlapping windows agree
+    rng = random.Random(f"{product['sku']}-{d.isoformat()}")
+    is_deal = rng.random() < 0.1
+    discount = round(rng.uniform(10, 30), 1) if is_deal else 0.0
+    price = product["price"] * rng.uniform(0.95, 1.05) * (1 - discount / 100)
+    return round(price, 2), is_deal, discount
+
+
 class DemoProductsFetcher(ProviderFetcher):
+    shardable = True
+
     def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
         records = []
-        for d in _date_range(30):
+        for d in _requested_dates(kwargs):
             for p in DEMO_PRODUCTS:
                 units = random.randint(5, 200)
                 records.append({
@@ -44,6 +77,7 @@ class DemoProductsFetcher(ProviderFetcher):
                     "sku": p["sku"],
                     "name": p["name"],
                     "category": p["category"],
+                    "subcategory": p["subcategory"],
                     "brand": p["brand"],
                     "price": p["price"],
                     "units_sold": units,
@@ -59,22 +93,193 @@ class DemoProductsFetcher(ProviderFetcher):
         return [SalesHistorical(**r) for r in data]
 
 
+class DemoCatalogFetcher(ProviderFetcher):
+    """The demo catalog: one ProductInfo row per product and marketplace listing."""
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        for p in DEMO_PRODUCTS:
+            rng = random.Random(p["sku"])
+            for marketplace in rng.sample(MARKETPLACES, rng.randint(1, 3)):
+                records.append({
+                    "sku": p["sku"],
+                    "name": p["name"],
+                    "category": p["category"],
+                    "subcategory": p["subcategory"],
+                    "brand": p["brand"],
+                    "price": p["price"],
+                    "marketplace": marketplace,
+                    "url": f"https://{marketplace}.example.com/p/{p['sku'].lower()}",
+                    "rating": round(rng.uniform(3.5, 5.0), 1),
+                    "review_count": rng.randint(10, 500),
+                    "attributes": {"color": rng.choice(["black", "white", "blue", "green"])},
+                })
+        return records
+
+    def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
+        from openec_platform.models.products import ProductInfo
+        return [ProductInfo(**r) for r in data]
+
+
+_REVIEW_TEMPLATES = [
+    # (rating range, title, body)
+    ((5, 5), "Love it", "Excellent {name}, works perfectly and feels really durable. Highly recommend."),
+    ((4, 5), "Great value", "Great quality for the price. Shipping was fast and I am very happy with it."),
+    ((4, 5), "Does the job", "Solid {name}. Easy to use, nothing fancy but worth it."),
+    ((3, 4), "It's okay", "The {name} is fine. Not amazing, not bad either."),
+    ((3, 3), "Average", "Arrived on time. It does what it says, packaging could be better."),
+    ((2, 3), "Not great", "Not as good as expected. The {name} feels a bit flimsy."),
+    ((1, 2), "Disappointed", "Stopped working after two weeks. Poor quality, returned it for a refund."),
+    ((1, 1), "Terrible", "Worst purchase ever. Arrived broken and customer service was useless."),
+]
+
+
+class DemoReviewsFetcher(ProviderFetcher):
+    """Demo ProductReview rows; a day's reviews are the same on every fetch."""
+
+    shardable = True
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        sku = kwargs.get("sku", "")
+        for d in _requested_dates(kwargs):
+            for p in DEMO_PRODUCTS:
+                if sku and p["sku"] != sku:
+                    continue
+                rng = random.Random(f"reviews-{p['sku']}-{d.isoformat()}")
+                for _ in range(rng.randint(0, 4)):
+                    (low, high), title, body = rng.choices(_REVIEW_TEMPLATES, weights=[5, 6, 5, 4, 3, 2, 2, 1])[0]
+                    records.append({
+                        "date": d.isoformat(),
+                        "sku": p["sku"],
+                        "rating": float(rng.randint(low, high)),
+                        "title": title,
+                        "body": body.format(name=p["name"]),
+                        "verified_purchase": rng.random() < 0.8,
+                        "marketplace": rng.choice(MARKETPLACES),
+                        "helpful_votes": rng.randint(0, 40),
+                    })
+        return records
+
+    def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
+        from openec_platform.models.products import ProductReview
+        return [ProductReview(**r) for r in data]
+
+
+class DemoPriceHistoryFetcher(ProviderFetcher):
+    shardable = True
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        sku = kwargs.get("sku") or ""
+        products = [p for p in DEMO_PRODUCTS if not sku or p["sku"] == sku]
+        for d in _requested_dates(kwargs, default_days=90):
+            for p in products:
+                price, is_deal, discount = _demo_price(p, d)
+                records.append({
+                    "date": d.isoformat(),
+                    "sku": p["sku"],
+                    "name": p["name"],
+                    "price": price,
+                    "marketplace": MARKETPLACES[int(p["sku"][-1]) % len(MARKETPLACES)],
+                    "seller": p["brand"],
+                    "is_deal": is_deal,
+                    "discount_pct": discount,
+                })
+        return records
+
+    def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
+        from openec_platform.models.pricing import PriceHistorical
+        return [PriceHistorical(**r) for r in data]
+
+
+class DemoPriceResponseFetcher(ProviderFetcher):
+    """Daily sales that respond to the demo price history with a fixed elasticity per SKU."""
+
+    shardable = True
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        sku = kwargs.get("sku") or ""
+        products = [p for p in DEMO_PRODUCTS if not sku or p["sku"] == sku]
+        for d in _requested_dates(kwargs, default_days=90):
+            for p in products:
+                price, _, _ = _demo_price(p, d)
+                elasticity = random.Random(p["sku"]).uniform(-2.5, -0.6)
+                rng = random.Random(f"{p['sku']}-{d.isoformat()}-units")
+                units = max(int(60 * (price / p["price"]) ** elasticity * rng.lognormvariate(0, 0.15)), 1)
+                records.append({
+                    "date": d.isoformat(),
+                    "sku": p["sku"],
+                    "name": p["name"],
+                    "category": p["category"],
+                    "brand": p["brand"],
+                    "price": price,
+                    "units_sold": units,
+                    "revenue": round(units * price, 2),
+                    "marketplace": MARKETPLACES[int(p["sku"][-1]) % len(MARKETPLACES)],
+                })
+        return records
+
+    def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
+        from openec_platform.models.products import SalesHistorical
+        return [SalesHistorical(**r) for r in data]
+
+
+class DemoStockMovementFetcher(ProviderFetcher):
+    shardable = True
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        sku = kwargs.get("sku") or ""
+        products = [p for p in DEMO_PRODUCTS if not sku or p["sku"] == sku]
+        for d in _requested_dates(kwargs):
+            for p in products:
+                rng = random.Random(f"{p['sku']}-{d.isoformat()}-stock")
+                sold = rng.randint(5, 120)
+                received = rng.choice([0, 0, 0, rng.randint(100, 600)])
+                returned = rng.randint(0, max(sold // 10, 1))
+                closing = rng.randint(50, 800)
+                records.append({
+                    "date": d.isoformat(),
+                    "sku": p["sku"],
+                    "name": p["name"],
+                    "received": received,
+                    "sold": sold,
+                    "returned": returned,
+                    "adjusted": rng.choice([0, 0, 0, -rng.randint(1, 5)]),
+                    "closing_stock": closing,
+                    "turnover_rate": round(sold / closing, 3),
+                })
+        return records
+
+    def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
+        from openec_platform.models.inventory import StockMovement
+        return [StockMovement(**r) for r in data]
+
+
 class DemoOrdersFetcher(ProviderFetcher):
     def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
         records = []
         for d in _date_range(30):
-            orders = random.randint(50, 500)
-            revenue = round(orders * random.uniform(35, 120), 2)
-            records.append({
-                "date": d.isoformat(),
-                "total_orders": orders,
-                "total_revenue": revenue,
-                "average_order_value": round(revenue / orders, 2),
-                "total_units": int(orders * random.uniform(1.5, 3.0)),
-                "cancelled_orders": random.randint(0, int(orders * 0.05)),
-                "returned_orders": random.randint(0, int(orders * 0.08)),
-                "marketplace": random.choice(MARKETPLACES),
-            })
+            for marketplace in MARKETPLACES:
+                # Seeded per marketplace and day so overlapping windows agree
+                rng = random.Random(f"orders-{marketplace}-{d.isoformat()}")
+                orders = rng.randint(50, 500)
+                revenue = round(orders * rng.uniform(35, 120), 2)
+                cancelled = rng.randint(0, int(orders * 0.05))
+                if rng.random() < 0.03:  # occasional fulfillment incident
+                    cancelled = int(orders * rng.uniform(0.15, 0.3))
+                records.append({
+                    "date": d.isoformat(),
+                    "total_orders": orders,
+                    "total_revenue": revenue,
+                    "average_order_value": round(revenue / orders, 2),
+                    "total_units": int(orders * rng.uniform(1.5, 3.0)),
+                    "cancelled_orders": cancelled,
+                    "returned_orders": rng.randint(0, int(orders * 0.08)),
+                    "marketplace": marketplace,
+                })
         return records
 
     def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
@@ -82,6 +287,104 @@ class DemoOrdersFetcher(ProviderFetcher):
         return [OrderSummary(**r) for r in data]
 
 
+class DemoOrderDetailFetcher(ProviderFetcher):
+    shardable = True
+    shard_days = 30
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        # A fixed customer base replayed from a fixed start, so every window of
+        # the history agrees with every other window.
+        rng = random.Random(7)
+        dates = _requested_dates(kwargs, default_days=365)
+        first_day = _date_range(3 * 365)[0]
+        records = []
+        customers = 0
+        day = first_day
+        while day <= dates[-1]:
+            orders = rng.randint(60, 140)
+            for n in range(orders):
+                if customers < 20 or rng.random() < 0.3:
+                    customers += 1
+                    customer = customers
+                else:
+                    # Recent customers are more likely to come back
+                    customer = max(1, customers - int(rng.expovariate(1 / 400)))
+                if day >= dates[0]:
+                    total = round(rng.lognormvariate(3.8, 0.6), 2)
+                    placed = datetime(day.year, day.month, day.day, rng.randint(0, 23), rng.randint(0, 59))
+                    records.append({
+                        "order_id": f"ORD-{day.strftime('%Y%m%d')}-{n:04d}",
+                        "date": placed.isoformat(),
+                        "status": rng.choices(
+                            ["delivered", "shipped", "processing", "cancelled", "returned"], [70, 12, 8, 4, 6]
+                        )[0],
+                        "total": total,
+                        "items": rng.randint(1, 5),
+                        "marketplace": rng.choice(MARKETPLACES),
+                        "customer_id": f"CUST-{customer:06d}",
+                        "shipping_method": rng.choice(["standard", "express", "pickup"]),
+                        "payment_method": rng.choice(["card", "paypal", "apple_pay"]),
+                    })
+            day += timedelta(days=1)
+        limit = kwargs.get("limit")
+        if limit:
+            records = records[-int(limit):][::-1]
+        return records
+
+    def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
+        from openec_platform.models.orders import OrderDetail
+        return [OrderDetail(**r) for r in data]
+
+
+class DemoOrderEventsFetcher(RecordSource):
+    """Order status changes, from placement to delivery, cancellation or return, for demo orders."""
+
+    RETURN_REASONS = ["wrong_size", "damaged", "not_as_described", "defective", "changed_mind", "arrived_late"]
+    RETURN_WEIGHTS = [30, 18, 16, 12, 14, 10]
+    # Mean hours from processing to shipped per marketplace.
+    HANDLING_HOURS = {"amazon": 14, "shopify": 30, "walmart": 22, "ebay": 40}
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        now = datetime.now()
+        for d in _requested_dates(kwargs):
+            # Seeded per day so overlapping windows agree
+            rng = random.Random(f"order-events-{d.isoformat()}")
+            start = datetime(d.year, d.month, d.day)
+            for n in range(rng.randint(80, 160)):
+                order_id = f"ORD-{d.strftime('%Y%m%d')}-{n:04d}"
+                marketplace = rng.choice(MARKETPLACES)
+                total = round(rng.lognormvariate(3.8, 0.6), 2)
+                ts = start + timedelta(minutes=rng.randint(0, 1439))
+                steps = [("pending", ts, {})]
+                ts += timedelta(hours=rng.uniform(0.2, 8))
+                if rng.random() < 0.03:
+                    steps.append(("cancelled", ts, {}))
+                else:
+                    steps.append(("processing", ts, {}))
+                    ts += timedelta(hours=rng.gammavariate(2.0, self.HANDLING_HOURS[marketplace] / 2))
+                    steps.append(("shipped", ts, {}))
+                    ts += timedelta(hours=rng.gammavariate(3.0, 24.0))
+                    steps.append(("delivered", ts, {}))
+                    if rng.random() < 0.08:
+                        ts += timedelta(days=rng.uniform(2, 20))
+                        steps.append(("returned", ts, {
+                            "reason": rng.choices(self.RETURN_REASONS, self.RETURN_WEIGHTS)[0],
+                            "refund_amount": total if rng.random() < 0.8 else round(total * 0.5, 2),
+                        }))
+                for status, at, extra in steps:
+                    if at > now:
+                        break
+                    records.append({
+                        "order_id": order_id,
+                        "timestamp": at.isoformat(timespec="seconds"),
+                        "status": status,
+                        "marketplace": marketplace,
+                        **extra,
+                    })
+        return records
+
+
 class DemoCustomersFetcher(ProviderFetcher):
     def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
         segments = ["Champions", "Loyal", "Potential Loyalists", "New Customers", "At Risk", "Lost"]
@@ -157,26 +460,116 @@ class DemoMarketingFetcher(ProviderFetcher):
         return [CampaignPerformance(**r) for r in data]
 
 
-class DemoAnalyticsFetcher(ProviderFetcher):
+class DemoKeywordsFetcher(ProviderFetcher):
+    """Search keyword rankings for the demo catalog, per marketplace."""
+
+    MODIFIERS = ["", "best", "cheap", "buy", "top rated", "review", "sale", "for men", "for women", "for kids",
+                 "near me", "deals", "premium", "gift", "2-pack", "replacement"]
+    # Position-1 CTR and decay of each marketplace's search results page.
+    CTR_CURVES = {"amazon": (0.32, 0.95), "shopify": (0.22, 0.75), "walmart": (0.26, 0.85), "ebay": (0.2, 0.7)}
+
     def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
-        stages = ["visit", "product_view", "add_to_cart", "checkout", "purchase"]
+        today = date.today().isoformat()
         records = []
-        for d in _date_range(30):
-            users = random.randint(5000, 20000)
-            for i, stage in enumerate(stages):
-                users = int(users * random.uniform(0.3, 0.7)) if i > 0 else users
-                records.append({
-                    "date": d.isoformat(),
-                    "stage": stage,
-                    "users": users,
-                    "conversion_rate": 100.0 if i == 0 else round(random.uniform(20, 70), 1),
-                    "drop_off_rate": 0.0 if i == 0 else round(random.uniform(30, 80), 1),
-                })
-        return records
+        for marketplace in MARKETPLACES:
+            # Seeded per marketplace so repeated requests agree
+            rng = random.Random(f"keywords-{marketplace}")
+            scale, decay = self.CTR_CURVES[marketplace]
+            for p in DEMO_PRODUCTS:
+                terms = {p["subcategory"].lower(), p["name"].lower(), " ".join(p["name"].lower().split()[-2:])}
+                for term in sorted(terms):
+                    for modifier in self.MODIFIERS:
+                        keyword = f"{modifier} {term}".strip()
+                        volume = int(rng.lognormvariate(7.5, 1.3))
+                        position = round(min(max(rng.lognormvariate(2.0, 0.9), 1.0), 100.0), 1)
+                        impressions = int(volume * rng.uniform(0.5, 0.95))
+                        ctr = min(scale * position ** -decay * rng.lognormvariate(0, 0.35), 1.0)
+                        clicks = int(impressions * ctr)
+                        records.append({
+                            "date": today,
+                            "keyword": keyword,
+                            "category": p["category"],
+                            "search_volume": volume,
+                            "position": position,
+                            "clicks": clicks,
+                            "impressions": impressions,
+                            "ctr": round(clicks / impressions * 100, 2) if impressions else 0.0,
+                            "cpc": round(p["price"] * rng.uniform(0.01, 0.04), 2),
+                            "marketplace": marketplace,
+                        })
+        marketplace = kwargs.get("marketplace")
+        return [r for r in records if r["marketplace"] == marketplace] if marketplace else records
 
     def transform(self, data: List[Dict[str, Any]], **kwargs: Any) -> List[StandardModel]:
-        from openec_platform.models.analytics import FunnelConversion
-        return [FunnelConversion(**r) for r in data]
+        from openec_platform.models.marketing import KeywordPerformance
+        return [KeywordPerformance(**r) for r in data]
+
+
+class DemoTouchpointFetcher(RecordSource):
+    """Marketing touchpoint and conversion events for demo users, ordered by user."""
+
+    # Relative odds that a journey touching the channel converts.
+    CONVERSION_LIFT = {"google_ads": 1.4, "meta_ads": 1.1, "tiktok_ads": 0.8, "email": 1.6,
+                       "organic": 1.0, "direct": 1.2, "referral": 1.3}
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        for d in _requested_dates(kwargs):
+            # Seeded per day so overlapping windows agree
+            rng = random.Random(f"touch-{d.isoformat()}")
+            start = datetime(d.year, d.month, d.day)
+            for u in range(rng.randint(150, 250)):
+                user_id = f"U-{d.strftime('%Y%m%d')}-{u:04d}"
+                ts = start + timedelta(minutes=rng.randint(0, 1439))
+                path = [rng.choice(CHANNELS) for _ in range(rng.randint(1, 6))]
+                for channel in path:
+                    records.append({"user_id": user_id, "timestamp": ts.isoformat(), "channel": channel,
+                                    "event": "touch", "revenue": 0.0})
+                    ts += timedelta(minutes=rng.randint(60, 72 * 60))
+                odds = 0.08 * max(self.CONVERSION_LIFT[c] for c in path) * (1 + 0.1 * len(set(path)))
+                if rng.random() < odds:
+                    records.append({"user_id": user_id, "timestamp": ts.isoformat(), "channel": None,
+                                    "event": "conversion", "revenue": round(rng.uniform(20, 250), 2)})
+        return records
+
+
+class DemoClickstreamFetcher(RecordSource):
+    """Raw storefront events (page views through purchases) for demo users, ordered by user."""
+
+    SOURCES = ["organic", "paid", "direct", "social", "email", "referral"]
+    # Probability of moving on to the next funnel step within a session.
+    STEPS = [("product_view", 0.7), ("add_to_cart", 0.35), ("checkout", 0.6), ("purchase", 0.7)]
+
+    def fetch(self, params: QueryParams, **kwargs: Any) -> List[Dict[str, Any]]:
+        records = []
+        for d in _requested_dates(kwargs):
+            # Seeded per day so overlapping windows agree
+            rng = random.Random(f"clicks-{d.isoformat()}")
+            start = datetime(d.year, d.month, d.day)
+            for u in range(rng.randint(400, 600)):
+                user_id = f"V-{d.strftime('%Y%m%d')}-{u:04d}"
+                marketplace = rng.choice(MARKETPLACES)
+                ts = start + timedelta(minutes=rng.randint(0, 1200))
+                for _ in range(rng.choice([1, 1, 1, 2])):
+                    source = rng.choice(self.SOURCES)
+                    events = ["page_view"] * rng.randint(1, 4)
+                    for step, probability in self.STEPS:
+                        if rng.random() > probability:
+                            break
+                        events.append(step)
+                    for event in events:
+                        records.append({
+                            "user_id": user_id,
+                            "timestamp": ts.isoformat(),
+                            "event": event,
+                            "source": source,
+                            "marketplace": marketplace,
+                            "revenue": round(rng.uniform(20, 250), 2) if event == "purchase" else 0.0,
+                        })
+                        ts += timedelta(seconds=rng.randint(5, 300))
+                    # Next visit starts after the inactivity timeout
+                    ts += timedelta(minutes=rng.randint(45, 180))
+        return records
 
 
 class DemoPricingFetcher(ProviderFetcher):
@@ -0,0 +1,42 @@
+"""Demo exchange rates - deterministic daily rates around reference levels."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from openec_platform.core.currency import RateSource
+
+# Units of USD per unit of each currency.
+REFERENCE_RATES = {"EUR": 1.08, "GBP": 1.27, "CAD": 0.74, "AUD": 0.66, "JPY": 0.0067, "MXN": 0.058}
+
+
+class DemoRateSource(RateSource):
+    """Daily rates that drift within about 2% of `REFERENCE_RATES`.
+
+    The same date always gives the same rate, so converted demo results are
+    reproducible.
+    """
+
+    def load(self, currencies: Sequence[str], start: date, end: date) -> pd.DataFrame:
+        days = pd.date_range(start, end, freq="D")
+        frames = []
+        for currency in currencies:
+            if currency not in REFERENCE_RATES:
+                continue
+            seed = sum(ord(c) for c in currency)
+            # Slow drift plus a small day-to-day wobble, both functions of the date only.
+            ordinals = np.array([d.toordinal() for d in days], dtype=float)
+            drift = 0.015 * np.sin(ordinals / 45.0 + seed)
+            jitter = 0.002 * np.sin(ordinals * 12.9898 + seed)
+            frames.append(pd.DataFrame({
+                "date": days.date,
+                "currency": currency,
+                "rate": REFERENCE_RATES[currency] * (1.0 + drift + jitter),
+            }))
+        if not frames:
+            return pd.DataFrame(columns=["date", "currency", "rate"])
+        return pd.concat(frames, ignore_index=True)